@@ -17,12 +17,14 @@
 import sys
 from .cli import ARICLI
 from .cli.ram import RAMCLI
+from .cli.serve import ARIServeCLI
 from ansible_risk_insight.scanner import ARIScanner, Config
 
 ari_actions = ["project", "playbook", "collection", "role", "taskfile"]
 ram_actions = ["ram"]
+serve_actions = ["serve"]
 
-all_actions = ari_actions + ram_actions
+all_actions = ari_actions + ram_actions + serve_actions
 
 
 def main():
@@ -36,6 +38,7 @@ def main():
         print("   project      scan a project (e.g. `ari project path/to/project`)")
         print("   taskfile     scan a taskfile (e.g. `ari taskfile path/to/taskfile.yml`)")
         print("   ram          operate the backend data (e.g. `ari ram generate -f input.txt`)")
+        print("   serve        run a scan server on localhost or a unix socket (e.g. `ari serve --port 8765`)")
         sys.exit()
 
     action = sys.argv[1]
@@ -46,6 +49,9 @@ def main():
     elif action == "ram":
         cli = RAMCLI()
         cli.run()
+    elif action == "serve":
+        cli = ARIServeCLI()
+        cli.run()
     else:
         print(f"The action {action} is not supported!", file=sys.stderr)
         sys.exit(1)
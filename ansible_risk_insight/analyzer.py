@@ -16,14 +16,16 @@
 
 import argparse
 import json
+import time
 from typing import List
-from ansible_risk_insight.annotators.risk_annotator_base import RiskAnnotator
+from ansible_risk_insight.annotators.risk_annotator_base import RiskAnnotator, RiskAnnotatorRegistry
 import ansible_risk_insight.logger as logger
 from .models import TaskCallsInTree, AnsibleRunContext
 from .utils import load_classes_in_dir
-
+from .profiler import get_profiler
 
 annotator_cache = []
+annotator_registry = None
 
 
 def load_annotators(ctx: AnsibleRunContext = None):
@@ -44,6 +46,15 @@ def load_annotators(ctx: AnsibleRunContext = None):
     return _annotators
 
 
+def load_annotator_registry(ctx: AnsibleRunContext = None):
+    global annotator_registry
+
+    annotators = load_annotators(ctx)
+    if annotator_registry is None or annotator_registry.annotators is not annotators:
+        annotator_registry = RiskAnnotatorRegistry(annotators=annotators)
+    return annotator_registry
+
+
 def load_taskcalls_in_trees(path: str) -> List[TaskCallsInTree]:
     taskcalls_in_trees = []
     try:
@@ -61,18 +72,16 @@ def analyze(contexts: List[AnsibleRunContext]):
     for i, ctx in enumerate(contexts):
         if not isinstance(ctx, AnsibleRunContext):
             continue
+        registry = load_annotator_registry(ctx)
         for j, t in enumerate(ctx.tasks):
-            annotator = None
-            _annotators = load_annotators(ctx)
-            for ax in _annotators:
-                if not ax.enabled:
-                    continue
-                if ax.match(task=t):
-                    annotator = ax
-                    break
+            annotator = registry.find(task=t)
             if annotator is None:
                 continue
+            profiler = get_profiler()
+            start = time.time()
             result = annotator.run(task=t)
+            if profiler:
+                profiler.record_annotator(annotator.name or annotator.__class__.__name__, time.time() - start)
             if not result:
                 continue
             if result.annotations:
@@ -21,6 +21,7 @@ from ansible_risk_insight.annotators.risk_annotator_base import RiskAnnotator
 class AnsibleBuiltinRiskAnnotator(RiskAnnotator):
     name: str = "ansible.builtin"
     enabled: bool = True
+    collections: list = ["ansible.builtin"]
 
     def match(self, task: TaskCall) -> bool:
         resolved_name = task.spec.resolved_name
@@ -22,10 +22,40 @@ from ansible_risk_insight.annotators.annotator_base import Annotator, AnnotatorR
 class ModuleAnnotator(Annotator):
     type: str = "module_annotation"
     fqcn: str = "<module FQCN to be annotated by this>"
+    # other names which tasks of the module can be resolved to (e.g. old names redirected to the module)
+    aliases: list = []
+    # annotators for the same module run in the descending order of this
+    precedence: int = 0
 
     def run(self, task: TaskCall) -> AnnotatorResult:
         raise ValueError("this is a base class method")
 
+    def module_names(self):
+        return [self.fqcn] + list(self.aliases)
+
+
+class ModuleAnnotatorRegistry(object):
+    """
+    module annotators by the module names, made once when the annotators are loaded
+    """
+
+    def __init__(self, annotators: list = None):
+        self.annotators = annotators or []
+        self._table = {}
+        # sorted() is stable, so annotators with the same precedence keep the load order
+        for annotator in sorted(self.annotators, key=lambda a: -a.precedence):
+            if not isinstance(annotator, ModuleAnnotator):
+                continue
+            if not annotator.fqcn:
+                continue
+            for name in annotator.module_names():
+                annotators_for_name = self._table.setdefault(name, [])
+                if annotator not in annotators_for_name:
+                    annotators_for_name.append(annotator)
+
+    def find(self, module_name: str):
+        return self._table.get(module_name, [])
+
 
 @dataclass
 class ModuleAnnotatorResult(AnnotatorResult):
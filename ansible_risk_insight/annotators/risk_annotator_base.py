@@ -18,13 +18,18 @@ from dataclasses import dataclass
 from ansible_risk_insight.models import TaskCall, RiskAnnotation
 from ansible_risk_insight.utils import load_classes_in_dir
 from ansible_risk_insight.annotators.annotator_base import Annotator, AnnotatorResult
-from ansible_risk_insight.annotators.module_annotator_base import ModuleAnnotator, ModuleAnnotatorResult
+from ansible_risk_insight.annotators.module_annotator_base import ModuleAnnotator, ModuleAnnotatorResult, ModuleAnnotatorRegistry
 
 
 class RiskAnnotator(Annotator):
     type: str = RiskAnnotation.type
     name: str = ""
     enabled: bool = False
+    # the collections of the modules this annotates (e.g. "ansible.builtin"); `match()` is called only
+    # for tasks of the modules in them. if empty, `match()` is called for every task
+    collections: list = []
+    # when some annotators match a task, the one with the highest precedence is used
+    precedence: int = 0
 
     module_annotator_cache: dict = {}
 
@@ -35,6 +40,9 @@ class RiskAnnotator(Annotator):
         raise ValueError("this is a base class method")
 
     def load_module_annotators(self, dir_path: str):
+        return self.load_module_annotator_registry(dir_path).annotators
+
+    def load_module_annotator_registry(self, dir_path: str) -> ModuleAnnotatorRegistry:
         if dir_path in self.module_annotator_cache:
             return self.module_annotator_cache[dir_path]
 
@@ -43,29 +51,21 @@ class RiskAnnotator(Annotator):
         for a_c in annotator_classes:
             annotator = a_c(context=self.context)
             module_annotators.append(annotator)
+        registry = ModuleAnnotatorRegistry(annotators=module_annotators)
         if module_annotators:
-            self.module_annotator_cache[dir_path] = module_annotators
-        return module_annotators
+            self.module_annotator_cache[dir_path] = registry
+        return registry
 
     def run_module_annotators(self, dir_path: str, task: TaskCall) -> ModuleAnnotatorResult:
         if not dir_path:
             return []
 
         resolved_name = task.spec.resolved_name
-        module_annotators = self.load_module_annotators(dir_path)
-
-        # TODO: need to consider annotator precedence
+        registry = self.load_module_annotator_registry(dir_path)
 
         annotations = []
 
-        for annotator in module_annotators:
-            if not isinstance(annotator, ModuleAnnotator):
-                continue
-            if not annotator.fqcn:
-                continue
-            if resolved_name != annotator.fqcn:
-                continue
-
+        for annotator in registry.find(resolved_name):
             result = annotator.run(task)
             if not result:
                 continue
@@ -80,3 +80,33 @@ class RiskAnnotator(Annotator):
 @dataclass
 class RiskAnnotatorResult(AnnotatorResult):
     pass
+
+
+class RiskAnnotatorRegistry(object):
+    """
+    enabled risk annotators by the collections they annotate, made once when the annotators are loaded
+    """
+
+    def __init__(self, annotators: list = None):
+        self.annotators = annotators or []
+        # sorted() is stable, so annotators with the same precedence keep the load order
+        enabled = sorted([a for a in self.annotators if a.enabled], key=lambda a: -a.precedence)
+        self._for_any = [a for a in enabled if not a.collections]
+        self._table = {}
+        for annotator in enabled:
+            for collection in annotator.collections:
+                self._table[collection] = [a for a in enabled if collection in a.collections or not a.collections]
+
+    def find(self, task: TaskCall):
+        candidates = self._table.get(_collection_name(task.spec.resolved_name), self._for_any)
+        for annotator in candidates:
+            if annotator.match(task=task):
+                return annotator
+        return None
+
+
+def _collection_name(fqcn: str):
+    parts = fqcn.split(".")
+    if len(parts) < 3:
+        return ""
+    return ".".join(parts[:2])
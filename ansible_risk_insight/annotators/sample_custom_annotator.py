@@ -23,6 +23,7 @@ from ansible_risk_insight.annotators.risk_annotator_base import RiskAnnotator
 class SampleCustomAnnotator(RiskAnnotator):
     name: str = "sample"
     enabled: bool = False
+    collections: list = ["sample.custom"]
 
     # whether this task should be analyzed by this or not
     def match(self, taskcall: TaskCall) -> bool:
@@ -36,12 +36,14 @@ from ansible_risk_insight.annotators.annotator_base import Annotator, AnnotatorR
 class VariableAnnotator(Annotator):
     type: str = VariableAnnotation.type
     context: Context = None
+    max_loop_items: int = 0
 
-    def __init__(self, context: Context):
+    def __init__(self, context: Context, max_loop_items: int = 0):
         self.context = context
+        self.max_loop_items = max_loop_items
 
     def run(self, taskcall: TaskCall):
-        resolved = resolve_module_options(self.context, taskcall)
+        resolved = resolve_module_options(self.context, taskcall, self.max_loop_items)
         resolved_module_options = resolved[0]
         resolved_variables = resolved[1]
         # mutable_vars_per_mo = resolved[2]
@@ -79,10 +81,7 @@ class VariableAnnotator(Annotator):
             if v.is_mutable:
                 is_mutable = True
 
-        for v in _vars:
-            history = self.context.var_use_history.get(v.name, [])
-            history.append(v)
-            self.context.var_use_history[v.name] = history
+        self.context.use_variables(_vars)
 
         m_opts = taskcall.spec.module_options
         if isinstance(m_opts, list):
@@ -100,11 +99,11 @@ class VariableAnnotator(Annotator):
             is_mutable=is_mutable,
         )
         taskcall.args = args
-        # deep copy the history here because the context is updated by subsequent taskcalls
+        # the histories are persistent, so the current ones are kept as they are while the context is updated
         if self.context.var_set_history:
-            taskcall.variable_set = self.context.var_set_history.copy()
+            taskcall.variable_set = self.context.var_set_history
         if self.context.var_use_history:
-            taskcall.variable_use = self.context.var_use_history.copy()
+            taskcall.variable_use = self.context.var_use_history
         taskcall.become = self.context.become
         taskcall.module_defaults = self.context.module_defaults
 
@@ -185,7 +184,7 @@ def tree_to_task_list(tree, node_objects):
     return tasks
 
 
-def resolve_variables(tree: ObjectList, additional: ObjectList) -> List[TaskCall]:
+def resolve_variables(tree: ObjectList, additional: ObjectList, max_loop_items: int = 0) -> List[TaskCall]:
     tree_root_key = tree.items[0].spec.key if len(tree.items) > 0 else ""
     inventories = get_inventories(tree_root_key, additional)
     context = Context(inventories=inventories)
@@ -200,7 +199,7 @@ def resolve_variables(tree: ObjectList, additional: ObjectList) -> List[TaskCall
         depth_dict[call_obj.key] = depth_lvl
         context.add(call_obj, depth_lvl)
         if isinstance(call_obj, TaskCall):
-            result = VariableAnnotator(context=context).run(call_obj)
+            result = VariableAnnotator(context=context, max_loop_items=max_loop_items).run(call_obj)
             if not result:
                 continue
             if result.annotations:
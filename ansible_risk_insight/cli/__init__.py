@@ -15,7 +15,9 @@
 # limitations under the License.
 
 import os
+import sys
 import json
+import textwrap
 import argparse
 
 from ..scanner import ARIScanner, config
@@ -66,11 +68,21 @@ class ARICLI:
         parser.add_argument(
             "--save-only-rule-result", action="store_true", help="if true, save only rule results and remove node details to reduce result file size"
         )
+        parser.add_argument(
+            "--stream",
+            action="store_true",
+            help="if true, write the rule result of each target to rule_result.jsonl in the output directory as soon as it is evaluated",
+        )
         parser.add_argument(
             "--scan-per-target",
             action="store_true",
             help="if true, do scanning per playbook, role or taskfile (this reduces memory usage while scanning)",
         )
+        parser.add_argument(
+            "--workers",
+            default="1",
+            help="the number of processes used with `--scan-per-target` (default to 1)",
+        )
         parser.add_argument(
             "--fix", action="store_true", help="if true, fix the scanned playbook after performing the inpline replace with ARI suggestions"
         )
@@ -80,6 +92,13 @@ class ARICLI:
             help="A threshold number to give up scanning a file where the number of tasks exceeds this (default to 100)",
         )
         parser.add_argument("-o", "--out-dir", help="output directory for the rule evaluation result")
+        parser.add_argument(
+            "--profile",
+            action="store_true",
+            help="if true, save profile.json with time per stage, file, annotator and rule to the output directory or `--profile-dir`",
+        )
+        parser.add_argument("--profile-dir", help="output directory for the scan profile (this enables `--profile`)")
+        parser.add_argument("--cprofile", action="store_true", help="if true, save cProfile stats as profile.pstats together with the profile")
         parser.add_argument(
             "-r", "--rules-dir", help=f"specify custom rule directories. use `-R` instead to ignore default rules in {config.rules_dir}"
         )
@@ -163,6 +182,13 @@ class ARICLI:
         save_only_rule_result = False
         if args.save_only_rule_result:
             save_only_rule_result = True
+        stream_rule_result = False
+        if args.stream:
+            if not args.out_dir:
+                raise ValueError("`--stream` requires `--out-dir`")
+            if args.fix:
+                raise ValueError("`--stream` cannot be used with `--fix` because it reads rule_result.json")
+            stream_rule_result = True
 
         c = ARIScanner(
             root_dir=config.data_dir,
@@ -175,6 +201,9 @@ class ARICLI:
             silent=silent,
             pretty=pretty,
             output_format=output_format,
+            profile=args.profile or args.cprofile,
+            profile_dir=args.profile_dir or "",
+            cprofile=args.cprofile,
         )
 
         if args.scan_per_target:
@@ -185,33 +214,43 @@ class ARICLI:
             print("Start scanning")
             total = len(targets)
             file_list = {"playbook": [], "role": [], "taskfile": []}
-            for i, target_info in enumerate(targets):
+            eval_targets = []
+            for target_info in targets:
                 fpath = target_info["filepath"]
                 fpath_from_root = target_info["path_from_root"]
                 scan_type = target_info["scan_type"]
                 count_in_type = len(file_list[scan_type])
-                print(f"\r[{i+1}/{total}] {scan_type} {fpath_from_root}                 ", end="")
                 out_dir = os.path.join(args.out_dir, f"{scan_type}s", str(count_in_type))
-                c.evaluate(
-                    type=scan_type,
-                    name=fpath,
-                    target_path=fpath,
-                    version=target_version,
-                    install_dependencies=False,
-                    dependency_dir=args.dependency_dir,
-                    collection_name=collection_name,
-                    role_name=role_name,
-                    source_repository=args.source,
-                    playbook_only=True,
-                    taskfile_only=True,
-                    include_test_contents=args.include_tests,
-                    load_all_taskfiles=load_all_taskfiles,
-                    save_only_rule_result=save_only_rule_result,
-                    objects=args.objects,
-                    out_dir=out_dir,
+                eval_targets.append(
+                    dict(
+                        type=scan_type,
+                        name=fpath,
+                        target_path=fpath,
+                        version=target_version,
+                        install_dependencies=False,
+                        dependency_dir=args.dependency_dir,
+                        collection_name=collection_name,
+                        role_name=role_name,
+                        source_repository=args.source,
+                        playbook_only=True,
+                        taskfile_only=True,
+                        include_test_contents=args.include_tests,
+                        load_all_taskfiles=load_all_taskfiles,
+                        save_only_rule_result=save_only_rule_result,
+                        stream_rule_result=stream_rule_result,
+                        objects=args.objects,
+                        out_dir=out_dir,
+                    )
                 )
                 file_list[scan_type].append(fpath_from_root)
+            failed_targets = []
+            for i, _, error in c.evaluate_many(eval_targets, workers=int(args.workers)):
+                target_info = targets[i]
+                print(f"\r[{i+1}/{total}] {target_info['scan_type']} {target_info['path_from_root']}                 ", end="")
+                if error:
+                    failed_targets.append((target_info, eval_targets[i]["out_dir"], error))
             print("")
+            failed_out_dirs = [out_dir for _, out_dir, _ in failed_targets]
             for scan_type, list_per_type in file_list.items():
                 index_data = {}
                 if not list_per_type:
@@ -220,10 +259,14 @@ class ARICLI:
                     index_data[i] = fpath
                 list_file_path = os.path.join(args.out_dir, f"{scan_type}s", "index.json")
                 logger.debug("list_file_path: ", list_file_path)
+                # the directory does not exist if every target of the type failed
+                os.makedirs(os.path.dirname(list_file_path), exist_ok=True)
                 with open(list_file_path, "w") as file:
                     json.dump(index_data, file)
                 if args.fix:
                     for each in index_data.keys():
+                        if os.path.join(args.out_dir, f"{scan_type}s", str(each)) in failed_out_dirs:
+                            continue
                         ari_suggestion_file_path = os.path.join(args.out_dir, f"{scan_type}s", str(each), "rule_result.json")
                         logger.debug("ARI suggestion file path: %s", ari_suggestion_file_path)
                         with open(ari_suggestion_file_path) as f:
@@ -272,6 +315,12 @@ class ARICLI:
                                     update_the_yaml_target(target_file_path, line_number_list, mutated_yaml_list)
                                 except Exception as ex:
                                     logger.warning("ARI inline replace mutation failed with exception: %s", ex)
+            if failed_targets:
+                print(f"Failed to scan {len(failed_targets)} of {total} targets:", file=sys.stderr)
+                for target_info, _, error in failed_targets:
+                    print(f"- {target_info['scan_type']} {target_info['path_from_root']}", file=sys.stderr)
+                    print(textwrap.indent(error.rstrip(), "    "), file=sys.stderr)
+                sys.exit(1)
         else:
             if not silent and not pretty:
                 print("Start preparing dependencies")
@@ -294,6 +343,7 @@ class ARICLI:
                 include_test_contents=args.include_tests,
                 load_all_taskfiles=load_all_taskfiles,
                 save_only_rule_result=save_only_rule_result,
+                stream_rule_result=stream_rule_result,
                 yaml_label_list=yaml_label_list,
                 objects=args.objects,
                 out_dir=args.out_dir,
@@ -28,6 +28,9 @@ class RAMReleaseCLI:
         parser.add_argument("target_type", help="content type", choices={"ram"})
         parser.add_argument("action", help="action for RAM command or target_name of search action")
         parser.add_argument("-o", "--outfile", help="if execute release action, specify tar.gz file to store KB files")
+        parser.add_argument(
+            "--packed", action="store_true", help="save KB files as a directory with a single pack file which can be used as the data dir directly"
+        )
         args = parser.parse_args()
         self.args = args
 
@@ -41,4 +44,4 @@ class RAMReleaseCLI:
             raise ValueError(' "release" action cannot be executed without `--outfile` option. Please set "tar.gz" file name to export KB files.')
 
         ram_client = RAMClient(root_dir=config.data_dir)
-        ram_client.release(args.outfile)
+        ram_client.release(args.outfile, packed=args.packed)
@@ -0,0 +1,76 @@
+# -*- mode:python; coding:utf-8 -*-
+
+# Copyright (c) 2022 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+
+from ..scanner import ARIScanner, config
+from ..server import ARIServer
+
+
+class ARIServeCLI:
+    args = None
+
+    def __init__(self):
+        parser = argparse.ArgumentParser(description="run ARI as a long-running process which accepts scan requests")
+        parser.add_argument("action", help="action", choices={"serve"})
+        parser.add_argument("--host", default="127.0.0.1", help="host to listen on (default to 127.0.0.1)")
+        parser.add_argument("--port", default="8765", help="port to listen on (default to 8765)")
+        parser.add_argument("--socket", help="if specified, listen on this unix domain socket instead of --host and --port")
+        parser.add_argument("--without-ram", action="store_true", help="if true, RAM data is not used and not even updated")
+        parser.add_argument("--no-module-spec", action="store_true", help="if true, ansible-doc is not used")
+        parser.add_argument(
+            "--allow-write-dir",
+            action="append",
+            default=[],
+            help="a directory under which scan requests may write with `out_dir` or `dependency_dir` (can be specified multiple times)",
+        )
+        parser.add_argument(
+            "--allow-install-dependencies", action="store_true", help="if true, scan requests may install dependencies with `install_dependencies`"
+        )
+        parser.add_argument(
+            "-r", "--rules-dir", help=f"specify custom rule directories. use `-R` instead to ignore default rules in {config.rules_dir}"
+        )
+        parser.add_argument("-R", "--rules-dir-without-default", help="specify custom rule directories and ignore default rules")
+        args = parser.parse_args()
+        self.args = args
+
+    def run(self):
+        args = self.args
+
+        rules_dir = config.rules_dir
+        if args.rules_dir_without_default:
+            rules_dir = args.rules_dir_without_default
+        elif args.rules_dir:
+            rules_dir = args.rules_dir + ":" + config.rules_dir
+
+        # the daemon reads RAM but never updates it, so that concurrent CLI runs are not affected
+        scanner = ARIScanner(
+            root_dir=config.data_dir,
+            rules_dir=rules_dir,
+            read_ram=not args.without_ram,
+            write_ram=False,
+            use_ansible_doc=not args.no_module_spec,
+            silent=True,
+        )
+        server = ARIServer(
+            scanner=scanner,
+            host=args.host,
+            port=int(args.port),
+            socket_path=args.socket or "",
+            allowed_write_dirs=args.allow_write_dir,
+            allow_install_dependencies=args.allow_install_dependencies,
+        )
+        server.serve_forever()
@@ -0,0 +1,212 @@
+# -*- mode:python; coding:utf-8 -*-
+
+# Copyright (c) 2022 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+serializer of ARI objects (models, Findings and containers of them).
+
+    {"ari/codec": 1, "data": {"ari/t": "Task", "name": "...", ...}}
+
+an object is written as a dict of its attributes with a type tag. classes in `ansible_risk_insight.models`
+are tagged by the class name and other classes by the full path. JSON written by jsonpickle
+(RAM data of older versions) is detected and decoded by jsonpickle.
+mappings other than dicts are written as dicts. orjson is used if it is installed.
+"""
+
+import json
+import base64
+import inspect
+import importlib
+import jsonpickle
+from collections.abc import Mapping
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+codec_version = 1
+codec_key = "ari/codec"
+
+_type_key = "ari/t"
+_tuple_key = "ari/tuple"
+_set_key = "ari/set"
+_bytes_key = "ari/bytes"
+# classes and functions are written as references
+_ref_key = "ari/ref"
+# dicts which have non-str keys or keys conflicting with the tags above
+_items_key = "ari/items"
+_tag_prefix = "ari/"
+
+_models_module_name = "ansible_risk_insight.models"
+_class_cache = {}
+
+
+def encode(obj):
+    return _dumps({codec_key: codec_version, "data": _flatten(obj, set())})
+
+
+def decode(json_str):
+    data = _loads(json_str)
+    if isinstance(data, dict) and codec_key in data:
+        version = data[codec_key]
+        if version > codec_version:
+            raise ValueError(f"the data is written by a newer codec version {version}")
+        return _restore(data.get("data", None))
+    # written by jsonpickle
+    return jsonpickle.Unpickler().restore(data, reset=True)
+
+
+def document_prefix():
+    """
+    the beginning of an encoded document; a document can be written incrementally as
+    `document_prefix() + <JSON of encode_record() results> + "}"`
+    """
+    return f'{{"{codec_key}":{codec_version},"data":'
+
+
+def encode_record(obj):
+    """
+    encode the object without the header to be a part of a document
+    """
+    return _dumps(_flatten(obj, set()))
+
+
+def decode_record(json_str):
+    data = _loads(json_str)
+    if isinstance(data, dict) and "py/object" in data:
+        return jsonpickle.Unpickler().restore(data, reset=True)
+    return _restore(data)
+
+
+def _dumps(data):
+    if orjson is not None:
+        try:
+            return orjson.dumps(data).decode("utf-8")
+        except TypeError:
+            # e.g. integers bigger than 64 bit
+            pass
+    return json.dumps(data, separators=(",", ":"))
+
+
+def _loads(json_str):
+    if orjson is not None:
+        return orjson.loads(json_str)
+    return json.loads(json_str)
+
+
+def _type_tag(cls):
+    if cls.__module__ == _models_module_name:
+        return cls.__qualname__
+    return f"{cls.__module__}.{cls.__qualname__}"
+
+
+def _find_class(tag: str):
+    cls = _class_cache.get(tag, None)
+    if cls is not None:
+        return cls
+    module_name = _models_module_name
+    qualname = tag
+    if "." in tag:
+        module_name, qualname = tag.rsplit(".", 1)
+    try:
+        cls = getattr(importlib.import_module(module_name), qualname)
+    except Exception:
+        return None
+    _class_cache[tag] = cls
+    return cls
+
+
+def _flatten(obj, parents: set):
+    if obj is None or isinstance(obj, (bool, int, float, str)):
+        return obj
+    obj_id = id(obj)
+    if obj_id in parents:
+        # a circular reference is dropped
+        return None
+    parents.add(obj_id)
+    try:
+        if isinstance(obj, list):
+            return [_flatten(v, parents) for v in obj]
+        if isinstance(obj, dict):
+            if all([isinstance(k, str) and not k.startswith(_tag_prefix) for k in obj]):
+                return {k: _flatten(v, parents) for k, v in obj.items()}
+            return {_items_key: [[_flatten(k, parents), _flatten(v, parents)] for k, v in obj.items()]}
+        if isinstance(obj, Mapping):
+            # other mappings (e.g. variable histories) are written as dicts
+            return _flatten(dict(obj), parents)
+        if isinstance(obj, tuple):
+            return {_tuple_key: [_flatten(v, parents) for v in obj]}
+        if isinstance(obj, (set, frozenset)):
+            return {_set_key: [_flatten(v, parents) for v in obj]}
+        if isinstance(obj, bytes):
+            return {_bytes_key: base64.b64encode(obj).decode("ascii")}
+        if isinstance(obj, type) or inspect.isfunction(obj):
+            return {_ref_key: f"{obj.__module__}.{obj.__qualname__}"}
+        if hasattr(obj, "__dict__"):
+            d = {_type_key: _type_tag(type(obj))}
+            for k, v in _get_state(obj).items():
+                d[k] = _flatten(v, parents)
+            return d
+        return str(obj)
+    finally:
+        parents.discard(obj_id)
+
+
+def _get_state(obj):
+    # like pickle, an object can leave out some of its attributes with its own `__getstate__()`
+    getstate = getattr(type(obj), "__getstate__", None)
+    if getstate is not None and getstate is not getattr(object, "__getstate__", None):
+        state = obj.__getstate__()
+        if isinstance(state, dict):
+            return state
+    return obj.__dict__
+
+
+def _restore(data):
+    if isinstance(data, list):
+        return [_restore(v) for v in data]
+    if not isinstance(data, dict):
+        return data
+    tag = data.get(_type_key, None)
+    if tag is not None:
+        cls = _find_class(tag)
+        attrs = {k: _restore(v) for k, v in data.items() if k != _type_key}
+        if cls is None:
+            return attrs
+        # like jsonpickle, an instance is made without calling __init__()
+        obj = cls.__new__(cls)
+        obj.__dict__.update(attrs)
+        return obj
+    if len(data) == 1:
+        if _items_key in data:
+            return {_restore_key(k): _restore(v) for k, v in data[_items_key]}
+        if _tuple_key in data:
+            return tuple([_restore(v) for v in data[_tuple_key]])
+        if _set_key in data:
+            return set([_restore_key(v) for v in data[_set_key]])
+        if _bytes_key in data:
+            return base64.b64decode(data[_bytes_key])
+        if _ref_key in data:
+            return _find_class(data[_ref_key])
+    return {k: _restore(v) for k, v in data.items()}
+
+
+def _restore_key(data):
+    obj = _restore(data)
+    # dict keys and set items must be hashable
+    if isinstance(obj, list):
+        return tuple(obj)
+    return obj
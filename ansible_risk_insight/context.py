@@ -17,6 +17,9 @@
 import os
 import re
 import copy
+import functools
+from collections import ChainMap
+from collections.abc import Mapping
 from dataclasses import dataclass, field
 from pathlib import Path
 from .models import (
@@ -38,8 +41,15 @@ from .models import (
 
 p = Path(__file__).resolve().parent
 ansible_special_variables = [line.replace("\n", "") for line in open(p / "ansible_variables.txt", "r").read().splitlines()]
+_ansible_special_variable_set = set(ansible_special_variables)
 _special_var_value = "__ansible_special_variable__"
 variable_block_re = re.compile(r"{{[^}]+}}")
+_number_re = re.compile(r"[0-9].*")
+_filter_name_re = re.compile(r"\s*([\w.]+)")
+_lookup_name_re = re.compile(r"(?:lookup|query|q)\(['\"]([\w.]+)['\"]")
+# the number of distinct template strings whose analysis is kept by `parse_template()`
+template_cache_size = 8192
+_missing = object()
 
 
 def get_object(json_path, type, name, cache={}):
@@ -161,6 +171,106 @@ def flatten(var_dict: dict = {}, _prefix: str = ""):
     return flat_vars
 
 
+class VariableHistory(Mapping):
+    """
+    a persistent mapping of a variable name to the list of variables in the order they are set (or used).
+    `updated()` returns a new history that shares the unchanged names with this one through the parent chain,
+    so a history can be kept by every task as a snapshot without copying it.
+    the lists in a history must not be modified.
+    """
+
+    # the parent chain is flattened when it gets longer than this, to keep lookups cheap
+    max_chain_length = 32
+
+    def __init__(self, entries: dict = None, parent: "VariableHistory" = None):
+        self._entries = entries or {}
+        self._parent = parent
+        self._chain_length = parent._chain_length + 1 if parent is not None else 0
+
+    def updated(self, variables: list):
+        if not variables:
+            return self
+        entries = {}
+        for v in variables:
+            current = entries.get(v.name, None)
+            if current is None:
+                current = list(self.get(v.name, []))
+                entries[v.name] = current
+            current.append(v)
+        if self._chain_length >= self.max_chain_length:
+            flat = self._flatten()
+            flat.update(entries)
+            return VariableHistory(entries=flat)
+        return VariableHistory(entries=entries, parent=self)
+
+    def _flatten(self):
+        frames = []
+        frame = self
+        while frame is not None:
+            frames.append(frame._entries)
+            frame = frame._parent
+        flat = {}
+        # from the root so that the names are ordered by their first setting
+        for entries in frames[::-1]:
+            flat.update(entries)
+        return flat
+
+    def get(self, name, default=None):
+        frame = self
+        while frame is not None:
+            if name in frame._entries:
+                return frame._entries[name]
+            frame = frame._parent
+        return default
+
+    def keys(self):
+        return self._flatten().keys()
+
+    def values(self):
+        return self._flatten().values()
+
+    def items(self):
+        return self._flatten().items()
+
+    def __getitem__(self, name):
+        value = self.get(name, _missing)
+        if value is _missing:
+            raise KeyError(name)
+        return value
+
+    def __contains__(self, name):
+        return self.get(name, _missing) is not _missing
+
+    def __iter__(self):
+        return iter(self._flatten())
+
+    def __len__(self):
+        return len(self._flatten())
+
+    def __bool__(self):
+        frame = self
+        while frame is not None:
+            if frame._entries:
+                return True
+            frame = frame._parent
+        return False
+
+    def __eq__(self, other):
+        if isinstance(other, Mapping):
+            return self._flatten() == dict(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return repr(self._flatten())
+
+    def __getstate__(self):
+        # written as a plain dict of the names
+        return self._flatten()
+
+    def __setstate__(self, state):
+        self.__init__(entries=state)
+
+
 @dataclass
 class Context:
     keep_obj: bool = False
@@ -168,19 +278,25 @@ class Context:
     variables: dict = field(default_factory=dict)
     options: dict = field(default_factory=dict)
     inventories: list = field(default_factory=list)
-    role_defaults: list = field(default_factory=list)
-    role_vars: list = field(default_factory=list)
-    registered_vars: list = field(default_factory=list)
-    set_facts: list = field(default_factory=list)
+    role_defaults: set = field(default_factory=set)
+    role_vars: set = field(default_factory=set)
+    registered_vars: set = field(default_factory=set)
+    set_facts: set = field(default_factory=set)
     task_vars: list = field(default_factory=list)
 
     become: BecomeInfo = None
     module_defaults: dict = field(default_factory=dict)
 
-    var_set_history: dict = field(default_factory=dict)
-    var_use_history: dict = field(default_factory=dict)
+    var_set_history: VariableHistory = field(default_factory=VariableHistory)
+    var_use_history: VariableHistory = field(default_factory=VariableHistory)
 
     _flat_vars: dict = field(default_factory=dict)
+    # flattened variables of the inventories for all hosts
+    _inventory_vars: list = None
+    # resolve_variable() results of the variable names and the names each result depends on;
+    # a result is dropped when one of the names is set
+    _resolved_vars: dict = field(default_factory=dict)
+    _resolved_var_deps: dict = field(default_factory=dict)
 
     def add(self, obj, depth_lvl=0):
         _obj = None
@@ -195,17 +311,11 @@ class Context:
         if isinstance(_spec, Playbook):
             self.variables.update(_spec.variables)
             self.update_flat_vars(_spec.variables)
-            for key, val in _spec.variables.items():
-                current = self.var_set_history.get(key, [])
-                current.append(Variable(name=key, value=val, type=VariableType.PlaybookGroupVarsAll, setter=_spec.key))
-                self.var_set_history[key] = current
+            self._set_variables(_spec.variables, VariableType.PlaybookGroupVarsAll, _spec.key)
         elif isinstance(_spec, Play):
             self.variables.update(_spec.variables)
             self.update_flat_vars(_spec.variables)
-            for key, val in _spec.variables.items():
-                current = self.var_set_history.get(key, [])
-                current.append(Variable(name=key, value=val, type=VariableType.PlayVars, setter=_spec.key))
-                self.var_set_history[key] = current
+            self._set_variables(_spec.variables, VariableType.PlayVars, _spec.key)
             if _spec.become:
                 self.become = _spec.become
             if _spec.module_defaults:
@@ -216,17 +326,11 @@ class Context:
             self.variables.update(_spec.variables)
             self.update_flat_vars(_spec.variables)
             for var_name in _spec.default_variables:
-                self.role_defaults.append(var_name)
+                self.role_defaults.add(var_name)
             for var_name in _spec.variables:
-                self.role_vars.append(var_name)
-            for key, val in _spec.default_variables.items():
-                current = self.var_set_history.get(key, [])
-                current.append(Variable(name=key, value=val, type=VariableType.RoleDefaults, setter=_spec.key))
-                self.var_set_history[key] = current
-            for key, val in _spec.variables.items():
-                current = self.var_set_history.get(key, [])
-                current.append(Variable(name=key, value=val, type=VariableType.RoleVars, setter=_spec.key))
-                self.var_set_history[key] = current
+                self.role_vars.add(var_name)
+            self._set_variables(_spec.default_variables, VariableType.RoleDefaults, _spec.key)
+            self._set_variables(_spec.variables, VariableType.RoleVars, _spec.key)
         elif isinstance(_spec, Collection):
             self.variables.update(_spec.variables)
             self.update_flat_vars(_spec.variables)
@@ -241,21 +345,12 @@ class Context:
             self.variables.update(_spec.set_facts)
             self.update_flat_vars(_spec.set_facts)
             for var_name in _spec.registered_variables:
-                self.registered_vars.append(var_name)
+                self.registered_vars.add(var_name)
             for var_name in _spec.set_facts:
-                self.set_facts.append(var_name)
-            for key, val in _spec.variables.items():
-                current = self.var_set_history.get(key, [])
-                current.append(Variable(name=key, value=val, type=VariableType.TaskVars, setter=_spec.key))
-                self.var_set_history[key] = current
-            for key, val in _spec.registered_variables.items():
-                current = self.var_set_history.get(key, [])
-                current.append(Variable(name=key, value=val, type=VariableType.RegisteredVars, setter=_spec.key))
-                self.var_set_history[key] = current
-            for key, val in _spec.set_facts.items():
-                current = self.var_set_history.get(key, [])
-                current.append(Variable(name=key, value=val, type=VariableType.SetFacts, setter=_spec.key))
-                self.var_set_history[key] = current
+                self.set_facts.add(var_name)
+            self._set_variables(_spec.variables, VariableType.TaskVars, _spec.key)
+            self._set_variables(_spec.registered_variables, VariableType.RegisteredVars, _spec.key)
+            self._set_variables(_spec.set_facts, VariableType.SetFacts, _spec.key)
             if _spec.become:
                 self.become = _spec.become
             if _spec.module_defaults:
@@ -269,16 +364,40 @@ class Context:
             chain_node["obj"] = _obj
         self.chain.append(chain_node)
 
+    def _set_variables(self, variables: dict, v_type: VariableType, setter: str):
+        new_vars = [Variable(name=key, value=val, type=v_type, setter=setter) for key, val in variables.items()]
+        self.var_set_history = self.var_set_history.updated(new_vars)
+
+    def use_variables(self, variables: list):
+        self.var_use_history = self.var_use_history.updated(variables)
+
     def resolve_variable(self, var_name, resolve_history={}):
         if var_name in resolve_history:
             val = resolve_history[var_name].get("value", None)
             v_type = resolve_history[var_name].get("type", VariableType.Unknown)
             return val, v_type, resolve_history
 
+        if not resolve_history:
+            resolved = self._resolved_vars.get(var_name, None)
+            if resolved is None:
+                resolved = self._resolve_variable(var_name)
+                self._resolved_vars[var_name] = resolved
+                for dep_name in resolved[2]:
+                    self._resolved_var_deps.setdefault(dep_name, set()).add(var_name)
+            # callers keep the result in the annotations of each task, so each of them gets its own
+            # value list / dict and history dicts, as without the cache
+            val, v_type, _resolve_history = resolved
+            if isinstance(val, (list, dict)):
+                val = copy.copy(val)
+            return val, v_type, {k: copy.copy(v) for k, v in _resolve_history.items()}
+
+        return self._resolve_variable(var_name, resolve_history)
+
+    def _resolve_variable(self, var_name, resolve_history={}):
         _resolve_history = resolve_history.copy()
 
         v_type = None
-        if var_name in ansible_special_variables:
+        if var_name in _ansible_special_variable_set:
             v_type = VariableType.HostFacts
             return None, v_type, resolve_history
 
@@ -326,9 +445,11 @@ class Context:
                 return val, v_type, _resolve_history
 
         # TODO: consider group
-        inventory_for_all = [iv for iv in self.inventories if iv.inventory_type == InventoryType.GROUP_VARS_TYPE and iv.name == "all"]
-        for iv in inventory_for_all:
-            iv_var_dict = flatten(iv.variables)
+        if self._inventory_vars is None:
+            self._inventory_vars = [
+                flatten(iv.variables) for iv in self.inventories if iv.inventory_type == InventoryType.GROUP_VARS_TYPE and iv.name == "all"
+            ]
+        for iv_var_dict in self._inventory_vars:
             val = iv_var_dict.get(var_name, None)
 
             if val is not None:
@@ -385,8 +506,13 @@ class Context:
             else:
                 flat_key = f"{_prefix}{k}"
                 self._flat_vars.update({flat_key: v})
+            self._drop_resolved_vars(f"{_prefix}{k}")
         return
 
+    def _drop_resolved_vars(self, dep_name: str):
+        for var_name in self._resolved_var_deps.pop(dep_name, ()):
+            self._resolved_vars.pop(var_name, None)
+
     def chain_str(self):
         lines = []
         for chain_item in self.chain:
@@ -406,12 +532,14 @@ class Context:
         return Context(
             keep_obj=self.keep_obj,
             chain=copy.copy(self.chain),
-            variables=copy.copy(self.variables),
+            # the copy is updated with loop variables, so it is a new scope on top of the variables
+            variables=ChainMap({}, self.variables),
             options=copy.copy(self.options),
             inventories=copy.copy(self.inventories),
             role_defaults=copy.copy(self.role_defaults),
             role_vars=copy.copy(self.role_vars),
             registered_vars=copy.copy(self.registered_vars),
+            _inventory_vars=self._inventory_vars,
         )
         # return copy.deepcopy(self)
 
@@ -435,9 +563,30 @@ def resolved_vars_contains(resolved_vars, new_var):
     return False
 
 
-def resolve_module_options(context: Context, taskcall: TaskCall):
+class _LoopItems(list):
+    """
+    the variables per loop item; items over `max_items` are not kept (0 means no limit)
+    """
+
+    def __init__(self, max_items: int = 0):
+        super().__init__()
+        self.max_items = max_items
+
+    @property
+    def full(self):
+        return self.max_items > 0 and len(self) >= self.max_items
+
+    def append(self, item):
+        if self.full:
+            return
+        super().append(item)
+
+
+def resolve_module_options(context: Context, taskcall: TaskCall, max_loop_items: int = 0):
     resolved_vars = []
-    variables_in_loop = []
+    # module options are resolved only for the first `max_loop_items` items, but the variables
+    # in all the loop values are resolved so that the types of them are available
+    variables_in_loop = _LoopItems(max_loop_items)
     used_variables = {}
     if len(taskcall.spec.loop) == 0:
         variables_in_loop = [{}]
@@ -468,6 +617,8 @@ def resolve_module_options(context: Context, taskcall: TaskCall):
                     resolved_vars.append(new_var)
                 if isinstance(resolved_vars_in_item, list):
                     for vi in resolved_vars_in_item:
+                        if variables_in_loop.full:
+                            break
                         variables_in_loop.append(
                             {
                                 loop_key: vi,
@@ -477,6 +628,8 @@ def resolve_module_options(context: Context, taskcall: TaskCall):
                         )
                 elif isinstance(resolved_vars_in_item, dict):
                     for vi_key, vi_value in resolved_vars_in_item.items():
+                        if variables_in_loop.full:
+                            break
                         variables_in_loop.append(
                             {
                                 loop_key + ".key": vi_key,
@@ -519,6 +672,8 @@ def resolve_module_options(context: Context, taskcall: TaskCall):
                         )
                         continue
                     for vi in resolved_vars_in_item:
+                        if variables_in_loop.full:
+                            break
                         variables_in_loop.append(
                             {
                                 loop_key: vi,
@@ -693,21 +848,39 @@ def resolve_module_options(context: Context, taskcall: TaskCall):
 def extract_variable_names(txt):
     if not variable_block_re.search(txt):
         return []
+    return list(parse_template(txt))
+
+
+@functools.lru_cache(maxsize=template_cache_size)
+def parse_template(txt: str):
+    """
+    analyze the `{{ }}` blocks in a template string and return a tuple of dicts per block with
+    "original", "name", "default" (if the default is a variable), "filters" and "lookup" (if any).
+    the results are cached and shared by the callers, so they must not be modified.
+    """
     found_var_blocks = variable_block_re.findall(txt)
     blocks = []
     for b in found_var_blocks:
         parts = b.split("|")
         var_name = ""
         default_var_name = ""
+        lookup_name = ""
+        filters = []
         for i, p in enumerate(parts):
             if i == 0:
                 var_name = p.replace("{{", "").replace("}}", "").replace(" ", "")
+                matched = _lookup_name_re.search(var_name)
+                if matched:
+                    lookup_name = matched.group(1)
                 if "lookup(" in var_name and "first_found" in var_name:
                     var_name = var_name.split(",")[-1].replace(")", "")
             else:
+                matched = _filter_name_re.match(p)
+                if matched:
+                    filters.append(matched.group(1))
                 if "default(" in p and ")" in p:
                     default_var = p.replace("}}", "").replace("default(", "").replace(")", "").replace(" ", "")
-                    if not default_var.startswith('"') and not default_var.startswith("'") and not re.compile(r"[0-9].*").match(default_var):
+                    if not default_var.startswith('"') and not default_var.startswith("'") and not _number_re.match(default_var):
                         default_var_name = default_var
         tmp_b = {
             "original": b,
@@ -717,8 +890,16 @@ def extract_variable_names(txt):
         tmp_b["name"] = var_name
         if default_var_name != "":
             tmp_b["default"] = default_var_name
+        tmp_b["filters"] = tuple(filters)
+        if lookup_name != "":
+            tmp_b["lookup"] = lookup_name
         blocks.append(tmp_b)
-    return blocks
+    return tuple(blocks)
+
+
+def template_cache_stats():
+    info = parse_template.cache_info()
+    return {"hit": info.hits, "miss": info.misses, "size": info.currsize}
 
 
 def flatten_dict_vars(variables: dict, _prefix: str = "") -> dict:
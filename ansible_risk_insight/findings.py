@@ -15,15 +15,27 @@
 # limitations under the License.
 
 import os
-from copy import deepcopy
+import json
+import functools
+from copy import copy
 from dataclasses import dataclass, field
 import jsonpickle
+import ansible_risk_insight.codec as codec
 from .utils import (
     lock_file,
     unlock_file,
     remove_lock_file,
 )
 
+rule_result_stream_file_name = "rule_result.jsonl"
+# definitions of each type are saved to `<findings dir>/definitions/<type>.json`
+# so that they can be loaded independently of the other types
+definitions_dir_name = "definitions"
+# the key in root_definitions of a saved findings which lists the definition types saved separately
+split_definition_types_key = "split_definition_types"
+# byte offset and length of each object in the definitions files; {<type>: {<object key>: [<offset>, <length>]}}
+definition_offsets_file_name = "offsets.json"
+
 
 @dataclass
 class Findings:
@@ -47,13 +59,24 @@ class Findings:
         d["dependencies"] = self.dependencies
         return d
 
-    def dump(self, fpath=""):
-        f = deepcopy(self)
+    def dump(self, fpath="", split_definitions=False):
+        # a shallow copy is enough because only the top level attributes are replaced
+        f = copy(self)
         # omit report and summary_txt when the findings are saved
         # to reduce unnecessary file write
         f.report = {}
         f.summary_txt = ""
-        json_str = jsonpickle.encode(f, make_refs=False)
+        if fpath and split_definitions:
+            definitions = self.root_definitions.get("definitions", {})
+            definitions_dir = os.path.join(os.path.dirname(fpath), definitions_dir_name)
+            os.makedirs(definitions_dir, exist_ok=True)
+            offsets = {}
+            for type_name, objs in definitions.items():
+                offsets[type_name] = _write_definitions(os.path.join(definitions_dir, f"{type_name}.json"), objs)
+            with open(os.path.join(definitions_dir, definition_offsets_file_name), "w") as file:
+                json.dump(offsets, file)
+            f = f.without_definitions()
+        json_str = codec.encode(f)
         if fpath:
             lock = lock_file(fpath)
             try:
@@ -64,6 +87,18 @@ class Findings:
                 remove_lock_file(lock)
         return json_str
 
+    def without_definitions(self):
+        """
+        return a shallow copy whose definitions are replaced with the list of their types
+        so that the definitions can be saved separately
+        """
+        f = copy(self)
+        definitions = self.root_definitions.get("definitions", {})
+        f.root_definitions = dict(self.root_definitions)
+        f.root_definitions["definitions"] = {}
+        f.root_definitions[split_definition_types_key] = list(definitions.keys())
+        return f
+
     def save_rule_result(self, fpath=""):
         json_str = jsonpickle.encode(self.report.get("ari_result", {}), make_refs=False, unpicklable=False)
         if fpath:
@@ -75,9 +110,107 @@ class Findings:
         return json_str
 
     @staticmethod
-    def load(fpath="", json_str=""):
+    def load(fpath="", json_str="", definitions_loader=None):
+        """
+        `definitions_loader` is a function to load definitions saved separately by the type name.
+        it is not needed if `fpath` is specified.
+        """
         if fpath:
             with open(fpath, "r") as file:
                 json_str = file.read()
-        findings = jsonpickle.decode(json_str)
+            if definitions_loader is None:
+                definitions_loader = functools.partial(Findings.load_definitions, fpath)
+        findings = codec.decode(json_str)
+        if definitions_loader and isinstance(findings, Findings):
+            split_types = findings.root_definitions.pop(split_definition_types_key, None)
+            if split_types is not None:
+                definitions = {}
+                for type_name in split_types:
+                    definitions[type_name] = definitions_loader(type_name) or []
+                findings.root_definitions["definitions"] = definitions
         return findings
+
+    @staticmethod
+    def load_definitions(fpath: str, type_name: str):
+        """
+        load definitions of the type from a findings saved with `split_definitions=True`.
+        return None if they are not saved separately.
+        """
+        type_path = os.path.join(os.path.dirname(fpath), definitions_dir_name, f"{type_name}.json")
+        if not os.path.exists(type_path):
+            return None
+        with open(type_path, "r") as file:
+            return codec.decode(file.read())
+
+    @staticmethod
+    def load_definition_offsets(fpath: str):
+        """
+        load the byte offsets of objects in the definitions files of a findings.
+        return None if the findings does not have them.
+        """
+        offsets_path = os.path.join(os.path.dirname(fpath), definitions_dir_name, definition_offsets_file_name)
+        if not os.path.exists(offsets_path):
+            return None
+        with open(offsets_path, "r") as file:
+            return json.load(file)
+
+    @staticmethod
+    def load_definition_record(fpath: str, type_name: str, offset: int, length: int):
+        """
+        load a single object at the offset of the definitions file without decoding the others
+        """
+        type_path = os.path.join(os.path.dirname(fpath), definitions_dir_name, f"{type_name}.json")
+        if not os.path.exists(type_path):
+            return None
+        with open(type_path, "rb") as file:
+            file.seek(offset)
+            record = file.read(length)
+        return codec.decode_record(record)
+
+
+def _write_definitions(fpath: str, objs: list):
+    # objects are written one per line to make a list, so the whole file can still be decoded at once
+    # while a single object can be read by its offset
+    offsets = {}
+    with open(fpath, "wb") as file:
+        pos = file.write(codec.document_prefix().encode("utf-8"))
+        for i, obj in enumerate(objs):
+            pos += file.write(b"[\n" if i == 0 else b",\n")
+            record = codec.encode_record(obj).encode("utf-8")
+            key = getattr(obj, "key", "")
+            if key and key not in offsets:
+                offsets[key] = [pos, len(record)]
+            pos += file.write(record)
+        file.write(b"\n]}\n" if objs else b"[]}\n")
+    return offsets
+
+
+@dataclass
+class RuleResultWriter:
+    """
+    append target results to a JSON lines file one by one, so that the entire rule result does not have to be kept in memory
+    """
+
+    fpath: str = ""
+    count: int = 0
+
+    def __post_init__(self):
+        if not self.fpath:
+            raise ValueError("file path must be a non-empty value")
+        rule_result_dir = os.path.dirname(self.fpath)
+        if rule_result_dir and not os.path.exists(rule_result_dir):
+            os.makedirs(rule_result_dir, exist_ok=True)
+        # truncate the result of the previous scan
+        open(self.fpath, "w").close()
+
+    def write(self, target_result):
+        json_str = jsonpickle.encode(target_result, make_refs=False, unpicklable=False)
+        self.write_line(json_str)
+        return
+
+    def write_line(self, json_str: str):
+        # write a target result which is already encoded
+        with open(self.fpath, "a") as file:
+            file.write(json_str + "\n")
+        self.count += 1
+        return
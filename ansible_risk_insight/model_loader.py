@@ -32,6 +32,7 @@ except Exception:
 import ansible_risk_insight.logger as logger
 from ansible_risk_insight.utils import parse_bool
 from .safe_glob import safe_glob
+from .profiler import profile_load
 from .models import (
     ExecutableType,
     Inventory,
@@ -773,6 +774,7 @@ def load_roleinplay(
     return ripObj
 
 
+@profile_load("playbook")
 def load_playbook(path="", yaml_str="", role_name="", collection_name="", basedir="", skip_playbook_format_error=True, skip_task_format_error=True):
     pbObj = Playbook()
     fullpath = ""
@@ -931,6 +933,7 @@ def load_playbooks(
     return playbooks
 
 
+@profile_load("role")
 def load_role(
     path,
     name="",
@@ -1324,6 +1327,7 @@ def load_installed_roles(installed_roles_path):
     return roles
 
 
+@profile_load("module", path_arg="module_file_path")
 def load_module(module_file_path, collection_name="", role_name="", basedir="", use_ansible_doc=True, module_specs={}):
     moduleObj = Module()
     if module_file_path == "":
@@ -1670,6 +1674,7 @@ def load_task(
     return taskObj
 
 
+@profile_load("taskfile")
 def load_taskfile(path, yaml_str="", role_name="", collection_name="", basedir="", skip_task_format_error=True):
     tfObj = TaskFile()
     fullpath = ""
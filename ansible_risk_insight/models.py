@@ -23,7 +23,7 @@ from ruamel.yaml.scalarstring import DoubleQuotedScalarString
 
 from copy import deepcopy
 import json
-import jsonpickle
+import ansible_risk_insight.codec as codec
 from rapidfuzz.distance import Levenshtein
 import ansible_risk_insight.yaml as ariyaml
 from ansible_risk_insight.utils import parse_bool
@@ -66,12 +66,12 @@ class JSONSerializable(object):
         return self.to_json()
 
     def to_json(self):
-        return jsonpickle.encode(self, make_refs=False)
+        return codec.encode(self)
 
     @classmethod
     def from_json(cls, json_str):
         instance = cls()
-        loaded = jsonpickle.decode(json_str)
+        loaded = codec.decode(json_str)
         instance.__dict__.update(loaded.__dict__)
         return instance
 
@@ -152,14 +152,14 @@ class ObjectList(JSONSerializable):
         return self.to_json(fpath=fpath)
 
     def to_json(self, fpath=""):
-        lines = [jsonpickle.encode(obj, make_refs=False) for obj in self.items]
+        lines = [codec.encode(obj) for obj in self.items]
         json_str = "\n".join(lines)
         if fpath != "":
             open(fpath, "w").write(json_str)
         return json_str
 
     def to_one_line_json(self):
-        return jsonpickle.encode(self.items, make_refs=False)
+        return codec.encode(self.items)
 
     @classmethod
     def from_json(cls, json_str="", fpath=""):
@@ -167,7 +167,7 @@ class ObjectList(JSONSerializable):
         if fpath != "":
             json_str = open(fpath, "r").read()
         lines = json_str.splitlines()
-        items = [jsonpickle.decode(obj_str) for obj_str in lines]
+        items = [codec.decode(obj_str) for obj_str in lines]
         instance.items = items
         instance._update_dict()
         return instance
@@ -1473,16 +1473,39 @@ class MutableContent(object):
     _yaml: str = ""
     _task_spec: Task = None
 
+    # true if `_task_spec` may be shared with other contents; it is copied before the first change.
+    # this is not a field and it is not serialized, so a content loaded from a file copies it too
+    _shared = True
+
     @staticmethod
     def from_task_spec(task_spec):
         mc = MutableContent(
             _yaml=task_spec.yaml_lines,
             _task_spec=deepcopy(task_spec),
         )
+        mc._shared = False
         return mc
 
+    def shared_copy(self):
+        """
+        return a content which shares the task spec with this one until either of them is changed
+        """
+        self._shared = True
+        return MutableContent(_yaml=self._yaml, _task_spec=self._task_spec)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop("_shared", None)
+        return state
+
+    def _copy_on_write(self):
+        if self._shared:
+            self._task_spec = deepcopy(self._task_spec)
+            self._shared = False
+
     def set_task_name(self, task_name: str):
         # if `name` is None or empty string, Task.yaml() won't output the field
+        self._copy_on_write()
         self._task_spec.name = task_name
         self._yaml = self._task_spec.yaml()
         self._task_spec.yaml_lines = self._yaml
@@ -1493,12 +1516,14 @@ class MutableContent(object):
 
     def omit_task_name(self):
         # if `name` is None or empty string, Task.yaml() won't output the field
+        self._copy_on_write()
         self._task_spec.name = None
         self._yaml = self._task_spec.yaml()
         self._task_spec.yaml_lines = self._yaml
         return self
 
     def set_module_name(self, module_name):
+        self._copy_on_write()
         original_module = deepcopy(self._task_spec.module)
         self._task_spec.module = module_name
         self._yaml = self._task_spec.yaml(original_module=original_module)
@@ -1506,6 +1531,7 @@ class MutableContent(object):
         return self
 
     def replace_key(self, old_key: str, new_key: str):
+        self._copy_on_write()
         if old_key in self._task_spec.options:
             value = self._task_spec.options[old_key]
             self._task_spec.options.pop(old_key)
@@ -1515,6 +1541,7 @@ class MutableContent(object):
         return self
 
     def replace_value(self, old_value: str, new_value: str):
+        self._copy_on_write()
         original_new_value = deepcopy(new_value)
         need_restore = False
         keys_to_be_restored = []
@@ -1537,6 +1564,7 @@ class MutableContent(object):
         return self
 
     def remove_key(self, key):
+        self._copy_on_write()
         if key in self._task_spec.options:
             self._task_spec.options.pop(key)
         self._yaml = self._task_spec.yaml()
@@ -1544,6 +1572,7 @@ class MutableContent(object):
         return self
 
     def set_new_module_arg_key(self, key, value):
+        self._copy_on_write()
         original_value = deepcopy(value)
         need_restore = False
         if isinstance(value, str):
@@ -1557,6 +1586,7 @@ class MutableContent(object):
         return self
 
     def remove_module_arg_key(self, key):
+        self._copy_on_write()
         if key in self._task_spec.module_options:
             self._task_spec.module_options.pop(key)
         self._yaml = self._task_spec.yaml()
@@ -1564,6 +1594,7 @@ class MutableContent(object):
         return self
 
     def replace_module_arg_key(self, old_key: str, new_key: str):
+        self._copy_on_write()
         if old_key in self._task_spec.module_options:
             value = self._task_spec.module_options[old_key]
             self._task_spec.module_options.pop(old_key)
@@ -1573,6 +1604,7 @@ class MutableContent(object):
         return self
 
     def replace_module_arg_value(self, key: str = "", old_value: any = None, new_value: any = None):
+        self._copy_on_write()
         original_new_value = deepcopy(new_value)
         need_restore = False
         keys_to_be_restored = []
@@ -1613,9 +1645,11 @@ class MutableContent(object):
         )
         self._yaml = yaml_lines
         self._task_spec = new_task
+        self._shared = False
         return self
 
     def replace_module_arg_with_dict(self, new_dict: dict):
+        self._copy_on_write()
         self._task_spec.module_options = new_dict
         self._yaml = self._task_spec.yaml()
         return self
@@ -1629,6 +1663,8 @@ class MutableContent(object):
     # spec.options, spec.module_options in a fixed format
     # NOTE: this will lose comments and indentations in the original YAML
     def formatted_yaml(self):
+        # Task.formatted_yaml() changes the module options to quoted strings
+        self._copy_on_write()
         return self._task_spec.formatted_yaml()
 
 
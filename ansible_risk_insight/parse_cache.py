@@ -0,0 +1,209 @@
+# -*- mode:python; coding:utf-8 -*-
+
+# Copyright (c) 2022 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import json
+import hashlib
+import tempfile
+from dataclasses import dataclass
+
+from .loader import get_loader_version
+import ansible_risk_insight.codec as codec
+import ansible_risk_insight.logger as logger
+
+
+parse_cache_dir_name = "parse_cache"
+parse_cache_file_ext = ".json"
+
+
+def _file_digest(fpath: str):
+    h = hashlib.sha256()
+    with open(fpath, "rb") as file:
+        h.update(file.read())
+    return h.hexdigest()
+
+
+def _dir_digest(dir_path: str):
+    h = hashlib.sha256()
+    for root, dirs, files in os.walk(dir_path):
+        dirs.sort()
+        for fname in sorted(files):
+            fpath = os.path.join(root, fname)
+            h.update(os.path.relpath(fpath, dir_path).encode("utf-8"))
+            try:
+                h.update(_file_digest(fpath).encode("utf-8"))
+            except Exception:
+                # unreadable files (e.g. broken symlinks) are ignored by loaders too
+                continue
+    return h.hexdigest()
+
+
+def _resolve_path(path: str, basedir: str):
+    # the same resolution as `load_playbook()`, `load_taskfile()` and `load_role()` in model_loader
+    fullpath = ""
+    if os.path.exists(path) and path != "" and path != ".":
+        fullpath = path
+    if os.path.exists(os.path.join(basedir, path)):
+        fullpath = os.path.normpath(os.path.join(basedir, path))
+    return fullpath
+
+
+@dataclass
+class ParseCache(object):
+    """
+    on-disk cache of objects returned by the model loader functions.
+    an entry is keyed by the content hash of the loaded file (or role directory), the loader version
+    and the arguments of the loader function, so an entry is never used for changed content.
+    """
+
+    cache_dir: str = ""
+    # the cache is trimmed to this size by removing the least recently used entries
+    max_size_mb: int = 1024
+
+    loader_version: str = ""
+
+    hits: int = 0
+    misses: int = 0
+
+    # the size of entries written since the last eviction check
+    _written_size: int = 0
+
+    def __post_init__(self):
+        if not self.loader_version:
+            self.loader_version = get_loader_version()
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def load(self, loader_func, path: str = "", yaml_str: str = "", basedir: str = "", is_dir: bool = False, **kwargs):
+        """
+        return the cached result of `loader_func(path=path, yaml_str=yaml_str, basedir=basedir, **kwargs)`
+        or call the loader function and save the result to the cache
+        """
+        cache_key = self.make_key(loader_func, path, yaml_str, basedir, is_dir, **kwargs)
+        if not cache_key:
+            return self._call(loader_func, path, yaml_str, basedir, **kwargs)
+
+        cache_path = os.path.join(self.cache_dir, cache_key[:2], cache_key + parse_cache_file_ext)
+        obj = self._read(cache_path)
+        if obj is not None:
+            self.hits += 1
+            return obj
+
+        self.misses += 1
+        obj = self._call(loader_func, path, yaml_str, basedir, **kwargs)
+        self._write(cache_path, obj)
+        return obj
+
+    def make_key(self, loader_func, path: str = "", yaml_str: str = "", basedir: str = "", is_dir: bool = False, **kwargs):
+        if not self.cache_dir:
+            return ""
+        content_digest = ""
+        if yaml_str:
+            content_digest = hashlib.sha256(yaml_str.encode("utf-8")).hexdigest()
+        else:
+            fullpath = _resolve_path(path, basedir)
+            if not fullpath:
+                return ""
+            try:
+                if is_dir:
+                    content_digest = _dir_digest(fullpath)
+                else:
+                    content_digest = _file_digest(fullpath)
+            except Exception:
+                return ""
+        # object keys are made from the path, the role name and the collection name,
+        # so these arguments are a part of the cache key in addition to the content digest
+        key_data = {
+            "loader": loader_func.__name__,
+            "loader_version": self.loader_version,
+            "content": content_digest,
+            "path": path,
+            "basedir": basedir,
+            "kwargs": kwargs,
+        }
+        return hashlib.sha256(json.dumps(key_data, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+    def evict(self):
+        if not self.cache_dir or not os.path.exists(self.cache_dir):
+            return
+        entries = []
+        total_size = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for fname in files:
+                if not fname.endswith(parse_cache_file_ext):
+                    continue
+                fpath = os.path.join(root, fname)
+                try:
+                    stat = os.stat(fpath)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, fpath))
+                total_size += stat.st_size
+
+        max_size = self.max_size_mb * 1024 * 1024
+        if total_size <= max_size:
+            return
+        # remove the least recently used entries first
+        entries = sorted(entries)
+        removed = 0
+        for _, size, fpath in entries:
+            if total_size <= max_size:
+                break
+            try:
+                os.remove(fpath)
+            except FileNotFoundError:
+                pass
+            total_size -= size
+            removed += 1
+        logger.debug(f"removed {removed} parse cache entries")
+
+    def _call(self, loader_func, path, yaml_str, basedir, **kwargs):
+        if yaml_str:
+            kwargs["yaml_str"] = yaml_str
+        return loader_func(path=path, basedir=basedir, **kwargs)
+
+    def _read(self, cache_path: str):
+        if not os.path.exists(cache_path):
+            return None
+        try:
+            with open(cache_path, "r") as file:
+                obj = codec.decode(file.read())
+            # update mtime so that the eviction can find the least recently used entries
+            os.utime(cache_path)
+            return obj
+        except Exception as exc:
+            logger.debug(f"failed to read the parse cache {cache_path}: {exc}")
+            return None
+
+    def _write(self, cache_path: str, obj):
+        try:
+            cache_str = codec.encode(obj)
+            cache_dir = os.path.dirname(cache_path)
+            os.makedirs(cache_dir, exist_ok=True)
+            # write to a temporary file and rename it so that other processes never read a partial entry
+            fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "w") as file:
+                file.write(cache_str)
+            os.replace(tmp_path, cache_path)
+        except Exception as exc:
+            logger.debug(f"failed to write the parse cache {cache_path}: {exc}")
+            return
+
+        # the cache size is checked only after a certain amount of writes because it needs to walk the cache dir
+        self._written_size += len(cache_str)
+        if self._written_size > self.max_size_mb * 1024 * 1024 / 10:
+            self._written_size = 0
+            self.evict()
@@ -15,7 +15,6 @@
 # limitations under the License.
 
 import os
-import copy
 import ansible_risk_insight.logger as logger
 from .models import (
     Collection,
@@ -48,11 +47,17 @@ from .utils import (
 
 
 class Parser:
-    def __init__(self, do_save=False, use_ansible_doc=True, skip_playbook_format_error=True, skip_task_format_error=True):
+    def __init__(self, do_save=False, use_ansible_doc=True, skip_playbook_format_error=True, skip_task_format_error=True, parse_cache=None):
         self.do_save = do_save
         self.use_ansible_doc = use_ansible_doc
         self.skip_playbook_format_error = skip_playbook_format_error
         self.skip_task_format_error = skip_task_format_error
+        self.parse_cache = parse_cache
+
+    def _load(self, loader_func, is_dir=False, **kwargs):
+        if self.parse_cache:
+            return self.parse_cache.load(loader_func, is_dir=is_dir, **kwargs)
+        return loader_func(**kwargs)
 
     def run(self, load_data=None, load_json_path="", collection_name_of_project=""):
         ld = Load()
@@ -242,7 +247,9 @@ class Parser:
         roles = []
         for role_path in ld.roles:
             try:
-                r = load_role(
+                r = self._load(
+                    load_role,
+                    is_dir=True,
                     path=role_path,
                     collection_name=collection_name,
                     basedir=basedir,
@@ -274,7 +281,8 @@ class Parser:
                 abs_path = os.path.join(basedir, taskfile_path)
                 if abs_path in loaded_absolute_path_list:
                     continue
-                tf = load_taskfile(
+                tf = self._load(
+                    load_taskfile,
                     path=taskfile_path,
                     yaml_str=ld.taskfile_yaml,
                     role_name=role_name,
@@ -295,7 +303,8 @@ class Parser:
         for playbook_path in ld.playbooks:
             p = None
             try:
-                p = load_playbook(
+                p = self._load(
+                    load_playbook,
                     path=playbook_path,
                     yaml_str=ld.playbook_yaml,
                     role_name=role_name,
@@ -514,10 +523,9 @@ class Parser:
 
 
 def _dump_object_list(obj_list, output_path):
-    tmp_obj_list = copy.deepcopy(obj_list)
     lines = []
-    for i in range(len(tmp_obj_list)):
-        lines.append(tmp_obj_list[i].dump())
+    for i in range(len(obj_list)):
+        lines.append(obj_list[i].dump())
     open(output_path, "w").write("\n".join(lines))
     return
 
@@ -0,0 +1,196 @@
+# -*- mode:python; coding:utf-8 -*-
+
+# Copyright (c) 2022 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import sys
+import json
+import time
+import cProfile
+import functools
+from copy import deepcopy
+from dataclasses import dataclass, field
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+profile_file_name = "profile.json"
+cprofile_file_name = "profile.pstats"
+
+# the profiler of the running scan; model loader, analyzer and risk detector record their details to this
+_current = None
+
+
+def get_profiler():
+    return _current
+
+
+def get_peak_rss_kb():
+    if resource is None:
+        return 0
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    if sys.platform == "darwin":
+        peak_rss = int(peak_rss / 1024)
+    return peak_rss
+
+
+def profile_load(file_type: str, path_arg: str = "path"):
+    """
+    decorator for model loader functions to record the parse time per file while profiling
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = _current
+            if profiler is None:
+                return func(*args, **kwargs)
+            path = kwargs.get(path_arg, args[0] if args else "")
+            start = time.time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler.record_file(file_type, path, time.time() - start)
+
+        return wrapper
+
+    return decorator
+
+
+def _add_record(records: dict, name: str, duration: float):
+    record = records.setdefault(name, {"count": 0, "duration": 0.0})
+    record["count"] += 1
+    record["duration"] += duration
+    return record
+
+
+def _sort_records(records: dict):
+    sorted_records = {}
+    for name, record in sorted(records.items(), key=lambda x: x[1]["duration"], reverse=True):
+        record = record.copy()
+        record["duration"] = round(record["duration"], 6)
+        sorted_records[name] = record
+    return sorted_records
+
+
+@dataclass
+class Profiler(object):
+    """
+    collect the details of a scan: stage durations with peak RSS, parse time per file,
+    time per annotator and per rule, and hits/misses of the RAM cache and the template cache.
+    """
+
+    use_cprofile: bool = False
+
+    stages: dict = field(default_factory=dict)
+    files: dict = field(default_factory=dict)
+    annotators: dict = field(default_factory=dict)
+    rules: dict = field(default_factory=dict)
+    ram_cache: dict = field(default_factory=dict)
+    template_cache: dict = field(default_factory=dict)
+
+    _stage_begin: dict = field(default_factory=dict)
+    _ram_cache_stats: dict = None
+    _ram_cache_stats_at_start: dict = field(default_factory=dict)
+    # a function which returns the current counters of the template cache
+    _template_cache_stats: object = None
+    _template_cache_stats_at_start: dict = field(default_factory=dict)
+    _cprofile: cProfile.Profile = None
+
+    def start(self, ram_cache_stats: dict = None, template_cache_stats=None):
+        global _current
+        if _current is not None and _current is not self:
+            _current.stop()
+        _current = self
+        if ram_cache_stats is not None:
+            self._ram_cache_stats = ram_cache_stats
+            self._ram_cache_stats_at_start = deepcopy(ram_cache_stats)
+        if template_cache_stats is not None:
+            self._template_cache_stats = template_cache_stats
+            self._template_cache_stats_at_start = template_cache_stats()
+        if self.use_cprofile:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+    def stop(self):
+        global _current
+        if self._cprofile:
+            self._cprofile.disable()
+        if self._ram_cache_stats is not None:
+            self.ram_cache = self._diff_ram_cache_stats()
+        if self._template_cache_stats is not None:
+            stats = self._template_cache_stats()
+            at_start = self._template_cache_stats_at_start
+            self.template_cache = {
+                "hit": stats["hit"] - at_start.get("hit", 0),
+                "miss": stats["miss"] - at_start.get("miss", 0),
+                "size": stats["size"],
+            }
+        if _current is self:
+            _current = None
+
+    def begin_stage(self, name: str):
+        self._stage_begin[name] = time.time()
+
+    def end_stage(self, name: str):
+        begin = self._stage_begin.pop(name, None)
+        if begin is None:
+            return
+        self.stages[name] = {
+            "duration": round(time.time() - begin, 6),
+            # the peak RSS of this process until the end of this stage
+            "peak_rss_kb": get_peak_rss_kb(),
+        }
+
+    def record_file(self, file_type: str, path: str, duration: float):
+        record = _add_record(self.files, path, duration)
+        record["type"] = file_type
+
+    def record_annotator(self, name: str, duration: float):
+        _add_record(self.annotators, name, duration)
+
+    def record_rule(self, rule_id: str, duration: float, matched: bool = False):
+        record = _add_record(self.rules, rule_id, duration)
+        record["matched"] = record.get("matched", 0) + (1 if matched else 0)
+
+    def _diff_ram_cache_stats(self):
+        diff = {}
+        for name, stats in self._ram_cache_stats.items():
+            at_start = self._ram_cache_stats_at_start.get(name, {})
+            diff[name] = {k: v - at_start.get(k, 0) for k, v in stats.items()}
+        return diff
+
+    def to_dict(self):
+        return {
+            "stages": self.stages,
+            "peak_rss_kb": get_peak_rss_kb(),
+            "files": _sort_records(self.files),
+            "annotators": _sort_records(self.annotators),
+            "rules": _sort_records(self.rules),
+            "ram_cache": self.ram_cache,
+            "template_cache": self.template_cache,
+        }
+
+    def dump(self, out_dir: str):
+        if not os.path.exists(out_dir):
+            os.makedirs(out_dir, exist_ok=True)
+        with open(os.path.join(out_dir, profile_file_name), "w") as file:
+            json.dump(self.to_dict(), file, indent=2)
+        if self._cprofile:
+            self._cprofile.dump_stats(os.path.join(out_dir, cprofile_file_name))
@@ -0,0 +1,153 @@
+# -*- mode:python; coding:utf-8 -*-
+
+# Copyright (c) 2022 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import sys
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+_atomic_types = (str, bytes, int, float, bool, type(None))
+
+
+def estimate_size(obj):
+    """
+    approximate the memory size of the object in bytes by summing `sys.getsizeof()` of all objects reachable from it.
+    an object referred to multiple times is counted once.
+    """
+    size = 0
+    seen = set()
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        if id(o) in seen:
+            continue
+        seen.add(id(o))
+        try:
+            size += sys.getsizeof(o)
+        except TypeError:
+            continue
+        if isinstance(o, _atomic_types):
+            continue
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset)):
+            stack.extend(o)
+        elif hasattr(o, "__dict__"):
+            stack.append(o.__dict__)
+    return size
+
+
+@dataclass
+class LRUCache(object):
+    """
+    in-memory LRU cache shared by the searches of RAMClient.
+    entries are grouped by namespace (e.g. "module_search") and the least recently used entry of any namespace
+    is evicted on insert while the total estimated size exceeds `max_size_mb`.
+    """
+
+    # 0 means no limit
+    max_size_mb: int = 512
+
+    size: int = 0
+    # counters per namespace; e.g. {"module_search": {"hit": 3, "miss": 1, "eviction": 0}}
+    stats: dict = field(default_factory=dict)
+
+    _entries: OrderedDict = field(default_factory=OrderedDict)
+    _lock: threading.RLock = field(default_factory=threading.RLock)
+
+    def __getstate__(self):
+        # cached objects are not sent to other processes
+        state = self.__dict__.copy()
+        state["_entries"] = OrderedDict()
+        state["size"] = 0
+        state["_lock"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    @property
+    def max_size(self):
+        return self.max_size_mb * 1024 * 1024
+
+    def lookup(self, namespace: str, key):
+        """
+        return a tuple of (hit, value); `value` is None if not cached
+        """
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is None:
+                self._count(namespace, "miss")
+                return False, None
+            self._entries.move_to_end((namespace, key))
+            self._count(namespace, "hit")
+            return True, entry[0]
+
+    def get(self, namespace: str, key, default=None):
+        hit, value = self.lookup(namespace, key)
+        return value if hit else default
+
+    def put(self, namespace: str, key, value, size: int = 0):
+        """
+        cache the value and evict the least recently used entries to keep the total size in the budget.
+        if `size` is not specified, it is estimated with `estimate_size()`.
+        """
+        if not size:
+            size = estimate_size(value)
+        with self._lock:
+            self._pop((namespace, key))
+            if self.max_size and size > self.max_size:
+                # this never fits in the budget, so it is not cached
+                self._count(namespace, "eviction")
+                return False
+            self._entries[(namespace, key)] = (value, size)
+            self.size += size
+            while self.max_size and self.size > self.max_size:
+                oldest_key = next(iter(self._entries))
+                self._pop(oldest_key)
+                self._count(oldest_key[0], "eviction")
+        return True
+
+    def keys(self, namespace: str):
+        with self._lock:
+            return [key for _namespace, key in self._entries if _namespace == namespace]
+
+    def namespace_size(self, namespace: str):
+        with self._lock:
+            return sum([size for (_namespace, _), (_, size) in self._entries.items() if _namespace == namespace])
+
+    def clear(self, namespace: str = ""):
+        with self._lock:
+            if not namespace:
+                self._entries.clear()
+                self.size = 0
+                return
+            for key in [k for k in self._entries if k[0] == namespace]:
+                self._pop(key)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+    def _count(self, namespace: str, name: str):
+        stats = self.stats.setdefault(namespace, {"hit": 0, "miss": 0, "eviction": 0})
+        stats[name] += 1
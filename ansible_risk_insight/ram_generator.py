@@ -23,6 +23,7 @@ import datetime
 import threading
 
 from .scanner import ARIScanner, config
+from .risk_assessment_model import RAMClient
 
 
 class RiskAssessmentModelGenerator(object):
@@ -64,8 +65,11 @@ class RiskAssessmentModelGenerator(object):
             read_ram = False
             write_ram = False
 
+        # each worker appends indices to its own journal instead of waiting for the index database
+        ram_client = RAMClient(root_dir=config.data_dir, cache_max_size_mb=config.ram_cache_max_size_mb, index_journal=True)
         self._scanner = ARIScanner(
             root_dir=config.data_dir,
+            ram_client=ram_client,
             silent=True,
             use_ansible_doc=use_ansible_doc,
             persist_dependency_cache=True,
@@ -90,13 +94,20 @@ class RiskAssessmentModelGenerator(object):
             _type, _name = target_info
             input_list.append((i, num, _type, _name))
 
+        # journals left by an interrupted run
+        self._scanner.ram_client.compact_index()
+
         self.start = time.time()
 
-        if self._parallel:
-            joblib.Parallel(n_jobs=-1)(joblib.delayed(self.scan)(i, num, _type, _name) for (i, num, _type, _name) in input_list)
-        else:
-            for i, num, _type, _name in input_list:
-                self.scan(i, num, _type, _name)
+        try:
+            if self._parallel:
+                joblib.Parallel(n_jobs=-1)(joblib.delayed(self.scan)(i, num, _type, _name) for (i, num, _type, _name) in input_list)
+            else:
+                for i, num, _type, _name in input_list:
+                    self.scan(i, num, _type, _name)
+        finally:
+            added = self._scanner.ram_client.compact_index()
+            print(f"{added} index entries are registered")
 
     def scan(self, i, num, type, name):
         elapsed = round(time.time() - self.start, 2)
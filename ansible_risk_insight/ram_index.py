@@ -0,0 +1,369 @@
+# -*- mode:python; coding:utf-8 -*-
+
+# Copyright (c) 2022 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import json
+import glob
+import sqlite3
+import threading
+from dataclasses import dataclass, field
+
+import ansible_risk_insight.logger as logger
+
+ram_index_db_name = "index.db"
+# index entries registered by each worker process are appended to `<indices dir>/journal/<pid>.jsonl` in the journal mode
+ram_index_journal_dir_name = "journal"
+ram_index_journal_file_ext = ".jsonl"
+
+module_index_table = "modules"
+role_index_table = "roles"
+taskfile_index_table = "taskfiles"
+action_group_index_table = "action_groups"
+object_index_table = "objects"
+catalog_table = "catalog"
+packed_file_table = "packed_files"
+
+# columns of each index table; the first column is the lookup key of the index.
+# a row is unique by all columns except the ones in `_non_unique_columns` so that registration can be an upsert
+_index_columns = {
+    module_index_table: ["short_name", "fqcn", "type", "name", "version", "hash", "deprecated"],
+    role_index_table: ["fqcn", "type", "name", "version", "hash"],
+    taskfile_index_table: ["key", "type", "name", "version", "hash"],
+    action_group_index_table: ["group_name", "group_modules", "type", "name", "version", "hash"],
+    # the location of each object in the definitions files of findings; `file` is the definition type such as "tasks"
+    object_index_table: ["key", "type", "name", "version", "hash", "file", "offset", "length"],
+    # findings registered to RAM; `path` is relative to the RAM root dir and `size` is in bytes
+    catalog_table: ["name", "type", "version", "hash", "path", "scan_time", "size"],
+    # files stored in a RAM pack; `offset` and `length` are the byte range of the records of the file in the pack
+    packed_file_table: ["path", "offset", "length", "count"],
+}
+_non_unique_columns = {
+    module_index_table: ["deprecated"],
+    action_group_index_table: ["group_modules"],
+    object_index_table: ["file", "offset", "length"],
+    catalog_table: ["path", "scan_time", "size"],
+    packed_file_table: ["offset", "length", "count"],
+}
+# JSON index files written by older versions; they are imported when the database is created
+_legacy_index_files = {
+    module_index_table: "module_index.json",
+    role_index_table: "role_index.json",
+    taskfile_index_table: "taskfile_index.json",
+    action_group_index_table: "action_group_index.json",
+}
+# additional lookup columns other than the index key
+_lookup_columns = {
+    module_index_table: ["fqcn"],
+}
+_json_columns = ["group_modules"]
+_bool_columns = ["deprecated"]
+_int_columns = ["offset", "length", "size", "count"]
+
+
+def _create_table_sql(table: str):
+    columns = _index_columns[table]
+    unique_columns = [c for c in columns if c not in _non_unique_columns.get(table, [])]
+    column_defs = ", ".join([f"\"{c}\" TEXT NOT NULL DEFAULT ''" for c in columns])
+    unique_def = ", ".join([f'"{c}"' for c in unique_columns])
+    sql_list = [f"CREATE TABLE IF NOT EXISTS {table} (id INTEGER PRIMARY KEY AUTOINCREMENT, {column_defs}, UNIQUE({unique_def}))"]
+    for c in [columns[0]] + _lookup_columns.get(table, []):
+        sql_list.append(f'CREATE INDEX IF NOT EXISTS {table}_{c} ON {table} ("{c}")')
+    return sql_list
+
+
+def _to_row(table: str, entry: dict):
+    row = []
+    for c in _index_columns[table]:
+        val = entry.get(c, "")
+        if c in _json_columns:
+            val = json.dumps(val if val else [])
+        elif c in _bool_columns:
+            val = "1" if val else "0"
+        elif val is None:
+            val = ""
+        row.append(str(val))
+    return row
+
+
+def _unique_key(table: str, row: list):
+    non_unique_columns = _non_unique_columns.get(table, [])
+    return tuple([val for c, val in zip(_index_columns[table], row) if c not in non_unique_columns])
+
+
+def _from_row(table: str, row: tuple):
+    entry = {}
+    for c, val in zip(_index_columns[table], row):
+        if c in _json_columns:
+            val = json.loads(val) if val else []
+        elif c in _bool_columns:
+            val = val == "1"
+        elif c in _int_columns:
+            val = int(val) if val else 0
+        entry[c] = val
+    return entry
+
+
+@dataclass
+class RAMIndex(object):
+    """
+    SQLite store of RAM indices (modules, roles, taskfiles, action groups, object locations and the findings catalog).
+    each index is a table keyed by a short name, FQCN or object key, so a search is a point lookup
+    and registration is an upsert instead of rewriting the whole index file.
+
+    in the journal mode, `add()` appends entries to a journal file of the process instead of writing
+    to the database, so that parallel workers of `ari ram generate` never wait for each other.
+    the entries become visible to other processes after `compact()` merges the journals into the database.
+    """
+
+    root_dir: str = ""
+    use_journal: bool = False
+
+    _db_path: str = ""
+    _journal_dir: str = ""
+    _conn: sqlite3.Connection = None
+    _pid: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+    # entries journaled by this process; {(table, column): {value: [row, ...]}} and {table: {unique key: row}}
+    _pending: dict = field(default_factory=dict)
+    _pending_rows: dict = field(default_factory=dict)
+
+    def __post_init__(self):
+        self._db_path = os.path.join(self.root_dir, "indices", ram_index_db_name)
+        self._journal_dir = os.path.join(self.root_dir, "indices", ram_index_journal_dir_name)
+
+    def __getstate__(self):
+        # a connection cannot be shared with other processes
+        state = self.__dict__.copy()
+        state["_conn"] = None
+        state["_pid"] = 0
+        state["_lock"] = None
+        state["_pending"] = {}
+        state["_pending_rows"] = {}
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def find(self, table: str, value: str, column: str = ""):
+        if not column:
+            column = _index_columns[table][0]
+        if column not in _index_columns[table]:
+            raise ValueError(f"unknown column `{column}` for the index `{table}`")
+        rows = []
+        conn = self._connect(create=False)
+        if conn is not None:
+            columns = ", ".join([f'"{c}"' for c in _index_columns[table]])
+            with self._lock:
+                rows = conn.execute(f'SELECT {columns} FROM {table} WHERE "{column}" = ? ORDER BY id', (value,)).fetchall()
+        if self._pending:
+            rows = [tuple(row) for row in rows]
+            rows.extend([row for row in self._find_pending(table, column, value) if row not in rows])
+        return [_from_row(table, row) for row in rows]
+
+    def add(self, table: str, entries: list, replace: bool = False):
+        """
+        add index entries (dicts) to the table; entries already registered are ignored
+        unless `replace` is true, in which case they are overwritten
+        """
+        if not entries:
+            return 0
+        rows = [_to_row(table, e) for e in entries]
+        if self.use_journal:
+            return self._append_journal(table, rows, replace)
+        return self._insert_rows(table, rows, replace)
+
+    def compact(self):
+        """
+        merge all journal files into the database and remove them.
+        this must be called when no process is writing journals.
+        """
+        journal_files = sorted(glob.glob(os.path.join(self._journal_dir, "*" + ram_index_journal_file_ext)))
+        added = 0
+        for fpath in journal_files:
+            # rows are grouped by table and conflict mode in the order of appearance and deduplicated by a set
+            batches = {}
+            with open(fpath, "r") as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except Exception:
+                        # the last line can be broken if the worker was killed while writing
+                        logger.warning(f"skip a broken line in the index journal {fpath}")
+                        continue
+                    table = record["table"]
+                    replace = record.get("replace", False)
+                    batch = batches.setdefault((table, replace), {})
+                    unique_key = _unique_key(table, record["row"])
+                    # the last one wins for replaced entries and the first one for the others like the database
+                    if replace or unique_key not in batch:
+                        batch[unique_key] = record["row"]
+            for (table, replace), rows in batches.items():
+                added += self._insert_rows(table, list(rows.values()), replace)
+            os.remove(fpath)
+        self._pending = {}
+        self._pending_rows = {}
+        if journal_files:
+            logger.debug(f"compacted {len(journal_files)} index journals ({added} entries added)")
+        return added
+
+    def _insert_rows(self, table: str, rows: list, replace: bool = False):
+        conn = self._connect(create=True)
+        columns = _index_columns[table]
+        column_names = ", ".join([f'"{c}"' for c in columns])
+        placeholders = ", ".join(["?"] * len(columns))
+        with self._lock:
+            with conn:
+                before = conn.total_changes
+                conflict = "REPLACE" if replace else "IGNORE"
+                conn.executemany(f"INSERT OR {conflict} INTO {table} ({column_names}) VALUES ({placeholders})", rows)
+                added = conn.total_changes - before
+        return added
+
+    def to_dict(self, table: str):
+        """
+        return all entries of the table as a dict in the same format as the JSON index files
+        """
+        conn = self._connect(create=False)
+        if conn is None:
+            return {}
+        key_column = _index_columns[table][0]
+        columns = ", ".join([f'"{c}"' for c in _index_columns[table]])
+        index = {}
+        with self._lock:
+            rows = conn.execute(f"SELECT {columns} FROM {table} ORDER BY id").fetchall()
+        for row in rows:
+            entry = _from_row(table, row)
+            key = entry.pop(key_column) if key_column == "short_name" else entry[key_column]
+            index.setdefault(key, []).append(entry)
+        return index
+
+    def entries(self, table: str):
+        """
+        return all entries of the table as a list
+        """
+        rows = []
+        conn = self._connect(create=False)
+        if conn is not None:
+            columns = ", ".join([f'"{c}"' for c in _index_columns[table]])
+            with self._lock:
+                rows = conn.execute(f"SELECT {columns} FROM {table} ORDER BY id").fetchall()
+        if self._pending_rows.get(table):
+            rows = [tuple(row) for row in rows]
+            registered_rows = set(rows)
+            rows.extend([row for row in self._pending_rows[table].values() if row not in registered_rows])
+        return [_from_row(table, row) for row in rows]
+
+    def count(self, table: str):
+        # entries journaled by this process are counted too
+        pending = len(self._pending_rows.get(table, {}))
+        conn = self._connect(create=False)
+        if conn is None:
+            return pending
+        with self._lock:
+            return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] + pending
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+        self._conn = None
+
+    def _connect(self, create: bool = False):
+        if self._conn is not None and self._pid == os.getpid():
+            return self._conn
+        if not os.path.exists(self._db_path) and not create and not self._legacy_index_exists():
+            return None
+
+        is_new = not os.path.exists(self._db_path)
+        os.makedirs(os.path.dirname(self._db_path), exist_ok=True)
+        # the connection is used by multiple threads in `ari serve` and every access is guarded by `_lock`
+        conn = sqlite3.connect(self._db_path, timeout=60, check_same_thread=False)
+        # WAL mode allows readers to continue while another process is registering findings
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        with conn:
+            for table in _index_columns:
+                for sql in _create_table_sql(table):
+                    conn.execute(sql)
+        self._conn = conn
+        self._pid = os.getpid()
+        if is_new:
+            self._import_legacy_index()
+        return self._conn
+
+    def _append_journal(self, table: str, rows: list, replace: bool = False):
+        with self._lock:
+            known_rows = self._pending_rows.setdefault(table, {})
+            new_rows = []
+            for row in rows:
+                # the same uniqueness as the table so that the journal does not grow with duplicates
+                unique_key = _unique_key(table, row)
+                if unique_key in known_rows and not replace:
+                    continue
+                known_rows[unique_key] = tuple(row)
+                new_rows.append(row)
+            if not new_rows:
+                return 0
+            lines = [json.dumps({"table": table, "row": row, "replace": replace}) + "\n" for row in new_rows]
+            os.makedirs(self._journal_dir, exist_ok=True)
+            fpath = os.path.join(self._journal_dir, f"{os.getpid()}{ram_index_journal_file_ext}")
+            with open(fpath, "a") as file:
+                file.write("".join(lines))
+            columns = _index_columns[table]
+            for row in new_rows:
+                row = tuple(row)
+                for column in [columns[0]] + _lookup_columns.get(table, []):
+                    value = row[columns.index(column)]
+                    self._pending.setdefault((table, column), {}).setdefault(value, []).append(row)
+        return len(new_rows)
+
+    def _find_pending(self, table: str, column: str, value: str):
+        with self._lock:
+            if (table, column) in self._pending:
+                return list(self._pending[(table, column)].get(value, []))
+            # columns other than the lookup columns are not indexed
+            columns = _index_columns[table]
+            return [row for row in self._pending_rows.get(table, {}).values() if row[columns.index(column)] == value]
+
+    def _legacy_index_path(self, table: str):
+        return os.path.join(self.root_dir, "indices", _legacy_index_files[table])
+
+    def _legacy_index_exists(self):
+        return any([os.path.exists(self._legacy_index_path(table)) for table in _legacy_index_files])
+
+    def _import_legacy_index(self):
+        for table in _legacy_index_files:
+            fpath = self._legacy_index_path(table)
+            if not os.path.exists(fpath):
+                continue
+            try:
+                with open(fpath, "r") as file:
+                    legacy_index = json.load(file)
+            except Exception as exc:
+                logger.warning(f"failed to load the legacy index file {fpath}: {exc}")
+                continue
+            key_column = _index_columns[table][0]
+            rows = []
+            for key, items in legacy_index.items():
+                for item in items:
+                    if not isinstance(item, dict):
+                        continue
+                    entry = item.copy()
+                    entry[key_column] = key
+                    rows.append(_to_row(table, entry))
+            # the entries are written to the database even in the journal mode so that all processes can see them
+            added = self._insert_rows(table, rows)
+            logger.debug(f"imported {added} entries from the legacy index file {fpath}")
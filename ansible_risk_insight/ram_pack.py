@@ -0,0 +1,210 @@
+# -*- mode:python; coding:utf-8 -*-
+
+# Copyright (c) 2022 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import mmap
+import zlib
+import struct
+from dataclasses import dataclass
+
+import ansible_risk_insight.codec as codec
+import ansible_risk_insight.logger as logger
+from .findings import Findings, definitions_dir_name
+from .ram_index import (
+    RAMIndex,
+    module_index_table,
+    role_index_table,
+    taskfile_index_table,
+    action_group_index_table,
+    object_index_table,
+    catalog_table,
+    packed_file_table,
+)
+
+ram_pack_file_name = "ram.pack"
+ram_pack_magic = b"ARIPACK1"
+
+# every record is a 4 byte length and zlib compressed codec record
+_record_header = struct.Struct(">I")
+
+# index tables copied to a pack as they are; object locations are made for the pack
+_copied_tables = [module_index_table, role_index_table, taskfile_index_table, action_group_index_table, catalog_table]
+
+
+def pack_ram(root_dir: str, out_dir: str):
+    """
+    pack the findings of the RAM at `root_dir` into `<out_dir>/ram.pack` and the index database.
+    `out_dir` can be used as the RAM data dir without extraction.
+    """
+    # imported here because risk_assessment_model uses this module
+    from .risk_assessment_model import RAMClient
+
+    pack_path = os.path.join(out_dir, ram_pack_file_name)
+    if os.path.exists(pack_path) or os.path.exists(os.path.join(out_dir, "indices")):
+        raise ValueError(f"the output dir already has RAM data: {out_dir}")
+    os.makedirs(out_dir, exist_ok=True)
+
+    src = RAMClient(root_dir=root_dir)
+    src._ensure_catalog()
+    dst_index = RAMIndex(root_dir=out_dir)
+    for table in _copied_tables:
+        dst_index.add(table, src.index.entries(table))
+
+    catalog = src.index.entries(catalog_table)
+    with open(pack_path, "wb") as file:
+        writer = _PackWriter(file=file)
+        for entry in catalog:
+            findings = Findings.load(fpath=os.path.join(root_dir, entry["path"]))
+            if not isinstance(findings, Findings):
+                logger.warning(f"skip a broken findings {entry['path']}")
+                continue
+            packed_files, objects = writer.write_findings(entry, findings)
+            dst_index.add(packed_file_table, packed_files, replace=True)
+            dst_index.add(object_index_table, objects, replace=True)
+    dst_index.close()
+    return len(catalog)
+
+
+@dataclass
+class _PackWriter(object):
+    file: object = None
+    pos: int = 0
+
+    def __post_init__(self):
+        self.pos = self.file.write(ram_pack_magic)
+
+    def write_findings(self, catalog_entry: dict, findings: Findings):
+        findings_path = catalog_entry["path"]
+        packed_files = []
+        objects = []
+
+        start = self.pos
+        self._write_record(findings.without_definitions())
+        packed_files.append({"path": findings_path, "offset": start, "length": self.pos - start, "count": 1})
+
+        definitions = findings.root_definitions.get("definitions", {})
+        for type_name, objs in definitions.items():
+            start = self.pos
+            for obj in objs:
+                offset, length = self._write_record(obj)
+                key = getattr(obj, "key", "")
+                if key:
+                    objects.append(
+                        {
+                            "key": key,
+                            "type": catalog_entry["type"],
+                            "name": catalog_entry["name"],
+                            "version": catalog_entry["version"],
+                            "hash": catalog_entry["hash"],
+                            "file": type_name,
+                            "offset": offset,
+                            "length": length,
+                        }
+                    )
+            definitions_path = _definitions_path(findings_path, type_name)
+            packed_files.append({"path": definitions_path, "offset": start, "length": self.pos - start, "count": len(objs)})
+        return packed_files, objects
+
+    def _write_record(self, obj):
+        record = zlib.compress(codec.encode_record(obj).encode("utf-8"))
+        self.pos += self.file.write(_record_header.pack(len(record)))
+        offset = self.pos
+        self.pos += self.file.write(record)
+        return offset, len(record)
+
+
+def _definitions_path(findings_path: str, type_name: str):
+    return os.path.join(os.path.dirname(findings_path), definitions_dir_name, f"{type_name}.json")
+
+
+@dataclass
+class RAMPack(object):
+    """
+    read-only access to a packed RAM made by `pack_ram()`.
+    the pack file is memory-mapped and only the records needed for a lookup are decompressed.
+    paths are relative to the RAM data dir like the catalog.
+    """
+
+    path: str = ""
+    index: RAMIndex = None
+
+    _file: object = None
+    _mm: mmap.mmap = None
+    _pid: int = 0
+
+    def __getstate__(self):
+        # a memory map cannot be shared with other processes
+        state = self.__dict__.copy()
+        state["_file"] = None
+        state["_mm"] = None
+        state["_pid"] = 0
+        return state
+
+    def has(self, path: str):
+        return len(self.index.find(packed_file_table, path)) > 0
+
+    def load_findings(self, findings_path: str):
+        found = self.index.find(packed_file_table, findings_path)
+        if not found:
+            return None
+        head = self._read_record_str(found[0]["offset"] + _record_header.size)
+
+        def load_definitions(type_name):
+            return self.load_definitions(findings_path, type_name)
+
+        return Findings.load(json_str=codec.document_prefix() + head + "}", definitions_loader=load_definitions)
+
+    def load_definitions(self, findings_path: str, type_name: str):
+        found = self.index.find(packed_file_table, _definitions_path(findings_path, type_name))
+        if not found:
+            return None
+        mm = self._map()
+        pos = found[0]["offset"]
+        end = pos + found[0]["length"]
+        objs = []
+        while pos < end:
+            (length,) = _record_header.unpack_from(mm, pos)
+            pos += _record_header.size
+            objs.append(self.load_record(pos, length))
+            pos += length
+        return objs
+
+    def load_record(self, offset: int, length: int):
+        return codec.decode_record(self._read_record_str(offset, length))
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._file.close()
+        self._mm = None
+        self._file = None
+
+    def _read_record_str(self, offset: int, length: int = -1):
+        mm = self._map()
+        if length < 0:
+            (length,) = _record_header.unpack_from(mm, offset - _record_header.size)
+        return zlib.decompress(mm[offset : offset + length]).decode("utf-8")
+
+    def _map(self):
+        if self._mm is not None and self._pid == os.getpid():
+            return self._mm
+        self._file = open(self.path, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._pid = os.getpid()
+        if self._mm[: len(ram_pack_magic)] != ram_pack_magic:
+            self.close()
+            raise ValueError(f"not a RAM pack file: {self.path}")
+        return self._mm
@@ -15,14 +15,14 @@
 # limitations under the License.
 
 import os
+import sys
 import json
-import jsonpickle
+import datetime
 from dataclasses import dataclass, field
 import tarfile
 
 from .models import (
     LoadType,
-    ObjectList,
     ExecutableType,
     Collection,
     Module,
@@ -33,91 +33,61 @@ from .models import (
     TaskFileMetadata,
     ActionGroupMetadata,
 )
-from .findings import Findings
+from .findings import Findings, definitions_dir_name
 from .utils import (
     escape_url,
     version_to_num,
     diff_files_data,
     is_test_object,
-    lock_file,
-    unlock_file,
-    remove_lock_file,
 )
 from .safe_glob import safe_glob
 from .keyutil import get_obj_info_by_key, make_imported_taskfile_key
 from .model_loader import load_builtin_modules
-
-
-module_index_name = "module_index.json"
-role_index_name = "role_index.json"
-taskfile_index_name = "taskfile_index.json"
-action_group_index_name = "action_group_index.json"
+from .ram_cache import LRUCache
+from .ram_pack import RAMPack, pack_ram, ram_pack_file_name
+from .ram_index import (
+    RAMIndex,
+    module_index_table,
+    role_index_table,
+    taskfile_index_table,
+    action_group_index_table,
+    object_index_table,
+    catalog_table,
+)
 
 
 @dataclass
 class RAMClient(object):
     root_dir: str = ""
 
-    findings_json_list_cache: list = field(default_factory=list)
-
-    findings_cache: dict = field(default_factory=dict)
-    findings_search_cache: dict = field(default_factory=dict)
-
-    module_search_cache: dict = field(default_factory=dict)
-    role_search_cache: dict = field(default_factory=dict)
-    taskfile_search_cache: dict = field(default_factory=dict)
-    task_search_cache: dict = field(default_factory=dict)
+    # findings definitions, key indices of them and search results; namespaces are "findings", "findings_key_index",
+    # "findings_search", "module_search", "role_search", "taskfile_search" and "task_search"
+    cache: LRUCache = None
+    cache_max_size_mb: int = 512
 
     builtin_modules_cache: dict = field(default_factory=dict)
 
-    module_index: dict = field(default_factory=dict)
-    role_index: dict = field(default_factory=dict)
-    taskfile_index: dict = field(default_factory=dict)
+    # module, role, taskfile and action group indices
+    # action groups are used for grouped module_defaults such as `group/aws`
+    index: RAMIndex = None
+    # if true, indices are registered to per-process journals which are merged by `compact_index()`
+    index_journal: bool = False
 
-    # used for grouped module_defaults such as `group/aws`
-    action_group_index: dict = field(default_factory=dict)
+    # hit/miss/eviction counters per cache namespace; e.g. {"module_search": {"hit": 3, "miss": 1, "eviction": 0}}
+    cache_stats: dict = field(default_factory=dict)
 
-    max_cache_size: int = 200
+    # findings packed by `release(packed=True)`; they are read in place and findings on disk are used for others
+    pack: RAMPack = None
 
     def __post_init__(self):
-        module_index_path = os.path.join(self.root_dir, "indices", module_index_name)
-        if os.path.exists(module_index_path):
-            with open(module_index_path, "r") as file:
-                self.module_index = json.load(file)
-
-        role_index_path = os.path.join(self.root_dir, "indices", role_index_name)
-        if os.path.exists(role_index_path):
-            with open(role_index_path, "r") as file:
-                self.role_index = json.load(file)
-
-        taskfile_index_path = os.path.join(self.root_dir, "indices", taskfile_index_name)
-        if os.path.exists(taskfile_index_path):
-            with open(taskfile_index_path, "r") as file:
-                self.taskfile_index = json.load(file)
-
-        action_group_index_path = os.path.join(self.root_dir, "indices", action_group_index_name)
-        if os.path.exists(action_group_index_path):
-            with open(action_group_index_path, "r") as file:
-                self.action_group_index = json.load(file)
-
-    def clear_old_cache(self):
-        size = self.max_cache_size
-        self._remove_old_item(self.findings_cache, size)
-        self._remove_old_item(self.findings_search_cache, size)
-        self._remove_old_item(self.module_search_cache, size)
-        self._remove_old_item(self.role_search_cache, size)
-        self._remove_old_item(self.taskfile_search_cache, size)
-        self._remove_old_item(self.task_search_cache, size)
-        return
-
-    def _remove_old_item(self, data: dict, size: int):
-        if len(data) <= size:
-            return
-        num = len(data) - size
-        for _ in range(num):
-            oldest_key = next(iter(data))
-            data.pop(oldest_key)
-        return
+        if self.index is None:
+            self.index = RAMIndex(root_dir=self.root_dir, use_journal=self.index_journal)
+        if self.cache is None:
+            self.cache = LRUCache(max_size_mb=self.cache_max_size_mb)
+        self.cache_stats = self.cache.stats
+        pack_path = os.path.join(self.root_dir, ram_pack_file_name)
+        if self.pack is None and os.path.exists(pack_path):
+            self.pack = RAMPack(path=pack_path, index=self.index)
 
     def register(self, findings: Findings):
         metadata = findings.metadata
@@ -129,41 +99,24 @@ class RAMClient(object):
 
         out_dir = self.make_findings_dir_path(type, name, version, hash)
         self.save_findings(findings, out_dir)
-
-        self.clear_old_cache()
+        self.register_catalog_entry(os.path.join(out_dir, "findings.json"), findings.scan_time)
 
     def register_indices_to_ram(self, findings: Findings, include_test_contents: bool = False):
         self.register_module_index_to_ram(findings=findings, include_test_contents=include_test_contents)
         self.register_role_index_to_ram(findings=findings, include_test_contents=include_test_contents)
         self.register_taskfile_index_to_ram(findings=findings, include_test_contents=include_test_contents)
         self.register_action_group_index_to_ram(findings=findings)
+        self.register_object_index_to_ram(findings=findings)
 
     def register_module_index_to_ram(self, findings: Findings, include_test_contents: bool = False):
-        new_data_found = False
-        modules = self.load_module_index()
+        entries = []
         for module in findings.root_definitions.get("definitions", {}).get("modules", []):
             if not isinstance(module, Module):
                 continue
             if include_test_contents and is_test_object(module.defined_in):
                 continue
             m_meta = ModuleMetadata.from_module(module, findings.metadata)
-            current = modules.get(module.name, [])
-            exists = False
-            for m_dict in current:
-                m = None
-                if isinstance(m_dict, dict):
-                    m = ModuleMetadata.from_dict(m_dict)
-                elif isinstance(m_dict, ModuleMetadata):
-                    m = m_dict
-                if not m:
-                    continue
-                if m == m_meta:
-                    exists = True
-                    break
-            if not exists:
-                current.append(m_meta)
-                new_data_found = True
-            modules.update({module.name: current})
+            entries.append(_make_index_entry(m_meta, short_name=module.name))
         for collection in findings.root_definitions.get("definitions", {}).get("collections", []):
             if not isinstance(collection, Collection):
                 continue
@@ -173,91 +126,36 @@ class RAMClient(object):
                     if not redirect_to:
                         continue
                     m_meta = ModuleMetadata.from_routing(redirect_to, findings.metadata)
-                    current = modules.get(short_name, [])
-                    exists = False
-                    for m_dict in current:
-                        m = None
-                        if isinstance(m_dict, dict):
-                            m = ModuleMetadata.from_dict(m_dict)
-                        elif isinstance(m_dict, ModuleMetadata):
-                            m = m_dict
-                        if not m:
-                            continue
-                        if m == m_meta:
-                            exists = True
-                            break
-                    if not exists:
-                        current.append(m_meta)
-                        new_data_found = True
-                    modules.update({short_name: current})
-        if new_data_found:
-            self.save_module_index(modules)
+                    entries.append(_make_index_entry(m_meta, short_name=short_name))
+        self.index.add(module_index_table, entries)
         return
 
     def register_role_index_to_ram(self, findings: Findings, include_test_contents: bool = False):
-        new_data_found = False
-        roles = self.load_role_index()
+        entries = []
         for role in findings.root_definitions.get("definitions", {}).get("roles", []):
             if not isinstance(role, Role):
                 continue
             if include_test_contents and is_test_object(role.defined_in):
                 continue
             r_meta = RoleMetadata.from_role(role, findings.metadata)
-            current = roles.get(r_meta.fqcn, [])
-            exists = False
-            for r_dict in current:
-                r = None
-                if isinstance(r_dict, dict):
-                    r = RoleMetadata.from_dict(r_dict)
-                elif isinstance(r_dict, RoleMetadata):
-                    r = r_dict
-                if not r:
-                    continue
-                if r == r_meta:
-                    exists = True
-                    break
-            if not exists:
-                current.append(r_meta)
-                new_data_found = True
-            roles.update({role.fqcn: current})
-        if new_data_found:
-            self.save_role_index(roles)
+            entries.append(_make_index_entry(r_meta))
+        self.index.add(role_index_table, entries)
         return
 
     def register_taskfile_index_to_ram(self, findings: Findings, include_test_contents: bool = False):
-        new_data_found = False
-        taskfiles = self.load_taskfile_index()
+        entries = []
         for taskfile in findings.root_definitions.get("definitions", {}).get("taskfiles", []):
             if not isinstance(taskfile, TaskFile):
                 continue
             if include_test_contents and is_test_object(taskfile.defined_in):
                 continue
             tf_meta = TaskFileMetadata.from_taskfile(taskfile, findings.metadata)
-            current = taskfiles.get(tf_meta.key, [])
-            exists = False
-            for tf_dict in current:
-                tf = None
-                if isinstance(tf_dict, dict):
-                    tf = TaskFileMetadata.from_dict(tf_dict)
-                elif isinstance(tf_dict, TaskFileMetadata):
-                    tf = tf_dict
-                if not tf:
-                    continue
-                if tf == tf_meta:
-                    exists = True
-                    break
-            if not exists:
-                current.append(tf_meta)
-                new_data_found = True
-            taskfiles.update({taskfile.key: current})
-        if new_data_found:
-            self.save_taskfile_index(taskfiles)
+            entries.append(_make_index_entry(tf_meta))
+        self.index.add(taskfile_index_table, entries)
         return
 
     def register_action_group_index_to_ram(self, findings: Findings, include_test_contents: bool = False):
-        new_data_found = False
-        action_groups = self.load_action_group_index()
-
+        entries = []
         for collection in findings.root_definitions.get("definitions", {}).get("collections", []):
             if not isinstance(collection, Collection):
                 continue
@@ -265,48 +163,71 @@ class RAMClient(object):
                 for group_name, group_modules in collection.meta_runtime.get("action_groups", {}).items():
                     short_group_name = f"group/{group_name}"
                     fq_group_name = f"group/{collection.name}.{group_name}"
+                    for _group_name in [short_group_name, fq_group_name]:
+                        agm = ActionGroupMetadata.from_action_group(_group_name, group_modules, findings.metadata)
+                        if agm:
+                            entries.append(_make_index_entry(agm))
+        self.index.add(action_group_index_table, entries)
+        return
 
-                    agm1 = ActionGroupMetadata.from_action_group(short_group_name, group_modules, findings.metadata)
-                    current1 = action_groups.get(short_group_name, [])
-                    exists = False
-                    for ag_dict in current1:
-                        ag = None
-                        if isinstance(ag_dict, dict):
-                            ag = ActionGroupMetadata.from_dict(ag_dict)
-                        elif isinstance(ag_dict, ActionGroupMetadata):
-                            ag = ag_dict
-                        if not ag:
-                            continue
-                        if ag == agm1:
-                            exists = True
-                            break
-                    if not exists:
-                        current1.append(agm1)
-                        new_data_found = True
-                    action_groups.update({short_group_name: current1})
-
-                    agm2 = ActionGroupMetadata.from_action_group(fq_group_name, group_modules, findings.metadata)
-                    current2 = action_groups.get(fq_group_name, [])
-                    exists = False
-                    for ag_dict in current2:
-                        ag = None
-                        if isinstance(ag_dict, dict):
-                            ag = ActionGroupMetadata.from_dict(ag_dict)
-                        elif isinstance(ag_dict, ActionGroupMetadata):
-                            ag = ag_dict
-                        if not ag:
-                            continue
-                        if ag == agm2:
-                            exists = True
-                            break
-                    if not exists:
-                        current2.append(agm2)
-                        new_data_found = True
-                    action_groups.update({fq_group_name: current2})
-        if new_data_found:
-            self.save_action_group_index(action_groups)
+    def register_object_index_to_ram(self, findings: Findings):
+        metadata = findings.metadata
+        type = metadata.get("type", "")
+        name = metadata.get("name", "")
+        version = metadata.get("version", "")
+        hash = metadata.get("hash", "")
+        findings_path = os.path.join(self.make_findings_dir_path(type, name, version, hash), "findings.json")
+        # offsets are saved by `save_findings()`, so this must be called after the findings are registered
+        offsets = Findings.load_definition_offsets(findings_path)
+        if not offsets:
+            return
+        entries = []
+        for type_name, key_offsets in offsets.items():
+            for key, (offset, length) in key_offsets.items():
+                entries.append(
+                    {
+                        "key": key,
+                        "type": type,
+                        "name": name,
+                        "version": version,
+                        "hash": hash,
+                        "file": type_name,
+                        "offset": offset,
+                        "length": length,
+                    }
+                )
+        # offsets change when the same findings are registered again
+        self.index.add(object_index_table, entries, replace=True)
         return
 
+    def register_catalog_entry(self, findings_path: str, scan_time: str = ""):
+        self._ensure_catalog()
+        entry = _make_catalog_entry(self.root_dir, findings_path, scan_time)
+        self.index.add(catalog_table, [entry], replace=True)
+        # the latest findings of the name may be changed
+        self.cache.clear("findings_search")
+        return
+
+    def rebuild_catalog(self):
+        """
+        register all findings in the RAM directories to the catalog
+        """
+        findings_json_list = []
+        for type_root in ["collections", "roles"]:
+            search_patterns = os.path.join(self.root_dir, type_root, "findings", "*", "*", "*", "findings.json")
+            findings_json_list.extend(safe_glob(search_patterns))
+        entries = [_make_catalog_entry(self.root_dir, findings_path) for findings_path in findings_json_list]
+        self.index.add(catalog_table, entries, replace=True)
+        return len(entries)
+
+    def _ensure_catalog(self):
+        # RAM data registered by older versions does not have the catalog
+        if self.index.count(catalog_table) == 0:
+            self.rebuild_catalog()
+
+    def compact_index(self):
+        return self.index.compact()
+
     def make_findings_dir_path(self, type, name, version, hash):
         type_root = type + "s"
         dir_name = name
@@ -331,8 +252,8 @@ class RAMClient(object):
         loaded = False
         definitions = {}
         mappings = {}
-        if os.path.exists(findings_path):
-            findings = Findings.load(fpath=findings_path)
+        if self._findings_exists(findings_path):
+            findings = self.load_findings(findings_path)
             # use RAM only if no unresolved dependency
             # (RAM should be fully-resolved specs as much as possible)
             if findings and (len(findings.extra_requirements) == 0 or allow_unresolved):
@@ -342,6 +263,49 @@ class RAMClient(object):
                     loaded = True
         return loaded, definitions, mappings
 
+    def load_definitions_from_findings_by_type(self, findings_path: str, type_name: str):
+        """
+        load only the definitions of the type (e.g. "modules") from the findings
+        """
+        cache_key = (findings_path, type_name)
+        hit, objs = self.cache.lookup("findings", cache_key)
+        if hit:
+            return objs
+
+        objs = self._load_definitions(findings_path, type_name)
+        if objs is None:
+            # findings registered by older versions have all definitions in findings.json
+            f = self.load_findings(findings_path)
+            if not isinstance(f, Findings):
+                return None
+            definitions = f.root_definitions.get("definitions", {})
+            for _type_name, _objs in definitions.items():
+                self.cache.put("findings", (findings_path, _type_name), _objs)
+            objs = definitions.get(type_name, [])
+        self.cache.put("findings", cache_key, objs)
+        return objs
+
+    def load_key_index_from_findings(self, findings_path: str, type_name: str):
+        """
+        return a dict from object keys to the definitions of the type in the findings
+        """
+        cache_key = (findings_path, type_name)
+        hit, key_index = self.cache.lookup("findings_key_index", cache_key)
+        if hit:
+            return key_index
+
+        objs = self.load_definitions_from_findings_by_type(findings_path, type_name)
+        if objs is None:
+            return None
+        key_index = {}
+        for obj in objs:
+            key = getattr(obj, "key", "")
+            if key and key not in key_index:
+                key_index[key] = obj
+        # the objects are counted in the "findings" cache, so only the dict itself is counted here
+        self.cache.put("findings_key_index", cache_key, key_index, size=sys.getsizeof(key_index))
+        return key_index
+
     def search_builtin_module(self, name, used_in=""):
         builtin_modules = {}
         if self.builtin_modules_cache:
@@ -406,13 +370,14 @@ class RAMClient(object):
         if max_match == 0:
             return []
         args_str = json.dumps([name, exact_match, max_match, collection_name, collection_version])
-        if args_str in self.module_search_cache:
-            return self.module_search_cache[args_str]
+        hit, cached = self.cache.lookup("module_search", args_str)
+        if hit:
+            return cached
 
         # check if the module is builtin
         matched_builtin_modules = self.search_builtin_module(name, used_in)
         if len(matched_builtin_modules) > 0:
-            self.module_search_cache[args_str] = matched_builtin_modules
+            self.cache.put("module_search", args_str, matched_builtin_modules)
             return matched_builtin_modules
 
         short_name = name
@@ -422,11 +387,12 @@ class RAMClient(object):
 
         from_indices = False
         found_index = None
-        if short_name in self.module_index and self.module_index[short_name]:
+        module_indices = self.index.find(module_index_table, short_name)
+        if module_indices:
             from_indices = True
             # look for the module index with FQCN (only when `name` is FQCN)
             if "." in name:
-                for possible_index in self.module_index[short_name]:
+                for possible_index in module_indices:
                     # use the first one normally
                     if not found_index and possible_index["fqcn"] == name:
                         found_index = possible_index
@@ -437,11 +403,11 @@ class RAMClient(object):
 
             # if any candidates don't match with FQCN, use the first index
             if not found_index:
-                non_deprecated_cands = [idx for idx in self.module_index[short_name] if not idx["deprecated"]]
+                non_deprecated_cands = [idx for idx in module_indices if not idx["deprecated"]]
                 if non_deprecated_cands:
                     found_index = non_deprecated_cands[0]
                 else:
-                    found_index = self.module_index[short_name][0]
+                    found_index = module_indices[0]
 
         modules_json_list = []
         if from_indices:
@@ -450,7 +416,7 @@ class RAMClient(object):
             _version = found_index.get("version", "")
             _hash = found_index.get("hash", "")
             findings_path = os.path.join(self.root_dir, _type + "s", "findings", _name, _version, _hash, "findings.json")
-            if os.path.exists(findings_path):
+            if self._findings_exists(findings_path):
                 modules_json_list.append(findings_path)
             search_name = found_index.get("fqcn", "")
         else:
@@ -461,16 +427,9 @@ class RAMClient(object):
         matched_modules = []
         search_end = False
         for findings_json in modules_json_list:
-            modules = ObjectList()
-            if findings_json in self.findings_cache:
-                modules = self.findings_cache[findings_json].get("modules", [])
-            else:
-                f = Findings.load(fpath=findings_json)
-                if not isinstance(f, Findings):
-                    continue
-                definitions = f.root_definitions.get("definitions", {})
-                modules = definitions.get("modules", [])
-                self.findings_cache[findings_json] = definitions
+            modules = self.load_definitions_from_findings_by_type(findings_json, "modules")
+            if modules is None:
+                continue
             for m in modules:
                 matched = False
                 if exact_match:
@@ -502,21 +461,23 @@ class RAMClient(object):
                         break
             if search_end:
                 break
-        self.module_search_cache[args_str] = matched_modules
+        self.cache.put("module_search", args_str, matched_modules)
         return matched_modules
 
     def search_role(self, name, exact_match=False, max_match=-1, used_in=""):
         if max_match == 0:
             return []
         args_str = json.dumps([name, exact_match, max_match])
-        if args_str in self.role_search_cache:
-            return self.role_search_cache[args_str]
+        hit, cached = self.cache.lookup("role_search", args_str)
+        if hit:
+            return cached
 
         from_indices = False
         found_index = None
-        if name in self.role_index and self.role_index[name]:
+        role_indices = self.index.find(role_index_table, name)
+        if role_indices:
             from_indices = True
-            found_index = self.role_index[name][0]
+            found_index = role_indices[0]
 
         roles_json_list = []
         if from_indices:
@@ -525,7 +486,7 @@ class RAMClient(object):
             _version = found_index.get("version", "")
             _hash = found_index.get("hash", "")
             findings_path = os.path.join(self.root_dir, _type + "s", "findings", _name, _version, _hash, "findings.json")
-            if os.path.exists(findings_path):
+            if self._findings_exists(findings_path):
                 roles_json_list.append(findings_path)
         else:
             # Do not search a role from all findings
@@ -536,16 +497,9 @@ class RAMClient(object):
         matched_roles = []
         search_end = False
         for findings_json in roles_json_list:
-            roles = ObjectList()
-            if findings_json in self.findings_cache:
-                roles = self.findings_cache[findings_json].get("roles", [])
-            else:
-                f = Findings.load(fpath=findings_json)
-                if not isinstance(f, Findings):
-                    continue
-                definitions = f.root_definitions.get("definitions", {})
-                roles = definitions.get("roles", [])
-                self.findings_cache[findings_json] = definitions
+            roles = self.load_definitions_from_findings_by_type(findings_json, "roles")
+            if roles is None:
+                continue
             for r in roles:
                 matched = False
                 if exact_match:
@@ -594,7 +548,7 @@ class RAMClient(object):
                         break
             if search_end:
                 break
-        self.role_search_cache[args_str] = matched_roles
+        self.cache.put("role_search", args_str, matched_roles)
         return matched_roles
 
     def make_taskfile_key_candidates(self, name, from_path, from_key):
@@ -622,8 +576,9 @@ class RAMClient(object):
             return []
 
         args_str = json.dumps([name, from_path, from_key, max_match, is_key])
-        if args_str in self.taskfile_search_cache:
-            return self.taskfile_search_cache[args_str]
+        hit, cached = self.cache.lookup("taskfile_search", args_str)
+        if hit:
+            return cached
 
         from_indices = False
         found_index = None
@@ -634,9 +589,10 @@ class RAMClient(object):
         else:
             taskfile_key_candidates = self.make_taskfile_key_candidates(name, from_path, from_key)
         for taskfile_key in taskfile_key_candidates:
-            if taskfile_key in self.taskfile_index and self.taskfile_index[taskfile_key]:
+            taskfile_indices = self.index.find(taskfile_index_table, taskfile_key)
+            if taskfile_indices:
                 from_indices = True
-                found_index = self.taskfile_index[taskfile_key][0]
+                found_index = taskfile_indices[0]
                 found_key = taskfile_key
                 break
 
@@ -649,7 +605,7 @@ class RAMClient(object):
             _hash = found_index.get("hash", "")
             content_info = found_index
             findings_path = os.path.join(self.root_dir, _type + "s", "findings", _name, _version, _hash, "findings.json")
-            if os.path.exists(findings_path):
+            if self._findings_exists(findings_path):
                 taskfiles_json_list.append(findings_path)
         else:
             # Do not search a role from all findings
@@ -660,16 +616,10 @@ class RAMClient(object):
         matched_taskfiles = []
         search_end = False
         for findings_json in taskfiles_json_list:
-            taskfiles = ObjectList()
-            if findings_json in self.findings_cache:
-                taskfiles = self.findings_cache[findings_json].get("taskfiles", [])
-            else:
-                f = Findings.load(fpath=findings_json)
-                if not isinstance(f, Findings):
-                    continue
-                definitions = f.root_definitions.get("definitions", {})
-                taskfiles = definitions.get("taskfiles", [])
-                self.findings_cache[findings_json] = definitions
+            key_index = self.load_key_index_from_findings(findings_json, "taskfiles")
+            if key_index is None:
+                continue
+            taskfiles = [key_index[found_key]] if found_key in key_index else []
             for tf in taskfiles:
                 matched = False
                 if tf.key == found_key:
@@ -717,6 +667,7 @@ class RAMClient(object):
                         break
             if search_end:
                 break
+        self.cache.put("taskfile_search", args_str, matched_taskfiles)
         return matched_taskfiles
 
     def search_task(self, name, exact_match=False, max_match=-1, is_key=False, content_info=None, used_in=""):
@@ -728,8 +679,9 @@ class RAMClient(object):
             return []
 
         args_str = json.dumps([name, exact_match, max_match, is_key, content_info])
-        if args_str in self.task_search_cache:
-            return self.task_search_cache[args_str]
+        hit, cached = self.cache.lookup("task_search", args_str)
+        if hit:
+            return cached
 
         tasks_json_list = []
         _type = content_info.get("type", "")
@@ -739,22 +691,21 @@ class RAMClient(object):
         _version = content_info.get("version", "")
         _hash = content_info.get("hash", "")
         findings_path = os.path.join(self.root_dir, _type, "findings", _name, _version, _hash, "findings.json")
-        if os.path.exists(findings_path):
+        if self._findings_exists(findings_path):
             tasks_json_list.append(findings_path)
 
         matched_tasks = []
         search_end = False
         for findings_json in tasks_json_list:
-            tasks = ObjectList()
-            if findings_json in self.findings_cache:
-                tasks = self.findings_cache[findings_json].get("tasks", [])
+            if is_key:
+                key_index = self.load_key_index_from_findings(findings_json, "tasks")
+                if key_index is None:
+                    continue
+                tasks = [key_index[name]] if name in key_index else []
             else:
-                f = Findings.load(fpath=findings_json)
-                if not isinstance(f, Findings):
+                tasks = self.load_definitions_from_findings_by_type(findings_json, "tasks")
+                if tasks is None:
                     continue
-                definitions = f.root_definitions.get("definitions", {})
-                tasks = definitions.get("tasks", [])
-                self.findings_cache[findings_json] = definitions
             for t in tasks:
                 matched = False
                 if is_key:
@@ -770,6 +721,7 @@ class RAMClient(object):
                 if matched:
                     parts = findings_json.split("/")
                     offspring_objects = []
+                    _tmp_offspring_objects = []
                     if t.executable_type == ExecutableType.MODULE_TYPE:
                         _tmp_offspring_objects = self.search_module(t.executable, used_in=t.defined_in)
                     elif t.executable_type == ExecutableType.ROLE_TYPE:
@@ -812,125 +764,115 @@ class RAMClient(object):
                         break
             if search_end:
                 break
-        self.task_search_cache[args_str] = matched_tasks
+        self.cache.put("task_search", args_str, matched_tasks)
         return matched_tasks
 
     def search_action_group(self, name, max_match=-1):
         if max_match == 0:
             return []
 
-        found_groups = []
-        if name in self.action_group_index and self.action_group_index[name]:
-            found_groups = self.action_group_index[name]
+        found_groups = self.index.find(action_group_index_table, name)
 
         if max_match > 0 and len(found_groups) > max_match:
             found_groups = found_groups[:max_match]
         return found_groups
 
     def get_object_by_key(self, obj_key: str):
-        obj_info = get_obj_info_by_key(obj_key)
-        obj_type = obj_info.get("type", "")
-        parent_name = obj_info.get("parent_name", "")
-        type_str = obj_type + "s"
-
-        search_patterns = os.path.join(self.root_dir, "collections", "findings", parent_name, "*", "*", "root", f"{type_str}.json")
-        obj_json_list_coll = safe_glob(search_patterns)
-        obj_json_list_coll = sort_by_version(obj_json_list_coll)
-        search_patterns = os.path.join(self.root_dir, "roles", "findings", parent_name, "*", "*", "root", f"{type_str}.json")
-        obj_json_list_role = safe_glob(search_patterns)
-        obj_json_list_role = sort_by_version(obj_json_list_role)
-        obj_json_list = obj_json_list_coll + obj_json_list_role
+        hit, matched_obj = self.cache.lookup("object_by_key", obj_key)
+        if hit:
+            return matched_obj
 
         matched_obj = None
-        for obj_json in obj_json_list:
-            objs = ObjectList.from_json(fpath=obj_json)
-            obj = objs.find_by_key(obj_key)
-            if obj is not None:
-                parts = obj_json.split("/")
+        # the latest known version comes first
+        entries = sorted(self.index.find(object_index_table, obj_key), key=lambda x: -1 * version_to_num(x["version"] or "unknown"))
+        for entry in entries:
+            findings_dir = self.make_findings_dir_path(entry["type"], entry["name"], entry["version"], entry["hash"])
+            obj = self._load_definition_record(os.path.join(findings_dir, "findings.json"), entry["file"], entry["offset"], entry["length"])
+            if obj is not None and getattr(obj, "key", "") == obj_key:
                 matched_obj = {
                     "object": obj,
                     "defined_in": {
-                        "type": parts[-6][:-1],  # collection or role
-                        "name": parts[-5],
-                        "version": parts[-4],
-                        "hash": parts[-3],
+                        "type": entry["type"],
+                        "name": entry["name"],
+                        "version": entry["version"],
+                        "hash": entry["hash"],
                     },
                 }
+                break
+
+        if matched_obj is None and not entries:
+            matched_obj = self._get_object_by_key_from_legacy_findings(obj_key)
+        self.cache.put("object_by_key", obj_key, matched_obj)
         return matched_obj
 
-    def init_findings_json_list_cache(self):
-        search_patterns = os.path.join(self.root_dir, "collections", "findings", "*", "*", "*", "findings.json")
-        findings_json_list_coll = safe_glob(search_patterns)
-        findings_json_list_coll = sort_by_version(findings_json_list_coll)
-        search_patterns = os.path.join(self.root_dir, "roles", "findings", "*", "*", "*", "findings.json")
-        findings_json_list_role = safe_glob(search_patterns)
-        findings_json_list_role = sort_by_version(findings_json_list_role)
-        findings_json_list = findings_json_list_coll + findings_json_list_role
-        self.findings_json_list_cache = findings_json_list
+    def _get_object_by_key_from_legacy_findings(self, obj_key: str):
+        # findings registered by older versions do not have object offsets, so definitions of the type are searched
+        obj_info = get_obj_info_by_key(obj_key)
+        type_str = obj_info.get("type", "") + "s"
+        parent_name = obj_info.get("parent_name", "")
+        self._ensure_catalog()
+        for entry in sort_catalog_entries(self.index.find(catalog_table, parent_name)):
+            findings_path = os.path.join(self.root_dir, entry["path"])
+            if self._is_packed(findings_path) or Findings.load_definition_offsets(findings_path) is not None:
+                continue
+            key_index = self.load_key_index_from_findings(findings_path, type_str)
+            if key_index and obj_key in key_index:
+                return {
+                    "object": key_index[obj_key],
+                    "defined_in": {
+                        "type": entry["type"],
+                        "name": entry["name"],
+                        "version": entry["version"],
+                        "hash": entry["hash"],
+                    },
+                }
+        return None
 
     def list_all_ram_metadata(self):
-        if not self.findings_json_list_cache:
-            self.init_findings_json_list_cache()
-        findings_json_list = self.findings_json_list_cache
-
+        self._ensure_catalog()
+        entries = sort_catalog_entries(self.index.entries(catalog_table))
         metadata_list = []
-        for findings_path in findings_json_list:
-            parts = findings_path.split("/")
-
+        for entry in entries:
             metadata_list.append(
                 {
-                    "type": parts[-5][:-1],  # collection or role
-                    "name": parts[-4],
-                    "version": parts[-3],
-                    "hash": parts[-2],
+                    "type": entry["type"],  # collection or role
+                    "name": entry["name"],
+                    "version": entry["version"],
+                    "hash": entry["hash"],
                 }
             )
         return metadata_list
 
     def search_findings(self, target_name, target_version, target_type=None):
-        if not self.findings_json_list_cache:
-            self.init_findings_json_list_cache()
         args_str = json.dumps([target_name, target_version, target_type])
-        if args_str in self.findings_search_cache:
-            return self.findings_search_cache[args_str]
+        hit, cached = self.cache.lookup("findings_search", args_str)
+        if hit:
+            return cached
 
         if not target_name:
             raise ValueError("target name must be specified for searching RAM data")
         if not target_version:
             target_version = "*"
-        findings_json_list = self.findings_json_list_cache
-        found_path_list = []
-        for findings_path in findings_json_list:
-            parts = findings_path.split("/")
-            _type = parts[-5][:-1]  # collection or role
-            _name = parts[-4]
-            _version = parts[-3]
-            if _name != target_name:
-                continue
+        self._ensure_catalog()
+        found_entries = []
+        for entry in self.index.find(catalog_table, target_name):
             if target_version and target_version != "*":
-                if _version != target_name:
+                if entry["version"] != target_version:
                     continue
             if target_type and target_type != "*":
-                if _type != target_type:
+                if entry["type"] != target_type:
                     continue
-            found_path_list.append(findings_path)
-
-        latest_findings_path = ""
-        if len(found_path_list) == 1:
-            latest_findings_path = found_path_list[0]
-        elif len(found_path_list) > 1:
-            latest_findings_path = found_path_list[0]
-            mtime = os.path.getmtime(latest_findings_path)
-            for fpath in found_path_list:
-                tmp_mtime = os.path.getmtime(fpath)
-                if tmp_mtime > mtime:
-                    latest_findings_path = fpath
-                    mtime = tmp_mtime
-        findings = None
-        if os.path.exists(latest_findings_path):
-            findings = self.load_findings(latest_findings_path)
+            found_entries.append(entry)
 
-        self.findings_search_cache[args_str] = findings
+        findings = None
+        if found_entries:
+            # the most recently scanned one is used
+            latest_entry = max(found_entries, key=lambda x: x["scan_time"])
+            latest_findings_path = os.path.join(self.root_dir, latest_entry["path"])
+            if self._findings_exists(latest_findings_path):
+                findings = self.load_findings(latest_findings_path)
+
+        self.cache.put("findings_search", args_str, findings)
         return findings
 
     def load_findings(self, path: str):
@@ -939,9 +881,32 @@ class RAMClient(object):
         if basename == "findings.json":
             dir_path = os.path.dirname(path)
 
-        findings = Findings.load(fpath=os.path.join(dir_path, "findings.json"))
+        findings_path = os.path.join(dir_path, "findings.json")
+        if self._is_packed(findings_path):
+            return self.pack.load_findings(self._relpath(findings_path))
+        findings = Findings.load(fpath=findings_path)
         return findings
 
+    def _relpath(self, path: str):
+        return os.path.relpath(path, self.root_dir)
+
+    def _is_packed(self, findings_path: str):
+        return self.pack is not None and self.pack.has(self._relpath(findings_path))
+
+    def _findings_exists(self, findings_path: str):
+        return self._is_packed(findings_path) or os.path.exists(findings_path)
+
+    def _load_definitions(self, findings_path: str, type_name: str):
+        if self._is_packed(findings_path):
+            return self.pack.load_definitions(self._relpath(findings_path), type_name) or []
+        return Findings.load_definitions(findings_path, type_name)
+
+    def _load_definition_record(self, findings_path: str, type_name: str, offset: int, length: int):
+        # object locations of packed findings are the record positions in the pack
+        if self._is_packed(findings_path):
+            return self.pack.load_record(offset, length)
+        return Findings.load_definition_record(findings_path, type_name, offset, length)
+
     def save_findings(self, findings: Findings, out_dir: str):
         if out_dir == "":
             raise ValueError("output dir must be a non-empty value")
@@ -949,53 +914,19 @@ class RAMClient(object):
         if not os.path.exists(out_dir):
             os.makedirs(out_dir, exist_ok=True)
 
-        findings.dump(fpath=os.path.join(out_dir, "findings.json"))
-
-    def save_index(self, index_objects, filename):
-        out_dir = os.path.join(self.root_dir, "indices")
-        if not os.path.exists(out_dir):
-            os.makedirs(out_dir, exist_ok=True)
-        index_objects_str = jsonpickle.encode(index_objects, make_refs=False, unpicklable=False)
-        fpath = os.path.join(out_dir, filename)
-        lock = lock_file(fpath)
-        try:
-            with open(fpath, "w") as file:
-                file.write(index_objects_str)
-        finally:
-            unlock_file(lock)
-            remove_lock_file(lock)
-
-    def load_index(self, filename=""):
-        path = os.path.join(self.root_dir, "indices", filename)
-        index_objects = {}
-        if os.path.exists(path):
-            with open(path, "r") as file:
-                index_objects = json.load(file)
-        return index_objects
-
-    def save_module_index(self, modules):
-        return self.save_index(modules, module_index_name)
+        findings.dump(fpath=os.path.join(out_dir, "findings.json"), split_definitions=True)
 
     def load_module_index(self):
-        return self.load_index(module_index_name)
-
-    def save_role_index(self, roles):
-        return self.save_index(roles, role_index_name)
+        return self.index.to_dict(module_index_table)
 
     def load_role_index(self):
-        return self.load_index(role_index_name)
-
-    def save_taskfile_index(self, taskfiles):
-        return self.save_index(taskfiles, taskfile_index_name)
+        return self.index.to_dict(role_index_table)
 
     def load_taskfile_index(self):
-        return self.load_index(taskfile_index_name)
-
-    def save_action_group_index(self, action_groups):
-        return self.save_index(action_groups, action_group_index_name)
+        return self.index.to_dict(taskfile_index_table)
 
     def load_action_group_index(self):
-        return self.load_index(action_group_index_name)
+        return self.index.to_dict(action_group_index_table)
 
     def save_error(self, error: str, out_dir: str):
         if out_dir == "":
@@ -1034,7 +965,13 @@ class RAMClient(object):
 
         return diff_files_data(files1, files2)
 
-    def release(self, outfile):
+    def release(self, outfile, packed: bool = False):
+        """
+        save the RAM data as a tar.gz file, or as a directory with a pack file if `packed` is true.
+        a packed RAM can be used as the data dir directly.
+        """
+        if packed:
+            return pack_ram(self.root_dir, outfile)
         indices = os.path.join(self.root_dir, "indices")
         collection_findings = os.path.join(self.root_dir, "collections", "findings")
         role_findings = os.path.join(self.root_dir, "roles", "findings")
@@ -1047,18 +984,38 @@ class RAMClient(object):
                 tar.add(role_findings, arcname="roles/findings")
 
 
-# newer version comes earlier, so version num should be sorted in a reversed order
-def _path_to_reversed_version_num(path):
-    version = path.split("/findings/")[-1].split("/")[1]
-    return -1 * version_to_num(version)
-
-
-def _path_to_collection_name(path):
-    collection = path.split("/findings/")[-1].split("/")[0]
-    return collection
-
-
-# the latest known version comes first
+def _make_index_entry(metadata, short_name: str = ""):
+    entry = dict(metadata.__dict__)
+    if short_name:
+        entry["short_name"] = short_name
+    return entry
+
+
+def _make_catalog_entry(root_dir: str, findings_path: str, scan_time: str = ""):
+    parts = findings_path.split("/")
+    size = 0
+    mtime = 0
+    if os.path.exists(findings_path):
+        size = os.path.getsize(findings_path)
+        mtime = os.path.getmtime(findings_path)
+    definitions_dir = os.path.join(os.path.dirname(findings_path), definitions_dir_name)
+    if os.path.exists(definitions_dir):
+        for fname in os.listdir(definitions_dir):
+            size += os.path.getsize(os.path.join(definitions_dir, fname))
+    if not scan_time:
+        scan_time = datetime.datetime.fromtimestamp(mtime, datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")
+    return {
+        "name": parts[-4],
+        "type": parts[-6][:-1],  # collection or role
+        "version": parts[-3],
+        "hash": parts[-2],
+        "path": os.path.relpath(findings_path, root_dir),
+        "scan_time": scan_time,
+        "size": size,
+    }
+
+
+# collections come first, and the latest known version comes first for each name
 # `unknown` is the last
-def sort_by_version(path_list):
-    return sorted(path_list, key=lambda x: (_path_to_collection_name(x), _path_to_reversed_version_num(x)))
+def sort_catalog_entries(entries):
+    return sorted(entries, key=lambda x: (x["type"] != "collection", x["name"], -1 * version_to_num(x["version"])))
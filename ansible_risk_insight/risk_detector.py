@@ -37,6 +37,7 @@ from .models import (
 from .keyutil import detect_type, key_delimiter
 from .analyzer import load_taskcalls_in_trees
 from .utils import load_classes_in_dir
+from .profiler import get_profiler
 
 
 rule_versions_filename = "rule_versions.json"
@@ -149,6 +150,8 @@ def detect(contexts: List[AnsibleRunContext], rules_dir: str = "", rules: list =
 
     ari_result = ARIResult()
     spec_mutations = {}
+    # spec mutations found in each target; this is aligned with `ari_result.targets`
+    spec_mutations_per_target = []
 
     for ctx in contexts:
         if not isinstance(ctx, AnsibleRunContext):
@@ -157,11 +160,6 @@ def detect(contexts: List[AnsibleRunContext], rules_dir: str = "", rules: list =
         tree_root_type = detect_type(tree_root_key)
         tree_root_name = key2name(tree_root_key)
 
-        t_result = TargetResult(
-            target_type=tree_root_type,
-            target_name=tree_root_name,
-        )
-
         is_playbook = tree_root_type == "playbook"
         if is_playbook:
             playbook_count["total"] += 1
@@ -177,55 +175,93 @@ def detect(contexts: List[AnsibleRunContext], rules_dir: str = "", rules: list =
         else:
             role_count["total"] += 1
 
-        for t in ctx:
-            ctx.current = t
-            n_result = NodeResult(node=t)
-            for rule in loaded_rules:
-                if not rule.enabled:
-                    continue
-                rule_id = getattr(rule, "rule_id")
-                start_time = time.time()
-                r_result = RuleResult(file=t.file_info(), rule=rule.get_metadata())
-                detail = {}
-                try:
-                    matched = rule.match(ctx)
-                    if matched:
-                        tmp_result = rule.process(ctx)
-                        if tmp_result:
-                            r_result = tmp_result
-                        r_result.matched = matched
-                    r_result.duration = round((time.time() - start_time) * 1000, 6)
-                    detail = r_result.get_detail()
-                    fatal = detail.get("fatal", False) if detail else False
-                    if fatal:
-                        error = r_result.error or "unknown error"
-                        error = f"ARI rule evaluation threw fatal exception: RuleID={rule_id}, error={error}"
-                        raise FatalRuleResultError(error)
-                    if rule.spec_mutation:
-                        if isinstance(detail, dict):
-                            s_mutations = detail.get("spec_mutations", [])
-                            for s_mutation in s_mutations:
-                                if not isinstance(s_mutation, SpecMutation):
-                                    continue
-                                spec_mutations[s_mutation.key] = s_mutation
-                except FatalRuleResultError:
-                    raise
-                except Exception:
-                    exc = traceback.format_exc()
-                    r_result.error = f"failed to execute the rule `{rule.rule_id}`: {exc}"
-                n_result.rules.append(r_result)
-            # remove node details
-            if save_only_rule_result:
-                n_result.node = omit_node_details(n_result.node)
-            t_result.nodes.append(n_result)
+        t_result, t_spec_mutations = detect_target(ctx, loaded_rules, save_only_rule_result)
+        spec_mutations.update(t_spec_mutations)
         ari_result.targets.append(t_result)
+        spec_mutations_per_target.append(t_spec_mutations)
 
     data_report["ari_result"] = ari_result
     data_report["spec_mutations"] = spec_mutations
+    data_report["spec_mutations_per_target"] = spec_mutations_per_target
 
     return data_report, loaded_rules
 
 
+def iter_detect(contexts, rules_dir: str = "", rules: list = [], rules_cache: list = [], save_only_rule_result: bool = False):
+    """
+    evaluate rules for each context and yield `(target_result, spec_mutations)` as soon as the context is done.
+    `contexts` can be any iterable, so callers can create each context lazily and release it after use.
+    """
+    loaded_rules = []
+    if rules_cache:
+        loaded_rules = rules_cache
+    else:
+        loaded_rules = load_rules(rules_dir, rules, False)
+
+    for ctx in contexts:
+        if not isinstance(ctx, AnsibleRunContext):
+            continue
+        yield detect_target(ctx, loaded_rules, save_only_rule_result)
+
+
+def detect_target(ctx: AnsibleRunContext, loaded_rules: list, save_only_rule_result: bool = False):
+    tree_root_key = ctx.root_key
+    tree_root_type = detect_type(tree_root_key)
+    tree_root_name = key2name(tree_root_key)
+
+    t_result = TargetResult(
+        target_type=tree_root_type,
+        target_name=tree_root_name,
+    )
+    t_spec_mutations = {}
+    profiler = get_profiler()
+
+    for t in ctx:
+        ctx.current = t
+        n_result = NodeResult(node=t)
+        for rule in loaded_rules:
+            if not rule.enabled:
+                continue
+            rule_id = getattr(rule, "rule_id")
+            start_time = time.time()
+            r_result = RuleResult(file=t.file_info(), rule=rule.get_metadata())
+            detail = {}
+            try:
+                matched = rule.match(ctx)
+                if matched:
+                    tmp_result = rule.process(ctx)
+                    if tmp_result:
+                        r_result = tmp_result
+                    r_result.matched = matched
+                r_result.duration = round((time.time() - start_time) * 1000, 6)
+                if profiler:
+                    profiler.record_rule(rule_id, r_result.duration / 1000, bool(matched))
+                detail = r_result.get_detail()
+                fatal = detail.get("fatal", False) if detail else False
+                if fatal:
+                    error = r_result.error or "unknown error"
+                    error = f"ARI rule evaluation threw fatal exception: RuleID={rule_id}, error={error}"
+                    raise FatalRuleResultError(error)
+                if rule.spec_mutation:
+                    if isinstance(detail, dict):
+                        s_mutations = detail.get("spec_mutations", [])
+                        for s_mutation in s_mutations:
+                            if not isinstance(s_mutation, SpecMutation):
+                                continue
+                            t_spec_mutations[s_mutation.key] = s_mutation
+            except FatalRuleResultError:
+                raise
+            except Exception:
+                exc = traceback.format_exc()
+                r_result.error = f"failed to execute the rule `{rule.rule_id}`: {exc}"
+            n_result.rules.append(r_result)
+        # remove node details
+        if save_only_rule_result:
+            n_result.node = omit_node_details(n_result.node)
+        t_result.nodes.append(n_result)
+    return t_result, t_spec_mutations
+
+
 def omit_node_details(node: RunTarget):
     spec = None
     if getattr(node, "spec"):
@@ -72,8 +72,7 @@ class ModuleArgumentValueValidationRule(Rule):
             unknown_type_values = []
 
             registered_vars = []
-            for v_name in task.variable_set:
-                v = task.variable_set[v_name]
+            for v_name, v in task.variable_set.items():
                 if v and v[-1].type == VariableType.RegisteredVars:
                     registered_vars.append(v_name)
 
@@ -45,8 +45,7 @@ class UndefinedVariableRule(Rule):
 
         verdict = False
         detail = {}
-        for v_name in task.variable_use:
-            v = task.variable_use[v_name]
+        for v_name, v in task.variable_use.items():
             if v and v[-1].type == VariableType.Unknown:
                 verdict = True
                 current = detail.get("undefined_variables", [])
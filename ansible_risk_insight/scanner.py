@@ -21,6 +21,8 @@ import yaml
 import tempfile
 import jsonpickle
 import datetime
+import traceback
+import joblib
 from dataclasses import dataclass, field
 
 from .models import (
@@ -29,6 +31,7 @@ from .models import (
     LoadType,
     ObjectList,
     TaskCall,
+    TaskFile,
     TaskCallsInTree,
     AnsibleRunContext,
     ARIResult,
@@ -37,16 +40,20 @@ from .loader import (
     get_loader_version,
 )
 from .parser import Parser
-from .model_loader import load_object
-from .tree import TreeLoader
+from .parse_cache import ParseCache, parse_cache_dir_name
+from .profiler import Profiler
+from .model_loader import load_object, load_builtin_modules
+from .tree import TreeLoader, sum_resolve_failures, get_tree_stats
+from .context import template_cache_stats
 from .annotators.variable_resolver import resolve_variables
-from .analyzer import analyze
-from .risk_detector import detect
+from .analyzer import analyze, load_annotators
+from .risk_detector import detect, iter_detect, load_rules
 from .dependency_dir_preparator import (
     DependencyDirPreparator,
 )
-from .findings import Findings
+from .findings import Findings, RuleResultWriter, rule_result_stream_file_name
 from .risk_assessment_model import RAMClient
+import ansible_risk_insight.codec as codec
 import ansible_risk_insight.logger as logger
 from .utils import (
     is_url,
@@ -71,6 +78,12 @@ default_log_level = "info"
 default_rules = []
 default_disable_default_rules = False
 default_logger_key = "ari"
+default_dependency_load_workers = 1
+default_tree_construction_workers = 1
+default_max_loop_items = -1
+default_parse_cache = False
+default_parse_cache_max_size_mb = 1024
+default_ram_cache_max_size_mb = 512
 
 
 @dataclass
@@ -83,6 +96,20 @@ class Config:
     log_level: str = ""
     rules: list = field(default_factory=list)
     disable_default_rules: bool = False
+    # the number of processes used for loading dependencies (1 means serial loading)
+    dependency_load_workers: int = 0
+    # the number of processes used for constructing trees of playbooks, roles and taskfiles (1 means serial construction)
+    # the definitions are sent to every worker, so a process pool is slower than the serial construction without multiple cores
+    tree_construction_workers: int = 0
+    # the number of loop items per task whose module options are resolved (-1 means no limit, which is the default)
+    # with a limit, `Arguments.templated` of a loop task has only the options of the first items
+    max_loop_items: int = 0
+    # if true, parsed playbooks, taskfiles and roles are cached under `<data_dir>/parse_cache`
+    parse_cache: bool = False
+    parse_cache_max_size_mb: int = 0
+    # the memory budget of the in-memory cache of RAM findings and search results
+    # (0 means no limit and a negative value means the value from the config file or the env var)
+    ram_cache_max_size_mb: int = -1
 
     _data: dict = field(default_factory=dict)
 
@@ -117,6 +144,26 @@ class Config:
             self.log_level = self._get_single_config("ARI_LOG_LEVEL", "log_level", default_log_level)
         if not self.rules:
             self.rules = self._get_single_config("ARI_RULES", "rules", default_rules, "list", ",")
+        if not self.dependency_load_workers:
+            self.dependency_load_workers = int(
+                self._get_single_config("ARI_DEPENDENCY_LOAD_WORKERS", "dependency_load_workers", default_dependency_load_workers)
+            )
+        if not self.tree_construction_workers:
+            self.tree_construction_workers = int(
+                self._get_single_config("ARI_TREE_CONSTRUCTION_WORKERS", "tree_construction_workers", default_tree_construction_workers)
+            )
+        if not self.max_loop_items:
+            self.max_loop_items = int(self._get_single_config("ARI_MAX_LOOP_ITEMS", "max_loop_items", default_max_loop_items))
+        if not self.parse_cache:
+            self.parse_cache = self._get_single_config("ARI_PARSE_CACHE", "parse_cache", default_parse_cache, "bool")
+        if not self.parse_cache_max_size_mb:
+            self.parse_cache_max_size_mb = int(
+                self._get_single_config("ARI_PARSE_CACHE_MAX_SIZE_MB", "parse_cache_max_size_mb", default_parse_cache_max_size_mb)
+            )
+        if self.ram_cache_max_size_mb < 0:
+            self.ram_cache_max_size_mb = int(
+                self._get_single_config("ARI_RAM_CACHE_MAX_SIZE_MB", "ram_cache_max_size_mb", default_ram_cache_max_size_mb)
+            )
 
     def _get_single_config(self, env_key: str = "", yaml_key: str = "", __default: any = None, __type=None, separator=""):
         if env_key in os.environ:
@@ -124,6 +171,8 @@ class Config:
             if _from_env and __type:
                 if __type == "list":
                     _from_env = _from_env.split(separator)
+                elif __type == "bool":
+                    _from_env = _from_env.lower() in ["true", "yes", "1"]
             return _from_env
         elif yaml_key in self._data:
             _from_file = self._data.get(yaml_key, None)
@@ -208,14 +257,25 @@ class SingleScan(object):
     include_test_contents: bool = False
     load_all_taskfiles: bool = False
     yaml_label_list: list = field(default_factory=list)
+    tree_construction_workers: int = 1
+    max_loop_items: int = 0
 
     save_only_rule_result: bool = False
+    # if true, target results are written to `rule_result.jsonl` in out_dir one by one instead of being kept in memory
+    stream_rule_result: bool = False
 
     extra_requirements: list = field(default_factory=list)
     resolve_failures: dict = field(default_factory=dict)
+    # resolve failures and spec mutations per tree; these are used for rescan after spec mutations
+    tree_resolve_failures: list = field(default_factory=list)
+    spec_mutations_per_target: list = field(default_factory=list)
+    # the number of nodes, the max depth and the max fan-out of each tree
+    tree_stats: list = field(default_factory=list)
 
     findings: Findings = None
     result: ARIResult = None
+    # set only when the scan is profiled
+    profile: dict = field(default_factory=dict)
 
     # the following are set by ARIScanner
     root_dir: str = ""
@@ -229,6 +289,9 @@ class SingleScan(object):
     do_save: bool = False
     silent: bool = False
     _parser: Parser = None
+    _tree_loader: TreeLoader = None
+    # the original objects in root definitions which are replaced by spec mutations
+    _original_specs: dict = field(default_factory=dict)
 
     def __post_init__(self):
         if self.type == LoadType.COLLECTION or self.type == LoadType.ROLE:
@@ -546,17 +609,27 @@ class SingleScan(object):
         }
 
     def apply_spec_mutations(self):
-        if not self.spec_mutations_from_previous_scan:
-            return
+        if not self.spec_mutations_from_previous_scan and not self._original_specs:
+            return []
         # overwrite the loaded object with the mutated object in spec mutations
+        # and restore the original object if it was mutated in the previous rescan but not in this time
+        mutations = self.spec_mutations_from_previous_scan or {}
+        updated = []
         for type_name in self.root_definitions["definitions"]:
             obj_list = self.root_definitions["definitions"][type_name]
             for i, obj in enumerate(obj_list):
                 key = obj.key
-                if key in self.spec_mutations_from_previous_scan:
-                    mutated_spec = self.spec_mutations_from_previous_scan[key].object
-                    self.root_definitions["definitions"][type_name][i] = mutated_spec
-        return
+                new_obj = None
+                if key in mutations:
+                    if key not in self._original_specs:
+                        self._original_specs[key] = obj
+                    new_obj = mutations[key].object
+                elif key in self._original_specs:
+                    new_obj = self._original_specs.pop(key)
+                if new_obj is not None:
+                    self.root_definitions["definitions"][type_name][i] = new_obj
+                    updated.append(new_obj)
+        return updated
 
     def set_target_object(self):
         type_name = self.type + "s"
@@ -575,37 +648,53 @@ class SingleScan(object):
         return
 
     def construct_trees(self, ram_client=None):
-        trees, additional, extra_requirements, resolve_failures = tree(
+        self._tree_loader = TreeLoader(
             self.root_definitions,
             self.ext_definitions,
             ram_client,
             self.target_playbook_name,
             self.target_taskfile_name,
             self.load_all_taskfiles,
+            self.tree_construction_workers,
         )
+        trees, additional = self._tree_loader.run()
+        if trees is None:
+            raise ValueError("failed to get trees")
+        extra_requirements = self._tree_loader.extra_requirements
+        resolve_failures = self._tree_loader.resolve_failures
+        self.tree_resolve_failures = self._tree_loader.tree_resolve_failures
+        self.tree_stats = self._tree_loader.tree_stats
 
-        # set annotation for spec mutations
-        if self.spec_mutations_from_previous_scan:
-            spec_mutations = self.spec_mutations_from_previous_scan
-            for _tree in trees:
-                for callobj in _tree.items:
-                    if not isinstance(callobj, TaskCall):
-                        continue
-                    obj_key = callobj.spec.key
-                    if obj_key in spec_mutations:
-                        m = spec_mutations[obj_key]
-                        rule_id = m.rule.rule_id
-                        value = {
-                            "rule_id": rule_id,
-                            "changes": m.changes,
-                        }
-                        callobj.set_annotation(key="spec.mutations", value=value, rule_id=rule_id)
+        self.set_spec_mutation_annotations(trees)
 
         self.trees = trees
         self.additional = additional
         self.extra_requirements = extra_requirements
         self.resolve_failures = resolve_failures
 
+        self.save_trees()
+        return
+
+    def set_spec_mutation_annotations(self, trees: list):
+        # set annotation for spec mutations
+        if not self.spec_mutations_from_previous_scan:
+            return
+        spec_mutations = self.spec_mutations_from_previous_scan
+        for _tree in trees:
+            for callobj in _tree.items:
+                if not isinstance(callobj, TaskCall):
+                    continue
+                obj_key = callobj.spec.key
+                if obj_key in spec_mutations:
+                    m = spec_mutations[obj_key]
+                    rule_id = m.rule.rule_id
+                    value = {
+                        "rule_id": rule_id,
+                        "changes": m.changes,
+                    }
+                    callobj.set_annotation(key="spec.mutations", value=value, rule_id=rule_id)
+
+    def save_trees(self):
         if self.do_save:
             root_def_dir = self.__path_mappings["root_definitions"]
             tree_rel_file = os.path.join(root_def_dir, "tree.json")
@@ -619,26 +708,35 @@ class SingleScan(object):
         return
 
     def resolve_variables(self, ram_client=None):
-        taskcalls_in_trees = resolve(self.trees, self.additional)
+        taskcalls_in_trees = resolve(self.trees, self.additional, self.max_loop_items)
         self.taskcalls_in_trees = taskcalls_in_trees
 
-        for i, tree in enumerate(self.trees):
-            last_item = i + 1 == len(self.trees)
-            scan_metadata = {
-                "type": self.type,
-                "name": self.name,
-            }
-            ctx = AnsibleRunContext.from_tree(
-                tree=tree, parent=self.target_object, last_item=last_item, ram_client=ram_client, scan_metadata=scan_metadata
-            )
+        for i in range(len(self.trees)):
+            ctx = self.make_context(i, ram_client)
             self.contexts.append(ctx)
 
+        self.save_taskcalls_in_trees()
+        return
+
+    def make_context(self, tree_index: int, ram_client=None):
+        tree = self.trees[tree_index]
+        last_item = tree_index + 1 == len(self.trees)
+        scan_metadata = {
+            "type": self.type,
+            "name": self.name,
+        }
+        ctx = AnsibleRunContext.from_tree(
+            tree=tree, parent=self.target_object, last_item=last_item, ram_client=ram_client, scan_metadata=scan_metadata
+        )
+        return ctx
+
+    def save_taskcalls_in_trees(self):
         if self.do_save:
             root_def_dir = self.__path_mappings["root_definitions"]
             tasks_in_t_path = os.path.join(root_def_dir, "tasks_in_trees.json")
             tasks_in_t_lines = []
-            for d in taskcalls_in_trees:
-                line = jsonpickle.encode(d, make_refs=False)
+            for d in self.taskcalls_in_trees:
+                line = codec.encode(d)
                 tasks_in_t_lines.append(line)
 
             open(tasks_in_t_path, "w").write("\n".join(tasks_in_t_lines))
@@ -648,31 +746,210 @@ class SingleScan(object):
         contexts = analyze(self.contexts)
         self.contexts = contexts
 
+        self.save_contexts()
+        return
+
+    def save_contexts(self):
         if self.do_save:
             root_def_dir = self.__path_mappings["root_definitions"]
             contexts_a_path = os.path.join(root_def_dir, "contexts_with_analysis.json")
             conetxts_a_lines = []
-            for d in contexts:
+            for d in self.contexts:
                 line = jsonpickle.encode(d, make_refs=False)
                 conetxts_a_lines.append(line)
 
             open(contexts_a_path, "w").write("\n".join(conetxts_a_lines))
-
         return
 
     def apply_rules(self):
-        target_name = self.name
-        if self.collection_name:
-            target_name = self.collection_name
-        if self.role_name:
-            target_name = self.role_name
         data_report, rules_cache = detect(
             self.contexts, rules_dir=self.rules_dir, rules=self.rules, rules_cache=self.rules_cache, save_only_rule_result=self.save_only_rule_result
         )
         self.rules_cache = rules_cache
+        self.spec_mutations_per_target = data_report.pop("spec_mutations_per_target", [])
         spec_mutations = data_report.get("spec_mutations", {})
         if spec_mutations:
             self.spec_mutations = spec_mutations
+        self.make_findings(data_report)
+        return
+
+    def apply_rules_streaming(self, ram_client=None):
+        """
+        resolve variables, annotate and evaluate rules for each tree in turn, and append the target result to
+        `rule_result.jsonl` in out_dir. a context and its result are released once written,
+        so the memory usage is bounded by the largest tree instead of the entire result.
+        """
+        if not self.out_dir:
+            raise ValueError("out_dir must be a non-empty value to stream the rule result")
+        if not self.rules_cache:
+            self.rules_cache = load_rules(self.rules_dir, self.rules, False)
+
+        writer = RuleResultWriter(fpath=os.path.join(self.out_dir, rule_result_stream_file_name))
+        self.spec_mutations_per_target = []
+        for t_result, t_spec_mutations in iter_detect(
+            self._iter_contexts(ram_client), rules_cache=self.rules_cache, save_only_rule_result=self.save_only_rule_result
+        ):
+            writer.write(t_result)
+            self.spec_mutations_per_target.append(t_spec_mutations)
+        self._make_streaming_findings(writer)
+        return
+
+    def rescan_streaming(self, ram_client=None):
+        """
+        the streaming version of `rescan()`. the trees containing mutated objects are evaluated again and
+        their lines in `rule_result.jsonl` are replaced; the lines of the other trees are kept as they are.
+        """
+        affected = self._rebuild_mutated_trees(ram_client)
+        fpath = os.path.join(self.out_dir, rule_result_stream_file_name)
+        prev_fpath = fpath + ".prev"
+        os.replace(fpath, prev_fpath)
+        writer = RuleResultWriter(fpath=fpath)
+        if affected is None:
+            # all the trees are reconstructed, so none of the previous lines can be reused
+            affected = list(range(len(self.trees)))
+            self.spec_mutations_per_target = [{} for _ in self.trees]
+        new_results = iter_detect(
+            self._iter_contexts(ram_client, affected), rules_cache=self.rules_cache, save_only_rule_result=self.save_only_rule_result
+        )
+        affected = set(affected)
+        with open(prev_fpath, "r") as prev_file:
+            for i in range(len(self.trees)):
+                prev_line = prev_file.readline()
+                if i in affected:
+                    t_result, t_spec_mutations = next(new_results)
+                    writer.write(t_result)
+                    self.spec_mutations_per_target[i] = t_spec_mutations
+                else:
+                    writer.write_line(prev_line.rstrip("\n"))
+        os.remove(prev_fpath)
+        self._make_streaming_findings(writer)
+        return
+
+    def _make_streaming_findings(self, writer: RuleResultWriter):
+        spec_mutations = {}
+        for t_spec_mutations in self.spec_mutations_per_target:
+            spec_mutations.update(t_spec_mutations)
+        self.spec_mutations = spec_mutations
+        data_report = {
+            "summary": {},
+            "details": [],
+            "ari_result": None,
+            "spec_mutations": spec_mutations,
+            "rule_result_file": writer.fpath,
+        }
+        self.make_findings(data_report)
+        return
+
+    def _iter_contexts(self, ram_client=None, tree_indices=None):
+        if tree_indices is None:
+            tree_indices = range(len(self.trees))
+        for i in tree_indices:
+            resolve([self.trees[i]], self.additional, self.max_loop_items)
+            ctx = self.make_context(i, ram_client)
+            yield analyze([ctx])[0]
+
+    def rescan(self, ram_client=None):
+        """
+        evaluate the target again with the spec mutations found by the last evaluation.
+        the loaded definitions are reused, and only the trees containing mutated objects are
+        reconstructed, resolved, annotated and evaluated by rules. the other trees keep their results.
+        """
+        affected = self._rebuild_mutated_trees(ram_client)
+        if affected is None:
+            self.contexts = []
+            self.resolve_variables(ram_client)
+            self.annotate()
+            self.apply_rules()
+            return
+
+        new_trees = [self.trees[i] for i in affected]
+        new_taskcalls_in_trees = {d.root_key: d for d in resolve(new_trees, self.additional, self.max_loop_items)}
+        self.taskcalls_in_trees = [new_taskcalls_in_trees.get(d.root_key, d) for d in self.taskcalls_in_trees]
+        self.save_taskcalls_in_trees()
+
+        contexts = [self.make_context(i, ram_client) for i in affected]
+        contexts = analyze(contexts)
+        for i, ctx in zip(affected, contexts):
+            self.contexts[i] = ctx
+        self.save_contexts()
+
+        data_report, rules_cache = detect(
+            contexts, rules_dir=self.rules_dir, rules=self.rules, rules_cache=self.rules_cache, save_only_rule_result=self.save_only_rule_result
+        )
+        self.rules_cache = rules_cache
+        ari_result = self.findings.report.get("ari_result", None)
+        new_targets = data_report["ari_result"].targets
+        new_spec_mutations_per_target = data_report.get("spec_mutations_per_target", [])
+        for j, i in enumerate(affected):
+            ari_result.targets[i] = new_targets[j]
+            self.spec_mutations_per_target[i] = new_spec_mutations_per_target[j]
+
+        spec_mutations = {}
+        for t_spec_mutations in self.spec_mutations_per_target:
+            spec_mutations.update(t_spec_mutations)
+        self.spec_mutations = spec_mutations
+
+        data_report["ari_result"] = ari_result
+        data_report["spec_mutations"] = spec_mutations
+        data_report.pop("spec_mutations_per_target", None)
+        self.make_findings(data_report)
+        return
+
+    def _rebuild_mutated_trees(self, ram_client=None):
+        """
+        apply the spec mutations found by the last evaluation and reconstruct the trees containing mutated objects.
+        return the indices of the reconstructed trees, or None if all the trees are constructed again.
+        """
+        previous_mutations = self.spec_mutations_from_previous_scan or {}
+        self.spec_mutations_from_previous_scan = self.spec_mutations
+        self.spec_mutations = {}
+
+        updated_objects = self.apply_spec_mutations()
+        self.set_target_object()
+
+        changed_keys = set(previous_mutations.keys()) | set(self.spec_mutations_from_previous_scan.keys())
+        changed_keys |= set([obj.key for obj in updated_objects])
+        affected = []
+        for i, _tree in enumerate(self.trees):
+            for callobj in _tree.items:
+                spec = getattr(callobj, "spec", None)
+                if spec is not None and spec.key in changed_keys:
+                    affected.append(i)
+                    break
+
+        if self._tree_loader is None:
+            self.construct_trees(ram_client)
+            return None
+
+        root_keys = [self.trees[i].items[0].spec.key for i in affected]
+        self._tree_loader.update_definitions(updated_objects)
+        new_trees, new_tree_resolve_failures = self._tree_loader.rebuild_trees(root_keys)
+
+        # taskfiles covered by playbook/role trees are not scanned as independent trees,
+        # so the whole scan is needed if the mutations changed the taskfiles in trees
+        if self.load_all_taskfiles:
+            old_taskfiles = _taskfile_keys_in_trees([self.trees[i] for i in affected])
+            new_taskfiles = _taskfile_keys_in_trees(new_trees)
+            if old_taskfiles != new_taskfiles:
+                self.construct_trees(ram_client)
+                return None
+
+        self.set_spec_mutation_annotations(new_trees)
+        for i, new_tree, failures in zip(affected, new_trees, new_tree_resolve_failures):
+            self.trees[i] = new_tree
+            self.tree_resolve_failures[i] = failures
+            self.tree_stats[i] = get_tree_stats(new_tree)
+        self.resolve_failures = sum_resolve_failures(self.tree_resolve_failures)
+        self.extra_requirements = self._tree_loader.extra_requirements
+        self.save_trees()
+        return affected
+
+    def make_findings(self, data_report: dict):
+        target_name = self.name
+        if self.collection_name:
+            target_name = self.collection_name
+        if self.role_name:
+            target_name = self.role_name
         metadata = {
             "type": self.type,
             "name": target_name,
@@ -773,6 +1050,9 @@ class ARIScanner(object):
     write_ram: bool = False
 
     persist_dependency_cache: bool = False
+    dependency_load_workers: int = 0
+    tree_construction_workers: int = 0
+    max_loop_items: int = 0
 
     skip_playbook_format_error: bool = (True,)
     skip_task_format_error: bool = (True,)
@@ -787,12 +1067,26 @@ class ARIScanner(object):
     silent: bool = False
     output_format: str = ""
 
+    # if true, record the details of each scan such as time per file, annotator and rule
+    profile: bool = False
+    # if specified, the profile is saved to this directory; otherwise it is saved to out_dir if any
+    profile_dir: str = ""
+    # if true, also save cProfile stats in addition to the profile
+    cprofile: bool = False
+
     _current: SingleScan = None
+    _profiler: Profiler = None
 
     def __post_init__(self):
         if not self.config:
             self.config = config
 
+        if not self.dependency_load_workers:
+            self.dependency_load_workers = self.config.dependency_load_workers
+        if not self.tree_construction_workers:
+            self.tree_construction_workers = self.config.tree_construction_workers
+        if not self.max_loop_items:
+            self.max_loop_items = self.config.max_loop_items
         if not self.root_dir:
             self.root_dir = self.config.data_dir
         if not self.rules_dir:
@@ -800,17 +1094,120 @@ class ARIScanner(object):
         if not self.rules:
             self.rules = self.config.rules
         if not self.ram_client:
-            self.ram_client = RAMClient(root_dir=self.root_dir)
+            self.ram_client = RAMClient(root_dir=self.root_dir, cache_max_size_mb=self.config.ram_cache_max_size_mb)
+        parse_cache = None
+        if self.config.parse_cache:
+            parse_cache = ParseCache(
+                cache_dir=os.path.join(self.root_dir, parse_cache_dir_name),
+                max_size_mb=self.config.parse_cache_max_size_mb,
+            )
         self._parser = Parser(
             do_save=self.do_save,
             use_ansible_doc=self.use_ansible_doc,
             skip_playbook_format_error=self.skip_playbook_format_error,
             skip_task_format_error=self.skip_task_format_error,
+            parse_cache=parse_cache,
         )
 
         if not self.silent:
             logger.debug(f"config: {self.config}")
 
+    def warm_up(self):
+        """
+        load builtin modules, annotators and rules in advance so that they are shared by subsequent scans
+        """
+        load_builtin_modules()
+        load_annotators()
+        if not self.rules_cache:
+            self.rules_cache = load_rules(self.rules_dir, self.rules, False)
+
+    def evaluate_many(self, targets: list, workers: int = 1):
+        """
+        evaluate multiple targets and yield `(index, ari_result, error)` for each target in the order of `targets`.
+        each target is a dict of keyword arguments for `evaluate()`.
+        when `workers` is larger than 1, targets are distributed to a process pool and every worker process
+        keeps its own warm scanner (RAM indices, rules, annotators and builtin modules) across targets.
+        """
+        if workers <= 1:
+            self.warm_up()
+            for i, target in enumerate(targets):
+                result, error = _evaluate_target(self, target)
+                yield i, result, error
+            return
+
+        # worker scanners run with the same configuration as this scanner; the config also has the parse cache settings
+        scanner_kwargs = dict(
+            config=self.config,
+            root_dir=self.root_dir,
+            rules_dir=self.rules_dir,
+            rules=self.rules,
+            read_ram=self.read_ram,
+            read_ram_for_dependency=self.read_ram_for_dependency,
+            write_ram=self.write_ram,
+            persist_dependency_cache=self.persist_dependency_cache,
+            max_loop_items=self.max_loop_items,
+            skip_playbook_format_error=self.skip_playbook_format_error,
+            skip_task_format_error=self.skip_task_format_error,
+            use_ansible_doc=self.use_ansible_doc,
+            do_save=self.do_save,
+            show_all=self.show_all,
+            pretty=self.pretty,
+            silent=True,
+            output_format=self.output_format,
+            profile=self.profile,
+            profile_dir=self.profile_dir,
+            cprofile=self.cprofile,
+        )
+        ram_client_kwargs = self._get_ram_client_kwargs()
+        results = joblib.Parallel(n_jobs=workers, return_as="generator")(
+            joblib.delayed(_evaluate_target_in_worker)(scanner_kwargs, ram_client_kwargs, target) for target in targets
+        )
+        for i, (result, error) in enumerate(results):
+            yield i, result, error
+
+    def load_dependencies(self, load_jobs: list, read_ram: bool):
+        """
+        scan dependencies which are not found in RAM and return their root definitions by the dependency key.
+        when `dependency_load_workers` is larger than 1, the jobs are executed by a process pool.
+        each worker process only parses the dependency (`load_only=True`), so RAM is not written by the workers.
+        """
+        if not load_jobs:
+            return {}
+
+        scanner_kwargs = dict(
+            root_dir=self.root_dir,
+            read_ram=read_ram,
+            read_ram_for_dependency=self.read_ram_for_dependency,
+            write_ram=self.write_ram,
+            use_ansible_doc=self.use_ansible_doc,
+            do_save=self.do_save,
+        )
+        n_jobs = min(self.dependency_load_workers, len(load_jobs))
+        if n_jobs <= 1:
+            results = [_load_dependency_definitions(scanner_kwargs, eval_kwargs, self.ram_client) for _, eval_kwargs in load_jobs]
+        else:
+            if not self.silent:
+                logger.debug(f"loading {len(load_jobs)} dependencies with {n_jobs} workers")
+            scanner_kwargs["write_ram"] = False
+            ram_client_kwargs = self._get_ram_client_kwargs()
+            results = joblib.Parallel(n_jobs=n_jobs)(
+                joblib.delayed(_load_dependency_definitions)(scanner_kwargs, eval_kwargs, ram_client_kwargs=ram_client_kwargs)
+                for _, eval_kwargs in load_jobs
+            )
+
+        loaded_definitions = {}
+        for (key, _), definitions in zip(load_jobs, results):
+            loaded_definitions[key] = definitions
+        return loaded_definitions
+
+    def _get_ram_client_kwargs(self):
+        # worker processes read the same RAM with the same configuration as the client of this scanner
+        return dict(
+            root_dir=self.ram_client.root_dir,
+            cache_max_size_mb=self.ram_client.cache_max_size_mb,
+            index_journal=self.ram_client.index_journal,
+        )
+
     def evaluate(
         self,
         type: str,
@@ -838,12 +1235,14 @@ class ARIScanner(object):
         include_test_contents: bool = False,
         load_all_taskfiles: bool = False,
         save_only_rule_result: bool = False,
+        stream_rule_result: bool = False,
         yaml_label_list: list = None,
         objects: bool = False,
         out_dir: str = "",
         spec_mutations_from_previous_scan: dict = None,
     ):
         time_records = {}
+        self.start_profile()
         self.record_begin(time_records, "scandata_init")
 
         if not name and path:
@@ -880,7 +1279,10 @@ class ARIScanner(object):
             taskfile_only=taskfile_only,
             include_test_contents=include_test_contents,
             load_all_taskfiles=load_all_taskfiles,
+            tree_construction_workers=self.tree_construction_workers,
+            max_loop_items=self.max_loop_items,
             save_only_rule_result=save_only_rule_result,
+            stream_rule_result=stream_rule_result,
             yaml_label_list=yaml_label_list,
             out_dir=out_dir,
             root_dir=self.root_dir,
@@ -917,6 +1319,7 @@ class ARIScanner(object):
             logger.debug(f"finished preparing {scandata.type} {scandata.name}")
 
         if download_only:
+            self.stop_profile(scandata)
             return None
         self.record_end(time_records, "metadata_load")
 
@@ -939,6 +1342,11 @@ class ARIScanner(object):
 
             # Start ARI Scanner main flow
             self.record_begin(time_records, "dependency_load")
+            read_ram_for_dependency = self.read_ram or self.read_ram_for_dependency
+            # dependency key --> definitions; `None` means it is loaded by a job below
+            # the key order follows `ext_list` so that the merged result does not depend on job scheduling
+            dep_definitions = {}
+            load_jobs = []
             for i, (ext_type, ext_name, ext_ver, ext_hash, ext_path, is_local_dir) in enumerate(ext_list):
                 if not self.silent:
                     if i == 0:
@@ -966,14 +1374,13 @@ class ARIScanner(object):
                     key = "{}-{}".format(ext_type, ext_name)
                     if role_name_for_local_dep:
                         key = "{}-{}".format(ext_type, role_name_for_local_dep)
-                    read_ram_for_dependency = self.read_ram or self.read_ram_for_dependency
 
                     dep_loaded = False
                     if read_ram_for_dependency:
                         # searching findings from ARI RAM and use them if found
                         dep_loaded, ext_defs = self.load_definitions_from_ram(ext_type, ext_name, ext_ver, ext_hash)
                         if dep_loaded:
-                            scandata.ext_definitions[key] = ext_defs
+                            dep_definitions[key] = ext_defs
                             if not self.silent:
                                 logger.debug(f'Use spec data for "{ext_name}" in RAM DB')
 
@@ -983,38 +1390,36 @@ class ARIScanner(object):
                         if not os.path.exists(ext_target_path):
                             continue
 
-                        # scan dependencies and save findings to ARI RAM
-                        dep_scanner = ARIScanner(
-                            root_dir=self.root_dir,
-                            rules_dir="",
-                            rules=[],
-                            ram_client=self.ram_client,
-                            read_ram=read_ram_for_dependency,
-                            read_ram_for_dependency=self.read_ram_for_dependency,
-                            write_ram=self.write_ram,
-                            use_ansible_doc=self.use_ansible_doc,
-                            do_save=self.do_save,
-                            silent=True,
+                        # scan dependencies later (possibly in parallel)
+                        dep_definitions[key] = None
+                        load_jobs.append(
+                            (
+                                key,
+                                dict(
+                                    type=ext_type,
+                                    name=ext_name,
+                                    version=ext_ver,
+                                    hash=ext_hash,
+                                    target_path=ext_target_path,
+                                    dependency_dir=scandata.dependency_dir,
+                                    install_dependencies=False,
+                                    use_ansible_path=False,
+                                    skip_dependency=True,
+                                    source_repository=scandata.source_repository,
+                                    include_test_contents=include_test_contents,
+                                    load_all_taskfiles=load_all_taskfiles,
+                                    load_only=True,
+                                ),
+                            )
                         )
-                        # use prepared dep dirs
-                        dep_scanner.evaluate(
-                            type=ext_type,
-                            name=ext_name,
-                            version=ext_ver,
-                            hash=ext_hash,
-                            target_path=ext_target_path,
-                            dependency_dir=scandata.dependency_dir,
-                            install_dependencies=False,
-                            use_ansible_path=False,
-                            skip_dependency=True,
-                            source_repository=scandata.source_repository,
-                            include_test_contents=include_test_contents,
-                            load_all_taskfiles=load_all_taskfiles,
-                            load_only=True,
-                        )
-                        dep_scandata = dep_scanner.get_last_scandata()
-                        scandata.ext_definitions[key] = dep_scandata.root_definitions
-                        dep_loaded = True
+
+            loaded_definitions = self.load_dependencies(load_jobs, read_ram_for_dependency)
+            for key, ext_defs in dep_definitions.items():
+                if ext_defs is None:
+                    ext_defs = loaded_definitions.get(key, None)
+                if ext_defs is None:
+                    continue
+                scandata.ext_definitions[key] = ext_defs
 
             self.record_end(time_records, "dependency_load")
 
@@ -1038,10 +1443,10 @@ class ARIScanner(object):
                 scandata.root_definitions = root_defs
                 if not self.silent:
                     logger.info("Use spec data in RAM DB")
-        self.record_end(time_records, "target_load")
 
         if not loaded:
             scandata.load_definitions_root(target_path=scandata.target_path)
+        self.record_end(time_records, "target_load")
 
         scandata.set_target_object()
 
@@ -1063,6 +1468,7 @@ class ARIScanner(object):
         # load_only is True when this scanner is scanning dependency
         # otherwise, move on tree construction / rule evaluation
         if load_only:
+            self.stop_profile(scandata)
             return None
 
         _ram_client = None
@@ -1075,28 +1481,22 @@ class ARIScanner(object):
         if not self.silent:
             logger.debug("construct_trees() done")
 
-        self.record_begin(time_records, "variable_resolution")
-        scandata.resolve_variables(_ram_client)
-        self.record_end(time_records, "variable_resolution")
-        if not self.silent:
-            logger.debug("resolve_variables() done")
-
-        self.record_begin(time_records, "module_annotators")
-        scandata.annotate()
-        self.record_end(time_records, "module_annotators")
-        if not self.silent:
-            logger.debug("annotate() done")
-
-        self.record_begin(time_records, "apply_rules")
-        scandata.apply_rules()
-        self.record_end(time_records, "apply_rules")
-        if not self.silent:
-            logger.debug("apply_rules() done")
+        if scandata.stream_rule_result:
+            # variable resolution, annotation and rule evaluation are done per tree in the streaming mode
+            self.record_begin(time_records, "apply_rules")
+            scandata.apply_rules_streaming(_ram_client)
+            self.record_end(time_records, "apply_rules")
+            if not self.silent:
+                logger.debug("apply_rules_streaming() done")
+            self.rescan_mutated_trees(scandata, time_records, _ram_client)
+        else:
+            self.scan_trees(scandata, time_records, _ram_client)
 
         if scandata.rules_cache:
             self.rules_cache = scandata.rules_cache
 
         scandata.add_time_records(time_records=time_records)
+        self.stop_profile(scandata)
 
         dep_num, ext_counts, root_counts = scandata.count_definitions()
         if not self.silent:
@@ -1110,7 +1510,9 @@ class ARIScanner(object):
             self.register_indices_to_ram(scandata.findings, include_test_contents)
 
         if scandata.out_dir is not None and scandata.out_dir != "":
-            self.save_rule_result(scandata.findings, scandata.out_dir)
+            # the rule result is already written in the streaming mode
+            if not scandata.stream_rule_result:
+                self.save_rule_result(scandata.findings, scandata.out_dir)
             if not self.silent:
                 print("The rule result is saved at {}".format(scandata.out_dir))
 
@@ -1132,48 +1534,53 @@ class ARIScanner(object):
                 data_str = yaml.safe_dump(data)
             print(data_str)
 
-        if scandata.spec_mutations:
-            trigger_rescan = False
-            _previous = spec_mutations_from_previous_scan
+        return scandata.findings.report.get("ari_result", None)
+
+    def scan_trees(self, scandata: SingleScan, time_records: dict, ram_client: RAMClient = None):
+        self.record_begin(time_records, "variable_resolution")
+        scandata.resolve_variables(ram_client)
+        self.record_end(time_records, "variable_resolution")
+        if not self.silent:
+            logger.debug("resolve_variables() done")
+
+        self.record_begin(time_records, "module_annotators")
+        scandata.annotate()
+        self.record_end(time_records, "module_annotators")
+        if not self.silent:
+            logger.debug("annotate() done")
+
+        self.record_begin(time_records, "apply_rules")
+        scandata.apply_rules()
+        self.record_end(time_records, "apply_rules")
+        if not self.silent:
+            logger.debug("apply_rules() done")
+
+        self.rescan_mutated_trees(scandata, time_records, ram_client)
+        return
+
+    def rescan_mutated_trees(self, scandata: SingleScan, time_records: dict, ram_client: RAMClient = None):
+        # when rules found spec mutations, evaluate the mutated trees again
+        rescan_count = 0
+        while scandata.spec_mutations:
+            _previous = scandata.spec_mutations_from_previous_scan
             if _previous and equal(scandata.spec_mutations, _previous):
                 if not self.silent:
                     logger.warning("Spec mutation loop has been detected! " "Exitting the scan here but the result may be incomplete.")
-            else:
-                trigger_rescan = True
+                break
 
-            if trigger_rescan:
-                if not self.silent:
-                    print("Spec mutations are found. Triggering ARI scan again...")
-                return self.evaluate(
-                    type=type,
-                    name=name,
-                    path=path,
-                    collection_name=collection_name,
-                    role_name=role_name,
-                    install_dependencies=install_dependencies,
-                    use_ansible_path=use_ansible_path,
-                    version=version,
-                    hash=hash,
-                    target_path=target_path,
-                    dependency_dir=dependency_dir,
-                    download_only=download_only,
-                    load_only=load_only,
-                    skip_dependency=skip_dependency,
-                    use_src_cache=use_src_cache,
-                    source_repository=source_repository,
-                    playbook_yaml=playbook_yaml,
-                    playbook_only=playbook_only,
-                    taskfile_yaml=taskfile_yaml,
-                    taskfile_only=taskfile_only,
-                    include_test_contents=include_test_contents,
-                    load_all_taskfiles=load_all_taskfiles,
-                    objects=objects,
-                    raw_yaml=raw_yaml,
-                    out_dir=out_dir,
-                    spec_mutations_from_previous_scan=scandata.spec_mutations,
-                )
-
-        return scandata.findings.report.get("ari_result", None)
+            if not self.silent:
+                print("Spec mutations are found. Triggering ARI scan again...")
+            rescan_count += 1
+            record_name = f"rescan_{rescan_count}"
+            self.record_begin(time_records, record_name)
+            if scandata.stream_rule_result:
+                scandata.rescan_streaming(ram_client)
+            else:
+                scandata.rescan(ram_client)
+            self.record_end(time_records, record_name)
+            if not self.silent:
+                logger.debug("rescan() done")
+        return
 
     def load_metadata_from_ram(self, type, name, version):
         loaded, metadata, dependencies = self.ram_client.load_metadata_from_findings(type, name, version)
@@ -1231,7 +1638,28 @@ class ARIScanner(object):
             out_dir = self.ram_client.make_findings_dir_path(type, name, version, hash)
         self.ram_client.save_error(error, out_dir)
 
+    def start_profile(self):
+        self._profiler = None
+        if not self.profile and not self.profile_dir:
+            return
+        self._profiler = Profiler(use_cprofile=self.cprofile)
+        self._profiler.start(ram_cache_stats=self.ram_client.cache_stats, template_cache_stats=template_cache_stats)
+
+    def stop_profile(self, scandata: SingleScan):
+        if not self._profiler:
+            return
+        self._profiler.stop()
+        scandata.profile = self._profiler.to_dict()
+        profile_dir = self.profile_dir or scandata.out_dir
+        if profile_dir:
+            self._profiler.dump(profile_dir)
+            if not self.silent:
+                logger.info(f"The scan profile is saved at {profile_dir}")
+        self._profiler = None
+
     def record_begin(self, time_records: dict, record_name: str):
+        if self._profiler:
+            self._profiler.begin_stage(record_name)
         time_records[record_name] = {}
         time_records[record_name]["begin"] = datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')
 
@@ -1242,6 +1670,8 @@ class ARIScanner(object):
         begin = datetime.datetime.fromisoformat(time_records[record_name]["begin"])
         elapsed = (end - begin).total_seconds()
         time_records[record_name]["elapsed"] = elapsed
+        if self._profiler:
+            self._profiler.end_stage(record_name)
 
 
 def tree(root_definitions, ext_definitions, ram_client=None, target_playbook_path=None, target_taskfile_path=None, load_all_taskfiles=False):
@@ -1259,7 +1689,7 @@ def tree(root_definitions, ext_definitions, ram_client=None, target_playbook_pat
     )
 
 
-def resolve(trees, additional):
+def resolve(trees, additional, max_loop_items=0):
     taskcalls_in_trees = []
     for i, tree in enumerate(trees):
         if not isinstance(tree, ObjectList):
@@ -1268,7 +1698,7 @@ def resolve(trees, additional):
             continue
         root_key = tree.items[0].spec.key
         logger.debug("[{}/{}] {}".format(i + 1, len(trees), root_key))
-        taskcalls = resolve_variables(tree, additional)
+        taskcalls = resolve_variables(tree, additional, max_loop_items)
         d = TaskCallsInTree(
             root_key=root_key,
             taskcalls=taskcalls,
@@ -1277,6 +1707,74 @@ def resolve(trees, additional):
     return taskcalls_in_trees
 
 
+def _taskfile_keys_in_trees(trees: list):
+    taskfile_keys = set()
+    for _tree in trees:
+        for callobj in _tree.items:
+            spec = getattr(callobj, "spec", None)
+            if isinstance(spec, TaskFile):
+                taskfile_keys.add(spec.key)
+    return taskfile_keys
+
+
+# RAM clients in the current process by their configuration; this is populated only in worker processes of `load_dependencies()`
+_worker_ram_clients = {}
+
+
+def _get_worker_ram_client(ram_client_kwargs: dict):
+    client_id = json.dumps(ram_client_kwargs, sort_keys=True)
+    ram_client = _worker_ram_clients.get(client_id, None)
+    if not ram_client:
+        ram_client = RAMClient(**ram_client_kwargs)
+        _worker_ram_clients[client_id] = ram_client
+    return ram_client
+
+
+def _load_dependency_definitions(scanner_kwargs: dict, eval_kwargs: dict, ram_client: RAMClient = None, ram_client_kwargs: dict = None):
+    # this is module-level so that it can be pickled and executed in a worker process
+    # a worker reuses its RAM client across jobs instead of setting up indices and caches for every job
+    if ram_client is None and ram_client_kwargs:
+        ram_client = _get_worker_ram_client(ram_client_kwargs)
+    dep_scanner = ARIScanner(
+        rules_dir="",
+        rules=[],
+        ram_client=ram_client,
+        silent=True,
+        **scanner_kwargs,
+    )
+    # use prepared dep dirs
+    dep_scanner.evaluate(**eval_kwargs)
+    dep_scandata = dep_scanner.get_last_scandata()
+    return dep_scandata.root_definitions
+
+
+# warm scanners in the current process; this is populated only in worker processes of `evaluate_many()`
+_warm_scanners = {}
+
+
+def _evaluate_target(scanner: ARIScanner, target: dict):
+    result = None
+    error = ""
+    try:
+        result = scanner.evaluate(**target)
+    except Exception as exc:
+        error = traceback.format_exc()
+        logger.warning(f"failed to scan the target {target.get('name', '') or target.get('path', '')}: {exc}")
+    return result, error
+
+
+def _evaluate_target_in_worker(scanner_kwargs: dict, ram_client_kwargs: dict, target: dict):
+    scanner_id = json.dumps([scanner_kwargs, ram_client_kwargs], sort_keys=True, default=repr)
+    scanner = _warm_scanners.get(scanner_id, None)
+    if not scanner:
+        ram_client = _get_worker_ram_client(ram_client_kwargs)
+        # dependencies are loaded and trees are constructed serially in a worker to avoid nested process pools
+        scanner = ARIScanner(dependency_load_workers=1, tree_construction_workers=1, ram_client=ram_client, **scanner_kwargs)
+        scanner.warm_up()
+        _warm_scanners[scanner_id] = scanner
+    return _evaluate_target(scanner, target)
+
+
 if __name__ == "__main__":
     __target_type = sys.argv[1]
     __target_name = sys.argv[2]
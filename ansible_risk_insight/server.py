@@ -0,0 +1,190 @@
+# -*- mode:python; coding:utf-8 -*-
+
+# Copyright (c) 2022 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import json
+import time
+import inspect
+import threading
+import traceback
+import socketserver
+import jsonpickle
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from dataclasses import dataclass, field
+
+from .scanner import ARIScanner
+import ansible_risk_insight.logger as logger
+
+# options of `ARIScanner.evaluate()` which can be specified in a scan request
+evaluate_options = [p for p in inspect.signature(ARIScanner.evaluate).parameters if p != "self"]
+
+# the default values for a scan request which are different from `ARIScanner.evaluate()`
+default_request_options = {
+    "install_dependencies": False,
+}
+
+# options of a scan request which install packages; they are accepted only if the server allows it
+install_options = ["install_dependencies", "download_only"]
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class ScanRequestHandler(BaseHTTPRequestHandler):
+    server_version = "ARIServer"
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": f"unknown path: {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/scan":
+            self._send_json(404, {"error": f"unknown path: {self.path}"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except Exception as exc:
+            self._send_json(400, {"error": f"failed to parse the request: {exc}"})
+            return
+
+        status, response = self.server.ari_server.scan(request)
+        self._send_json(status, response)
+
+    def _send_json(self, status: int, data: dict):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        # client_address is an empty string for a unix domain socket
+        if isinstance(self.client_address, tuple):
+            return self.client_address[0]
+        return "unix"
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s" % (self.address_string(), format % args))
+
+
+@dataclass
+class ARIServer(object):
+    scanner: ARIScanner = None
+
+    host: str = "127.0.0.1"
+    port: int = 8765
+    # if specified, listen on this unix domain socket instead of localhost TCP
+    socket_path: str = ""
+    # directories under which a scan request may write results with `out_dir` or install dependencies with `dependency_dir`
+    # a request with these options is rejected unless the path is in one of them
+    allowed_write_dirs: list = field(default_factory=list)
+    # if true, a scan request may install dependencies with `install_dependencies` or `download_only`
+    allow_install_dependencies: bool = False
+
+    _server: socketserver.BaseServer = None
+    # ARIScanner keeps the last scan data, so scans are serialized
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def __post_init__(self):
+        if not self.scanner:
+            self.scanner = ARIScanner(silent=True)
+        self.allowed_write_dirs = [os.path.realpath(d) for d in self.allowed_write_dirs]
+        # load everything that can be reused across scan requests before accepting requests
+        self.scanner.warm_up()
+
+    def scan(self, request: dict):
+        if not isinstance(request, dict):
+            return 400, {"error": "a scan request must be a JSON object"}
+
+        unknown = [k for k in request if k not in evaluate_options]
+        if unknown:
+            return 400, {"error": f"unknown options: {unknown}"}
+        if "type" not in request:
+            return 400, {"error": "`type` must be specified"}
+        error = self._check_restricted_options(request)
+        if error:
+            return 403, {"error": error}
+
+        kwargs = default_request_options.copy()
+        kwargs.update(request)
+        # raw YAML content is loaded with a virtual file path so that the tree can find it as the scan target
+        if kwargs.get("raw_yaml"):
+            if not kwargs.get("name"):
+                kwargs["name"] = kwargs.get("path") or "__in_memory__"
+            if not kwargs.get("target_path"):
+                kwargs["target_path"] = kwargs["name"]
+
+        start = time.time()
+        try:
+            with self._lock:
+                ari_result = self.scanner.evaluate(**kwargs)
+        except Exception:
+            error = traceback.format_exc()
+            logger.warning(f"failed to scan the request target: {error}")
+            return 500, {"error": error}
+        elapsed = round(time.time() - start, 3)
+
+        result = None
+        if ari_result:
+            result = json.loads(jsonpickle.encode(ari_result, make_refs=False, unpicklable=False))
+        return 200, {"result": result, "elapsed": elapsed}
+
+    def _check_restricted_options(self, request: dict):
+        installing = any(request.get(k, False) for k in install_options)
+        if installing and not self.allow_install_dependencies:
+            return f"installing dependencies is not allowed by this server: {[k for k in install_options if request.get(k, False)]}"
+        write_paths = {"out_dir": request.get("out_dir", "")}
+        if installing:
+            write_paths["dependency_dir"] = request.get("dependency_dir", "")
+        for key, path in write_paths.items():
+            if path and not self._is_allowed_write_path(path):
+                return f"`{key}` must be in a directory allowed by this server: {path}"
+        return ""
+
+    def _is_allowed_write_path(self, path: str):
+        real_path = os.path.realpath(path)
+        for allowed_dir in self.allowed_write_dirs:
+            if real_path == allowed_dir or real_path.startswith(allowed_dir.rstrip(os.sep) + os.sep):
+                return True
+        return False
+
+    def serve_forever(self):
+        if self.socket_path:
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+            self._server = UnixHTTPServer(self.socket_path, ScanRequestHandler)
+            address = self.socket_path
+        else:
+            self._server = ThreadingHTTPServer((self.host, self.port), ScanRequestHandler)
+            address = "http://{}:{}".format(*self._server.server_address[:2])
+        self._server.ari_server = self
+        logger.info(f"ARI server is listening on {address}")
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if self.socket_path and os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+
+    def shutdown(self):
+        if self._server:
+            self._server.shutdown()
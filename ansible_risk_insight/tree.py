@@ -19,6 +19,7 @@ import re
 import json
 from copy import deepcopy
 from dataclasses import dataclass, field
+import joblib
 import ansible_risk_insight.logger as logger
 from .keyutil import detect_type, key_delimiter, object_delimiter
 from .models import (
@@ -35,12 +36,12 @@ from .models import (
     TaskCall,
     PlayCall,
     RoleCall,
+    MutableContent,
     call_obj_from_spec,
 )
 from .model_loader import load_builtin_modules
 from .risk_assessment_model import RAMClient
 
-
 obj_type_dict = {
     "playbook": "playbooks",
     "play": "plays",
@@ -50,6 +51,9 @@ obj_type_dict = {
     "module": "modules",
 }
 
+# subtrees of these objects are expanded once and instantiated again for other callers
+memoized_subtree_types = (Playbook, Role, TaskFile)
+
 
 @dataclass
 class TreeNode(object):
@@ -167,6 +171,99 @@ class TreeNode(object):
         return len(self.definition) == 0
 
 
+@dataclass
+class Subtree(object):
+    """
+    call objects expanded from a key, which can be instantiated again for another caller.
+    `checked_keys` are all keys tested against the history during the expansion, and `history_keys` are
+    the ones found in the history then; the subtree is the same for a history only if these are the same.
+    """
+
+    # the call objects of the first expansion in the expanded order
+    call_objs: list = field(default_factory=list)
+    checked_keys: set = field(default_factory=set)
+    history_keys: set = field(default_factory=set)
+    # (type, name) of resolve failures found during the expansion
+    resolve_failures: list = field(default_factory=list)
+
+    @classmethod
+    def from_call_objects(cls, call_objs: list, checked_keys: set, history: set, resolve_failures: list):
+        return cls(
+            call_objs=call_objs,
+            checked_keys=checked_keys,
+            history_keys=_intersection(checked_keys, history),
+            resolve_failures=list(resolve_failures),
+        )
+
+    def is_valid_for(self, history: set):
+        return _intersection(self.checked_keys, history) == self.history_keys
+
+    def instantiate(self, caller: CallObject, index: int):
+        """
+        return a list of new call objects of the subtree
+        """
+        new_objs = []
+        # node ids of the first expansion to the new call objects
+        new_callers = {}
+        for i, call_obj in enumerate(self.call_objs):
+            if i == 0:
+                _caller = caller
+                _index = index
+            else:
+                parent_node_id, index_str = call_obj.node_id.rsplit(".", 1)
+                _caller = new_callers[parent_node_id]
+                _index = int(index_str)
+            if isinstance(call_obj, TaskCall):
+                new_obj = TaskCall.from_spec(call_obj.spec, _caller, _index)
+                new_obj.module = call_obj.module
+            else:
+                new_obj = call_obj_from_spec(spec=call_obj.spec, caller=_caller, index=_index)
+            new_callers[call_obj.node_id] = new_obj
+            new_objs.append(new_obj)
+        return new_objs
+
+
+@dataclass
+class _CallFrame(object):
+    # a call object being expanded by `TreeLoader._walk_calls()`
+    key: str = ""
+    call_obj: CallObject = None
+    children_keys: list = field(default_factory=list)
+    from_ram: dict = field(default_factory=dict)
+    handover: dict = field(default_factory=dict)
+    # the position of this call object in the expanded list
+    start: int = 0
+    next_child: int = 0
+    # (key, loop_found, loop_obj, position) of the child being expanded
+    child: tuple = None
+    checked_keys: set = field(default_factory=set)
+    subtree_key: tuple = None
+    failure_log_start: int = 0
+
+
+def get_tree_stats(tree: ObjectList):
+    """
+    return the size of the tree, the maximum depth from the root and the maximum number of children of a node
+    """
+    items = tree.items if isinstance(tree, ObjectList) else []
+    if not items:
+        return {"nodes": 0, "max_depth": 0, "max_fan_out": 0}
+    root_depth = items[0].depth
+    max_depth = 0
+    fan_out = {}
+    for call_obj in items[1:]:
+        max_depth = max(max_depth, call_obj.depth - root_depth)
+        parent_node_id = call_obj.node_id.rsplit(".", 1)[0]
+        fan_out[parent_node_id] = fan_out.get(parent_node_id, 0) + 1
+    return {"nodes": len(items), "max_depth": max_depth, "max_fan_out": max(fan_out.values(), default=0)}
+
+
+def _intersection(set1: set, set2: set):
+    if len(set1) > len(set2):
+        set1, set2 = set2, set1
+    return set([v for v in set1 if v in set2])
+
+
 def nodelist2branch(nodelist):
     if len(nodelist) == 0:
         return TreeNode()
@@ -236,6 +333,20 @@ def make_dicts(root_definitions, ext_definitions):
     return dicts
 
 
+def sum_resolve_failures(tree_resolve_failures: list):
+    resolve_failures = {
+        "module": {},
+        "taskfile": {},
+        "role": {},
+    }
+    for failures in tree_resolve_failures:
+        for type_key, counts in failures.items():
+            for name, count in counts.items():
+                current = resolve_failures[type_key].get(name, 0)
+                resolve_failures[type_key][name] = current + count
+    return resolve_failures
+
+
 def load_module_redirects(root_definitions, ext_definitions, module_dict={}):
     collection_list = root_definitions.get("collections", ObjectList())
     ext_collection_list = ext_definitions.get("collections", ObjectList())
@@ -337,7 +448,10 @@ def resolve_role(role_name, role_dict={}, my_collection_name="", collections_in_
     return role_key
 
 
-def resolve_taskfile(taskfile_ref, taskfile_dict={}, task_key=""):
+def get_task_location(task_key: str):
+    """
+    return the key prefix of the parent (e.g. `role:xxxx#`) and the path of the file where the task is defined
+    """
     type_prefix = "task "
     parts = task_key[len(type_prefix) :].split(object_delimiter)
     parent_key = ""
@@ -347,6 +461,11 @@ def resolve_taskfile(taskfile_ref, taskfile_dict={}, task_key=""):
             task_defined_path = p.split(key_delimiter)[1]
             parent_key = task_key[len(type_prefix) :].split(p)[0]
             break
+    return parent_key, task_defined_path
+
+
+def resolve_taskfile(taskfile_ref, taskfile_dict={}, task_key=""):
+    parent_key, task_defined_path = get_task_location(task_key)
 
     # include/import tasks can have a path like "roles/xxxx/tasks/yyyy.yml"
     # then try to find roles directory
@@ -405,9 +524,18 @@ def init_builtin_modules():
 
 class TreeLoader(object):
     def __init__(
-        self, root_definitions, ext_definitions, ram_client=None, target_playbook_path=None, target_taskfile_path=None, load_all_taskfiles=False
+        self,
+        root_definitions,
+        ext_definitions,
+        ram_client=None,
+        target_playbook_path=None,
+        target_taskfile_path=None,
+        load_all_taskfiles=False,
+        workers=1,
     ):
         self.ram_client: RAMClient = ram_client
+        # the number of processes to construct trees (1 means serial construction)
+        self.workers = workers
 
         self.org_root_definitions = root_definitions
         self.org_ext_definitions = ext_definitions
@@ -469,6 +597,8 @@ class TreeLoader(object):
         self.load_all_taskfiles = load_all_taskfiles
 
         self.module_resolve_cache = {}
+        # role names are resolved with the collection context, and taskfile paths with the location of the task;
+        # so they are cached with the context, see `_role_resolve_cache_key()` and `_taskfile_resolve_cache_key()`
         self.role_resolve_cache = {}
         self.taskfile_resolve_cache = {}
 
@@ -478,6 +608,8 @@ class TreeLoader(object):
 
         self.extra_requirements = []
         self.extra_requirement_obj_set = set()
+        # object keys of `extra_requirements` in the same order
+        self.extra_requirement_keys = []
 
         self.trees = []
 
@@ -486,6 +618,19 @@ class TreeLoader(object):
             "taskfile": {},
             "role": {},
         }
+        # resolve failures found in each tree; this is aligned with `self.trees`
+        self.tree_resolve_failures = []
+        # `get_tree_stats()` of each tree; this is aligned with `self.trees`
+        self.tree_stats = []
+        # all resolve failures as (type, name) in the order found, to be replayed when a subtree is reused
+        self._resolve_failure_log = []
+
+        # {(key, tasks_from): Subtree}
+        self.subtree_cache = {}
+        # attributes set to each definition during the construction by this loader, see `_record_resolved()`
+        self._resolved_attrs = {}
+        # task key --> the content copied from the task after the construction; contents of task calls share it
+        self._task_contents = {}
         return
 
     def run(self):
@@ -494,173 +639,378 @@ class TreeLoader(object):
             p_defs = self.org_root_definitions.get("definitions", {}).get("projects", [])
             if len(p_defs) > 0:
                 additional_objects.add(p_defs[0])
-        covered_taskfiles = []
-        for i, mapping in enumerate(self.playbook_mappings):
-            logger.debug("[{}/{}] {}".format(i + 1, len(self.playbook_mappings), mapping[1]))
-            playbook_key = mapping[1]
-            tree_objects = self._recursive_get_calls(playbook_key)
-            self.trees.append(tree_objects)
-
-            if self.load_all_taskfiles and tree_objects and tree_objects.items:
-                for call_obj in tree_objects.items:
-                    if not isinstance(call_obj, CallObject):
-                        continue
-                    spec_obj = call_obj.spec
-                    if isinstance(spec_obj, TaskFile):
-                        taskfile_key = spec_obj.key
-                        if taskfile_key not in covered_taskfiles:
-                            covered_taskfiles.append(taskfile_key)
+        root_keys = [mapping[1] for mapping in self.playbook_mappings] + [mapping[1] for mapping in self.role_mappings]
+        trees = self._build_trees(root_keys)
 
-        for i, mapping in enumerate(self.role_mappings):
-            logger.debug("[{}/{}] {}".format(i + 1, len(self.role_mappings), mapping[1]))
-            role_key = mapping[1]
-            tree_objects = self._recursive_get_calls(role_key)
-            self.trees.append(tree_objects)
-
-            if self.load_all_taskfiles and tree_objects and tree_objects.items:
+        covered_taskfiles = set()
+        if self.load_all_taskfiles:
+            for tree_objects in trees:
                 for call_obj in tree_objects.items:
                     if not isinstance(call_obj, CallObject):
                         continue
                     spec_obj = call_obj.spec
                     if isinstance(spec_obj, TaskFile):
-                        taskfile_key = spec_obj.key
-                        if taskfile_key not in covered_taskfiles:
-                            covered_taskfiles.append(taskfile_key)
+                        covered_taskfiles.add(spec_obj.key)
 
-        for i, mapping in enumerate(self.taskfile_mappings):
-            logger.debug("[{}/{}] {}".format(i + 1, len(self.taskfile_mappings), mapping[1]))
+        taskfile_keys = []
+        for mapping in self.taskfile_mappings:
             taskfile_key = mapping[1]
             if self.load_all_taskfiles and taskfile_key in covered_taskfiles:
                 continue
-            tree_objects = self._recursive_get_calls(taskfile_key)
-            self.trees.append(tree_objects)
+            taskfile_keys.append(taskfile_key)
+        self._build_trees(taskfile_keys)
+        self._set_task_contents(self.trees)
         return self.trees, additional_objects
 
-    def _recursive_get_calls(self, key, caller=None, handover={}, index=0, history=[]):
+    def __getstate__(self):
+        # trees are not sent to worker processes
+        state = self.__dict__.copy()
+        state["trees"] = []
+        state["tree_resolve_failures"] = []
+        state["tree_stats"] = []
+        state["subtree_cache"] = {}
+        state["_resolve_failure_log"] = []
+        state["_resolved_attrs"] = {}
+        state["_task_contents"] = {}
+        return state
+
+    def rebuild_trees(self, root_keys: list):
+        """
+        construct trees again only for the specified root keys and return them with their resolve failures.
+        this is used after `update_definitions()` and does not change `self.trees`.
+        """
+        trees = []
+        tree_resolve_failures = []
+        for root_key in root_keys:
+            tree_objects, failures = self._get_calls_with_failures(root_key)
+            trees.append(tree_objects)
+            tree_resolve_failures.append(failures)
+        # the tasks in the new trees may be resolved differently, so their contents are copied again
+        for tree_objects in trees:
+            for call_obj in tree_objects.items:
+                if isinstance(call_obj, TaskCall):
+                    self._task_contents.pop(call_obj.spec.key, None)
+        self._set_task_contents(trees)
+        return trees, tree_resolve_failures
+
+    def update_definitions(self, objects: list):
+        # replace root definitions with the specified objects which have the same keys
+        for obj in objects:
+            obj_type = detect_type(obj.key)
+            if obj_type not in obj_type_dict:
+                continue
+            type_key = obj_type_dict[obj_type]
+            obj_list = self.root_definitions.get(type_key, None)
+            if obj_list is None or not obj_list.contains(key=obj.key):
+                continue
+            obj_list.items = [obj if o.key == obj.key else o for o in obj_list.items]
+            obj_list.update_dict()
+            if type_key in self.dicts:
+                obj_dict_key = obj.fqcn if hasattr(obj, "fqcn") else obj.key
+                self.dicts[type_key][obj_dict_key] = obj
+        # expanded subtrees may contain the old definitions
+        self.subtree_cache = {}
+        return
+
+    def _build_trees(self, root_keys: list):
+        """
+        construct trees of the root keys and return them in the same order.
+        when `workers` is larger than 1, the keys are split into chunks and the chunks are constructed by a process pool.
+        """
+        n_jobs = min(self.workers, len(root_keys))
+        if n_jobs <= 1:
+            trees = []
+            for i, root_key in enumerate(root_keys):
+                logger.debug("[{}/{}] {}".format(i + 1, len(root_keys), root_key))
+                trees.append(self._build_tree(root_key))
+            return trees
+
+        logger.debug(f"constructing {len(root_keys)} trees with {n_jobs} workers")
+        chunk_size = -(-len(root_keys) // n_jobs)
+        chunks = [root_keys[i : i + chunk_size] for i in range(0, len(root_keys), chunk_size)]
+        results = joblib.Parallel(n_jobs=n_jobs)(joblib.delayed(_build_trees_in_worker)(self, chunk) for chunk in chunks)
+        trees = []
+        # results are merged in the order of the chunks, so the output is the same as the serial construction
+        for chunk_trees, resolved_attrs, tree_resolve_failures, tree_stats, extra_requirements, extra_requirement_keys in results:
+            worker_specs = {}
+            for tree_objects in chunk_trees:
+                worker_specs.update(self._adopt_call_objects(tree_objects))
+            # only the attributes set by the worker are copied, so the last chunk which resolved an attribute wins
+            # as the last tree which resolved it does in the serial construction
+            for key, attrs in resolved_attrs.items():
+                obj = self.get_object(key)
+                if key in worker_specs and obj is not None:
+                    _copy_resolved_info(worker_specs[key], obj, attrs)
+            self.trees.extend(chunk_trees)
+            self.tree_resolve_failures.extend(tree_resolve_failures)
+            self.tree_stats.extend(tree_stats)
+            for failures in tree_resolve_failures:
+                for type_key, counts in failures.items():
+                    for name, count in counts.items():
+                        self.resolve_failures[type_key][name] = self.resolve_failures[type_key].get(name, 0) + count
+            for obj_key, requirement in zip(extra_requirement_keys, extra_requirements):
+                if obj_key not in self.extra_requirement_obj_set:
+                    self.extra_requirements.append(requirement)
+                    self._mark_extra_requirement(obj_key)
+            trees.extend(chunk_trees)
+        return trees
+
+    def _adopt_call_objects(self, tree_objects: ObjectList):
+        """
+        replace the copies of the definitions in call objects made by a worker process with the definitions
+        of this loader, and return the copies by their keys
+        """
+        worker_specs = {}
+        for call_obj in tree_objects.items:
+            spec = call_obj.spec
+            obj = self.get_object(spec.key)
+            if obj is None:
+                # found in RAM by the worker
+                self.ext_definitions[obj_type_dict[detect_type(spec.key)]].add(spec)
+                continue
+            if obj is not spec:
+                worker_specs[spec.key] = spec
+                call_obj.spec = obj
+            if isinstance(call_obj, TaskCall) and call_obj.module is not None:
+                module = self.get_object(call_obj.module.key)
+                if module is not None:
+                    call_obj.module = module
+        return worker_specs
+
+    def _record_resolved(self, spec, *attrs):
+        self._resolved_attrs.setdefault(spec.key, set()).update(attrs)
+
+    def _set_task_contents(self, trees: list):
+        # a content is copied from the task spec after all the trees are constructed,
+        # so it does not depend on the order in which the task calls are made
+        for tree_objects in trees:
+            for call_obj in tree_objects.items:
+                if not isinstance(call_obj, TaskCall):
+                    continue
+                content = self._task_contents.get(call_obj.spec.key, None)
+                if content is None:
+                    content = MutableContent.from_task_spec(task_spec=call_obj.spec)
+                    self._task_contents[call_obj.spec.key] = content
+                # the copy is shared until it is changed
+                call_obj.content = content.shared_copy()
+
+    def _mark_extra_requirement(self, obj_key: str):
+        self.extra_requirement_obj_set.add(obj_key)
+        self.extra_requirement_keys.append(obj_key)
+
+    def _build_tree(self, root_key):
+        tree_objects, failures = self._get_calls_with_failures(root_key)
+        self.trees.append(tree_objects)
+        self.tree_resolve_failures.append(failures)
+        self.tree_stats.append(get_tree_stats(tree_objects))
+        return tree_objects
+
+    def _get_calls_with_failures(self, root_key):
+        failures_before = {type_key: counts.copy() for type_key, counts in self.resolve_failures.items()}
+        tree_objects = self._get_calls(root_key)
+        failures = {}
+        for type_key, counts in self.resolve_failures.items():
+            failures[type_key] = {}
+            for name, count in counts.items():
+                diff = count - failures_before[type_key].get(name, 0)
+                if diff > 0:
+                    failures[type_key][name] = diff
+        return tree_objects, failures
+
+    def _get_calls(self, key, caller=None, handover={}, index=0, history=None):
+        call_objs, _ = self._walk_calls(key, caller, handover, index, set(history or []))
         obj_list = ObjectList()
-        obj = self.get_object(key)
-        if obj is None:
-            return obj_list
-        if key in history:
-            return obj_list
-        _history = []
-        if history:
-            _history = [h for h in history]
-        call_obj = call_obj_from_spec(spec=obj, caller=caller, index=index)
-        if call_obj is not None:
-            obj_list.add(call_obj, update_dict=False)
-            _history.append(key)
-        children_keys, from_ram, handover = self._get_children_keys(obj, handover_from_upper_node=handover)
-        for i, c_key in enumerate(children_keys):
+        for i, call_obj in enumerate(call_objs):
+            obj_list.add(call_obj, update_dict=i > 0)
+        return obj_list
+
+    def _walk_calls(self, key, caller, handover, index, history: set):
+        """
+        expand the call objects under the key in depth-first order with an explicit stack, so deep include chains
+        do not hit the recursion limit. return a list of the call objects and the keys tested against `history`.
+        `history` is the keys of the callers for loop detection and it is updated only during the walk.
+        """
+        items = []
+        stack = []
+        entered = self._enter_call(key, caller, handover, index, history, items)
+        if not isinstance(entered, _CallFrame):
+            return items, entered
+        stack.append(entered)
+        checked_keys = set()
+        while stack:
+            frame = stack[-1]
+            if frame.child is not None:
+                self._link_child_call(frame, items)
+                frame.child = None
+            if frame.next_child >= len(frame.children_keys):
+                stack.pop()
+                checked_keys = self._exit_call(frame, history, items)
+                if stack:
+                    stack[-1].checked_keys.update(checked_keys)
+                continue
+            i = frame.next_child
+            frame.next_child += 1
+            c_key = frame.children_keys[i]
+            frame.checked_keys.add(c_key)
             loop_found = False
             loop_obj = None
-            if c_key in _history:
+            if c_key in history:
                 loop_found = True
                 loop_obj = self.get_object(c_key)
                 if isinstance(loop_obj, CallObject):
                     loop_obj = loop_obj.spec
-            child_objects = self._recursive_get_calls(
-                c_key,
-                call_obj,
-                handover,
-                i,
-                _history,
-            )
-            if isinstance(call_obj, TaskCall):
-                taskcall = call_obj
-                if len(child_objects.items) > 0:
-                    c_obj = child_objects.items[0]
-                    if taskcall.spec.executable_type == ExecutableType.MODULE_TYPE:
-                        taskcall.module = c_obj.spec
-                        if c_key in from_ram:
-                            req_info = from_ram[c_key]
-                            taskcall.spec.possible_candidates = [(c_obj.spec.fqcn, req_info)]
-                        else:
-                            taskcall.spec.resolved_name = c_obj.spec.fqcn
-                        taskcall.spec.module_info = {
-                            "collection": c_obj.spec.collection,
-                            "short_name": c_obj.spec.name,
-                            "fqcn": c_obj.spec.fqcn,
-                            "key": c_obj.spec.key,
-                        }
-                    elif taskcall.spec.executable_type == ExecutableType.ROLE_TYPE:
-                        if c_key in from_ram:
-                            req_info = from_ram[c_key]
-                            taskcall.spec.possible_candidates = [(c_obj.spec.fqcn, req_info)]
-                        else:
-                            taskcall.spec.resolved_name = c_obj.spec.fqcn
-                        taskcall.spec.include_info = {
-                            "type": "role",
-                            "fqcn": c_obj.spec.fqcn,
-                            "path": c_obj.spec.defined_in,
-                            "key": c_obj.spec.key,
-                        }
-                    elif taskcall.spec.executable_type == ExecutableType.TASKFILE_TYPE:
-                        if c_key in from_ram:
-                            req_info = from_ram[c_key]
-                            taskcall.spec.possible_candidates = [(c_obj.spec.key, req_info)]
-                        else:
-                            taskcall.spec.resolved_name = c_obj.spec.key
-                        taskcall.spec.include_info = {
-                            "type": "taskfile",
-                            "path": c_obj.spec.defined_in,
-                            "key": c_obj.spec.key,
-                        }
-                elif loop_found and loop_obj:
-                    if taskcall.spec.executable_type == ExecutableType.ROLE_TYPE:
-                        taskcall.spec.include_info = {
-                            "type": "role",
-                            "path": loop_obj.defined_in,
-                            "key": loop_obj.key,
-                        }
-                    elif taskcall.spec.executable_type == ExecutableType.TASKFILE_TYPE:
-                        taskcall.spec.include_info = {
-                            "type": "taskfile",
-                            "path": loop_obj.defined_in,
-                            "key": loop_obj.key,
-                        }
-            elif isinstance(call_obj, PlayCall):
-                playcall = call_obj
-                if len(child_objects.items) > 0 and "roles_info" in handover:
-                    c_obj = child_objects.items[0]
-                    if isinstance(c_obj, RoleCall):
-                        for rip in playcall.spec.roles:
-                            resolved_key = handover["roles_info"].get(rip.key, "")
-                            if resolved_key and resolved_key == c_obj.spec.key:
-                                rip.role_info = {
-                                    "fqcn": c_obj.spec.fqcn,
-                                    "path": c_obj.spec.defined_in,
-                                    "key": c_obj.spec.key,
-                                }
-            for c_obj in child_objects.items:
-                obj_list.add(c_obj)
-        return obj_list
-
-    def _recursive_make_graph(self, key, graph, _objects, caller=None):
-        current_graph = [g for g in graph]
-        # if this key is already in the graph src, no need to trace children
-        key_in_graph_src = [g for g in current_graph if g[0] == key]
-        if len(key_in_graph_src) > 0:
-            return current_graph
-        # otherwise, trace children
+            frame.child = (c_key, loop_found, loop_obj, len(items))
+            entered = self._enter_call(c_key, frame.call_obj, frame.handover, i, history, items)
+            if isinstance(entered, _CallFrame):
+                stack.append(entered)
+            else:
+                frame.checked_keys.update(entered)
+        return items, checked_keys
+
+    def _enter_call(self, key, caller, handover, index, history: set, items: list):
+        """
+        add the call object of the key to `items` and return a frame to expand its children.
+        if nothing needs to be expanded, the checked keys are returned instead of a frame.
+        """
         obj = self.get_object(key)
         if obj is None:
-            return current_graph
-        call_obj = call_obj_from_spec(spec=obj, caller=caller)
-        if call_obj is not None:
-            caller_key = None if caller is None else caller.key
-            my_key = call_obj.key
-            current_graph.append([caller_key, my_key])
+            return set()
+        if key in history:
+            return set()
+
+        subtree_key = None
+        if isinstance(obj, memoized_subtree_types):
+            tasks_from = None
+            if isinstance(obj, Role) and isinstance(handover, dict):
+                tasks_from = handover.get("tasks_from", None)
+            subtree_key = (key, tasks_from)
+            subtree = self.subtree_cache.get(subtree_key, None)
+            if subtree is not None and subtree.is_valid_for(history):
+                for type_key, name in subtree.resolve_failures:
+                    self._count_resolve_failure(type_key, name)
+                items.extend(subtree.instantiate(caller, index))
+                return subtree.checked_keys
+
+        frame = _CallFrame(key=key, start=len(items), subtree_key=subtree_key, failure_log_start=len(self._resolve_failure_log))
+        if isinstance(obj, Task):
+            # the content is set after the construction by `_set_task_contents()`
+            frame.call_obj = TaskCall.from_spec(obj, caller, index)
+        else:
+            frame.call_obj = call_obj_from_spec(spec=obj, caller=caller, index=index)
+        if frame.call_obj is not None:
+            items.append(frame.call_obj)
+            history.add(key)
+        frame.children_keys, frame.from_ram, frame.handover = self._get_children_keys(obj, handover_from_upper_node=handover)
+        return frame
+
+    def _exit_call(self, frame: _CallFrame, history: set, items: list):
+        if frame.call_obj is not None:
+            history.discard(frame.key)
+            if frame.subtree_key is not None:
+                failures = self._resolve_failure_log[frame.failure_log_start :]
+                subtree = Subtree.from_call_objects(items[frame.start :], frame.checked_keys, history, failures)
+                if subtree is not None:
+                    self.subtree_cache[frame.subtree_key] = subtree
+        return frame.checked_keys
+
+    def _link_child_call(self, frame: _CallFrame, items: list):
+        # set the information of the expanded child to the caller
+        c_key, loop_found, loop_obj, child_start = frame.child
+        call_obj = frame.call_obj
+        from_ram = frame.from_ram
+        handover = frame.handover
+        if isinstance(call_obj, TaskCall):
+            taskcall = call_obj
+            if len(items) > child_start:
+                c_obj = items[child_start]
+                if taskcall.spec.executable_type == ExecutableType.MODULE_TYPE:
+                    taskcall.module = c_obj.spec
+                    if c_key in from_ram:
+                        req_info = from_ram[c_key]
+                        taskcall.spec.possible_candidates = [(c_obj.spec.fqcn, req_info)]
+                        self._record_resolved(taskcall.spec, "possible_candidates")
+                    else:
+                        taskcall.spec.resolved_name = c_obj.spec.fqcn
+                        self._record_resolved(taskcall.spec, "resolved_name")
+                    self._record_resolved(taskcall.spec, "module_info")
+                    taskcall.spec.module_info = {
+                        "collection": c_obj.spec.collection,
+                        "short_name": c_obj.spec.name,
+                        "fqcn": c_obj.spec.fqcn,
+                        "key": c_obj.spec.key,
+                    }
+                elif taskcall.spec.executable_type == ExecutableType.ROLE_TYPE:
+                    if c_key in from_ram:
+                        req_info = from_ram[c_key]
+                        taskcall.spec.possible_candidates = [(c_obj.spec.fqcn, req_info)]
+                        self._record_resolved(taskcall.spec, "possible_candidates")
+                    else:
+                        taskcall.spec.resolved_name = c_obj.spec.fqcn
+                        self._record_resolved(taskcall.spec, "resolved_name")
+                    self._record_resolved(taskcall.spec, "include_info")
+                    taskcall.spec.include_info = {
+                        "type": "role",
+                        "fqcn": c_obj.spec.fqcn,
+                        "path": c_obj.spec.defined_in,
+                        "key": c_obj.spec.key,
+                    }
+                elif taskcall.spec.executable_type == ExecutableType.TASKFILE_TYPE:
+                    if c_key in from_ram:
+                        req_info = from_ram[c_key]
+                        taskcall.spec.possible_candidates = [(c_obj.spec.key, req_info)]
+                        self._record_resolved(taskcall.spec, "possible_candidates")
+                    else:
+                        taskcall.spec.resolved_name = c_obj.spec.key
+                        self._record_resolved(taskcall.spec, "resolved_name")
+                    self._record_resolved(taskcall.spec, "include_info")
+                    taskcall.spec.include_info = {
+                        "type": "taskfile",
+                        "path": c_obj.spec.defined_in,
+                        "key": c_obj.spec.key,
+                    }
+            elif loop_found and loop_obj:
+                if taskcall.spec.executable_type == ExecutableType.ROLE_TYPE:
+                    self._record_resolved(taskcall.spec, "include_info")
+                    taskcall.spec.include_info = {
+                        "type": "role",
+                        "path": loop_obj.defined_in,
+                        "key": loop_obj.key,
+                    }
+                elif taskcall.spec.executable_type == ExecutableType.TASKFILE_TYPE:
+                    self._record_resolved(taskcall.spec, "include_info")
+                    taskcall.spec.include_info = {
+                        "type": "taskfile",
+                        "path": loop_obj.defined_in,
+                        "key": loop_obj.key,
+                    }
+        elif isinstance(call_obj, PlayCall):
+            playcall = call_obj
+            if len(items) > child_start and "roles_info" in handover:
+                c_obj = items[child_start]
+                if isinstance(c_obj, RoleCall):
+                    for i, rip in enumerate(playcall.spec.roles):
+                        resolved_key = handover["roles_info"].get(rip.key, "")
+                        if resolved_key and resolved_key == c_obj.spec.key:
+                            self._record_resolved(playcall.spec, ("role_info", i))
+                            rip.role_info = {
+                                "fqcn": c_obj.spec.fqcn,
+                                "path": c_obj.spec.defined_in,
+                                "key": c_obj.spec.key,
+                            }
+
+    def _count_resolve_failure(self, type_key: str, name: str):
+        if name not in self.resolve_failures[type_key]:
+            self.resolve_failures[type_key][name] = 0
+        self.resolve_failures[type_key][name] += 1
+        self._resolve_failure_log.append((type_key, name))
+
+    def _make_graph(self, key, graph, _objects, caller=None):
+        current_graph = [g for g in graph]
+        call_objs, _ = self._walk_calls(key, caller, {}, 0, set())
+        for call_obj in call_objs:
+            caller_key = call_obj.called_from or None
+            current_graph.append([caller_key, call_obj.key])
             _objects.add(call_obj, update_dict=False)
-        children_keys = self._get_children_keys(obj)
-        for c_key in children_keys:
-            updated_graph = self._recursive_make_graph(
-                c_key,
-                current_graph,
-                _objects,
-                call_obj,
-            )
-            current_graph = updated_graph
         return current_graph
 
     # get definition object from root/ext definitions
@@ -680,9 +1030,8 @@ class TreeLoader(object):
 
         if search_ram and self.ram_client:
             matched_obj = self.ram_client.get_object_by_key(obj_key)
-            obj = matched_obj.get("object", None)
-            if obj is not None:
-                return obj
+            if matched_obj:
+                return matched_obj.get("object", None)
 
         return None
 
@@ -709,8 +1058,9 @@ class TreeLoader(object):
                 if not isinstance(rip, RoleInPlay):
                     continue
 
-                if rip.name in self.role_resolve_cache:
-                    resolved_role_key = self.role_resolve_cache[rip.name]
+                role_cache_key = _role_resolve_cache_key(rip.name, obj)
+                if role_cache_key in self.role_resolve_cache:
+                    resolved_role_key = self.role_resolve_cache[role_cache_key]
                 else:
                     resolved_role_key = resolve_role(
                         rip.name,
@@ -719,7 +1069,7 @@ class TreeLoader(object):
                         obj.collections_in_play,
                     )
                     if resolved_role_key != "":
-                        self.role_resolve_cache[rip.name] = resolved_role_key
+                        self.role_resolve_cache[role_cache_key] = resolved_role_key
 
                 if resolved_role_key == "" and self.ram_client is not None:
                     if rip.name in self.resolved_role_from_ram:
@@ -742,7 +1092,7 @@ class TreeLoader(object):
                                         "used_in": obj.defined_in,
                                     }
                                 )
-                                self.extra_requirement_obj_set.add(matched_roles[0]["object"].key)
+                                self._mark_extra_requirement(matched_roles[0]["object"].key)
                             for offspr_obj in matched_roles[0].get("offspring_objects", []):
                                 if hasattr(offspr_obj["object"], "builtin") and offspr_obj["object"].builtin:
                                     continue
@@ -755,7 +1105,7 @@ class TreeLoader(object):
                                             "used_in": offspr_obj["used_in"],
                                         }
                                     )
-                                    self.extra_requirement_obj_set.add(offspr_obj["object"].key)
+                                    self._mark_extra_requirement(offspr_obj["object"].key)
                             self.resolved_role_from_ram[rip.name] = (resolved_role_key, matched_roles[0]["defined_in"])
                             from_ram[resolved_role_key] = matched_roles[0]["defined_in"]
 
@@ -812,13 +1162,11 @@ class TreeLoader(object):
                                             "used_in": obj.defined_in,
                                         }
                                     )
-                                    self.extra_requirement_obj_set.add(matched_modules[0]["object"].key)
+                                    self._mark_extra_requirement(matched_modules[0]["object"].key)
                             self.resolved_module_from_ram[target_name] = (resolved_key, matched_modules[0]["defined_in"])
                             from_ram[resolved_key] = matched_modules[0]["defined_in"]
                 if resolved_key == "":
-                    if target_name not in self.resolve_failures["module"]:
-                        self.resolve_failures["module"][target_name] = 0
-                    self.resolve_failures["module"][target_name] += 1
+                    self._count_resolve_failure("module", target_name)
             elif executable_type == ExecutableType.ROLE_TYPE:
                 tasks_from = None
                 if isinstance(obj.module_options, dict):
@@ -826,8 +1174,9 @@ class TreeLoader(object):
                 if tasks_from:
                     handover["tasks_from"] = tasks_from
 
-                if target_name in self.role_resolve_cache:
-                    resolved_key = self.role_resolve_cache[target_name]
+                role_cache_key = _role_resolve_cache_key(target_name, obj)
+                if role_cache_key in self.role_resolve_cache:
+                    resolved_key = self.role_resolve_cache[role_cache_key]
                 else:
                     resolved_key = resolve_role(
                         target_name,
@@ -836,7 +1185,7 @@ class TreeLoader(object):
                         obj.collections_in_play,
                     )
                     if resolved_key != "":
-                        self.role_resolve_cache[target_name] = resolved_key
+                        self.role_resolve_cache[role_cache_key] = resolved_key
                 if resolved_key == "" and self.ram_client is not None:
                     if target_name in self.resolved_role_from_ram:
                         resolved_key, req_info = self.resolved_role_from_ram[target_name]
@@ -855,7 +1204,7 @@ class TreeLoader(object):
                                         "used_in": obj.defined_in,
                                     }
                                 )
-                                self.extra_requirement_obj_set.add(matched_roles[0]["object"].key)
+                                self._mark_extra_requirement(matched_roles[0]["object"].key)
                             for offspr_obj in matched_roles[0].get("offspring_objects", []):
                                 if hasattr(offspr_obj["object"], "builtin") and offspr_obj["object"].builtin:
                                     continue
@@ -868,18 +1217,17 @@ class TreeLoader(object):
                                             "used_in": offspr_obj["used_in"],
                                         }
                                     )
-                                    self.extra_requirement_obj_set.add(offspr_obj["object"].key)
+                                    self._mark_extra_requirement(offspr_obj["object"].key)
                             self.resolved_role_from_ram[target_name] = (resolved_key, matched_roles[0]["defined_in"])
                             from_ram[resolved_key] = matched_roles[0]["defined_in"]
                 if resolved_key == "":
-                    if target_name not in self.resolve_failures["role"]:
-                        self.resolve_failures["role"][target_name] = 0
-                    self.resolve_failures["role"][target_name] += 1
+                    self._count_resolve_failure("role", target_name)
             elif executable_type == ExecutableType.TASKFILE_TYPE:
                 if is_templated(target_name):
                     target_name = render_template(target_name)
-                if target_name in self.taskfile_resolve_cache:
-                    resolved_key = self.taskfile_resolve_cache[target_name]
+                taskfile_cache_key = _taskfile_resolve_cache_key(target_name, obj)
+                if taskfile_cache_key in self.taskfile_resolve_cache:
+                    resolved_key = self.taskfile_resolve_cache[taskfile_cache_key]
                 else:
                     resolved_key = resolve_taskfile(
                         target_name,
@@ -887,10 +1235,10 @@ class TreeLoader(object):
                         obj.key,
                     )
                     if resolved_key != "":
-                        self.taskfile_resolve_cache[target_name] = resolved_key
+                        self.taskfile_resolve_cache[taskfile_cache_key] = resolved_key
                 if resolved_key == "" and self.ram_client is not None:
-                    if obj.executable in self.resolved_role_from_ram:
-                        resolved_key, req_info = self.resolved_role_from_ram[target_name]
+                    if taskfile_cache_key in self.resolved_taskfile_from_ram:
+                        resolved_key, req_info = self.resolved_taskfile_from_ram[taskfile_cache_key]
                         from_ram[resolved_key] = req_info
                     else:
                         matched_taskfiles = self.ram_client.search_taskfile(target_name, from_path=obj.defined_in, from_key=obj.key)
@@ -906,7 +1254,7 @@ class TreeLoader(object):
                                         "used_in": obj.defined_in,
                                     }
                                 )
-                                self.extra_requirement_obj_set.add(matched_taskfiles[0]["object"].key)
+                                self._mark_extra_requirement(matched_taskfiles[0]["object"].key)
                             for offspr_obj in matched_taskfiles[0].get("offspring_objects", []):
                                 if hasattr(offspr_obj["object"], "builtin") and offspr_obj["object"].builtin:
                                     continue
@@ -919,13 +1267,11 @@ class TreeLoader(object):
                                             "used_in": offspr_obj["used_in"],
                                         }
                                     )
-                                    self.extra_requirement_obj_set.add(offspr_obj["object"].key)
-                            self.resolved_taskfile_from_ram[target_name] = (resolved_key, matched_taskfiles[0]["defined_in"])
+                                    self._mark_extra_requirement(offspr_obj["object"].key)
+                            self.resolved_taskfile_from_ram[taskfile_cache_key] = (resolved_key, matched_taskfiles[0]["defined_in"])
                             from_ram[resolved_key] = matched_taskfiles[0]["defined_in"]
                 if resolved_key == "":
-                    if target_name not in self.resolve_failures["taskfile"]:
-                        self.resolve_failures["taskfile"][target_name] = 0
-                    self.resolve_failures["taskfile"][target_name] += 1
+                    self._count_resolve_failure("taskfile", target_name)
 
             if resolved_key != "":
                 children_keys.append(resolved_key)
@@ -947,6 +1293,41 @@ class TreeLoader(object):
         return obj_list
 
 
+def _role_resolve_cache_key(role_name: str, obj):
+    return (role_name, obj.collection, tuple(obj.collections_in_play or []))
+
+
+def _taskfile_resolve_cache_key(taskfile_ref: str, task: Task):
+    parent_key, task_defined_path = get_task_location(task.key)
+    return (taskfile_ref, parent_key, os.path.dirname(task_defined_path))
+
+
+def _build_trees_in_worker(loader: TreeLoader, root_keys: list):
+    requirements_start = len(loader.extra_requirements)
+    for root_key in root_keys:
+        loader._build_tree(root_key)
+    return (
+        loader.trees,
+        loader._resolved_attrs,
+        loader.tree_resolve_failures,
+        loader.tree_stats,
+        loader.extra_requirements[requirements_start:],
+        loader.extra_requirement_keys[requirements_start:],
+    )
+
+
+def _copy_resolved_info(src, dst, attrs: set):
+    # `attrs` are the names of task attributes and ("role_info", index) for roles in a play
+    for attr in attrs:
+        if isinstance(attr, tuple):
+            _, i = attr
+            if isinstance(src, Play) and i < len(src.roles) and i < len(dst.roles):
+                if isinstance(src.roles[i], RoleInPlay) and isinstance(dst.roles[i], RoleInPlay):
+                    dst.roles[i].role_info = src.roles[i].role_info
+        else:
+            setattr(dst, attr, getattr(src, attr))
+
+
 def is_templated(txt):
     return "{{" in txt
 
@@ -0,0 +1,169 @@
+# -*- mode:python; coding:utf-8 -*-
+
+# Copyright (c) 2022 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import random
+import yaml
+from dataclasses import dataclass, asdict
+
+synthetic_collection_namespace = "bench"
+synthetic_collection_name = "synthetic"
+synthetic_collection_version = "1.0.0"
+
+builtin_task_templates = [
+    {"ansible.builtin.debug": {"msg": "{{ var_0 }}"}},
+    {"ansible.builtin.shell": "echo {{ var_1 }}"},
+    {"ansible.builtin.command": "ls {{ var_0 }}"},
+    {"ansible.builtin.file": {"path": "/tmp/{{ var_1 }}", "state": "directory"}},
+    {"ansible.builtin.copy": {"src": "files/sample.txt", "dest": "/tmp/{{ var_0 }}.txt"}},
+    {"ansible.builtin.get_url": {"url": "https://example.com/{{ var_1 }}.sh", "dest": "/tmp/install.sh"}},
+    {"ansible.builtin.package": {"name": "{{ var_0 }}", "state": "present"}},
+    {"ansible.builtin.set_fact": {"fact_0": "{{ var_1 }}"}},
+]
+
+
+@dataclass
+class ContentSpec(object):
+    """
+    the size of a synthetic project generated by `generate_content()`
+    """
+
+    playbooks: int = 2
+    roles: int = 2
+    # taskfiles next to playbooks which are not a part of any role
+    taskfiles: int = 2
+    tasks_per_file: int = 5
+    # depth of `include_tasks` chains in each role
+    include_depth: int = 2
+    # the number of variables defined in each play and role defaults
+    variables: int = 5
+    # the number of items in a loop task; 0 means no loop task
+    loop_size: int = 3
+    # the number of modules in the synthetic collection which is registered to RAM
+    collection_modules: int = 3
+    seed: int = 0
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def generate_content(out_dir: str, spec: ContentSpec):
+    """
+    generate a synthetic project and a synthetic collection under `out_dir`.
+    return the paths of the project and the collection.
+    """
+    rand = random.Random(spec.seed)
+    collection_dir = os.path.join(out_dir, "collections", "ansible_collections", synthetic_collection_namespace, synthetic_collection_name)
+    project_dir = os.path.join(out_dir, "project")
+    _generate_collection(collection_dir, spec)
+    _generate_project(project_dir, spec, rand)
+    return project_dir, collection_dir
+
+
+def count_tasks(spec: ContentSpec):
+    """
+    the number of tasks written to the project by `generate_content()`
+    """
+    per_file = spec.tasks_per_file + (1 if spec.loop_size > 0 else 0)
+    # each role has main.yml and `include_depth` included taskfiles; every file except the last one has an include task
+    role_tasks = (per_file * (spec.include_depth + 1) + spec.include_depth) * spec.roles
+    # each playbook has one play with its tasks and one include_role task
+    playbook_tasks = (per_file + 1) * spec.playbooks
+    taskfile_tasks = per_file * spec.taskfiles
+    return role_tasks + playbook_tasks + taskfile_tasks
+
+
+def _generate_collection(collection_dir: str, spec: ContentSpec):
+    galaxy = {
+        "namespace": synthetic_collection_namespace,
+        "name": synthetic_collection_name,
+        "version": synthetic_collection_version,
+    }
+    _write_yaml(os.path.join(collection_dir, "galaxy.yml"), galaxy)
+    module_dir = os.path.join(collection_dir, "plugins", "modules")
+    os.makedirs(module_dir, exist_ok=True)
+    for i in range(spec.collection_modules):
+        doc = {
+            "module": f"module_{i}",
+            "short_description": f"synthetic module {i}",
+            "options": {"name": {"type": "str"}, "state": {"type": "str"}},
+        }
+        module_body = "DOCUMENTATION = r'''\n" + yaml.safe_dump(doc, sort_keys=False) + "'''\n"
+        with open(os.path.join(module_dir, f"module_{i}.py"), "w") as file:
+            file.write(module_body)
+
+
+def _generate_project(project_dir: str, spec: ContentSpec, rand: random.Random):
+    for i in range(spec.roles):
+        role_dir = os.path.join(project_dir, "roles", f"role_{i}")
+        _write_yaml(os.path.join(role_dir, "defaults", "main.yml"), _make_variables(spec, f"role_{i}"))
+        for depth in range(spec.include_depth + 1):
+            fname = "main.yml" if depth == 0 else f"level_{depth}.yml"
+            tasks = _make_tasks(spec, rand, f"role_{i} level_{depth}")
+            if depth < spec.include_depth:
+                tasks.append({"name": f"include level_{depth + 1}", "ansible.builtin.include_tasks": f"level_{depth + 1}.yml"})
+            _write_yaml(os.path.join(role_dir, "tasks", fname), tasks)
+
+    for i in range(spec.playbooks):
+        tasks = _make_tasks(spec, rand, f"playbook_{i}")
+        if spec.roles > 0:
+            tasks.append({"name": "include a role", "ansible.builtin.include_role": {"name": f"role_{i % spec.roles}"}})
+        play = {
+            "name": f"play {i}",
+            "hosts": "all",
+            "vars": _make_variables(spec, f"playbook_{i}"),
+            "tasks": tasks,
+        }
+        _write_yaml(os.path.join(project_dir, "playbooks", f"playbook_{i}.yml"), [play])
+
+    for i in range(spec.taskfiles):
+        tasks = _make_tasks(spec, rand, f"taskfile_{i}")
+        _write_yaml(os.path.join(project_dir, "playbooks", "tasks", f"taskfile_{i}.yml"), tasks)
+
+
+def _make_variables(spec: ContentSpec, prefix: str):
+    variables = {}
+    for i in range(spec.variables):
+        variables[f"var_{i}"] = f"{prefix}_value_{i}"
+    return variables
+
+
+def _make_tasks(spec: ContentSpec, rand: random.Random, prefix: str):
+    tasks = []
+    for i in range(spec.tasks_per_file):
+        task = {"name": f"{prefix} task {i}"}
+        if spec.collection_modules > 0 and rand.random() < 0.3:
+            module_index = rand.randrange(spec.collection_modules)
+            fqcn = f"{synthetic_collection_namespace}.{synthetic_collection_name}.module_{module_index}"
+            task[fqcn] = {"name": "{{ var_0 }}", "state": "present"}
+        else:
+            task.update(rand.choice(builtin_task_templates))
+        tasks.append(task)
+    if spec.loop_size > 0:
+        tasks.append(
+            {
+                "name": f"{prefix} loop task",
+                "ansible.builtin.debug": {"msg": "{{ item }}"},
+                "loop": [f"item_{i}" for i in range(spec.loop_size)],
+            }
+        )
+    return tasks
+
+
+def _write_yaml(fpath: str, data):
+    os.makedirs(os.path.dirname(fpath), exist_ok=True)
+    with open(fpath, "w") as file:
+        yaml.safe_dump(data, file, sort_keys=False)
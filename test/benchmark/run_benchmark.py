@@ -0,0 +1,193 @@
+# -*- mode:python; coding:utf-8 -*-
+
+# Copyright (c) 2022 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+benchmark ARIScanner.evaluate() with synthetic contents.
+
+    python test/benchmark/run_benchmark.py --size small --output result.json
+    python test/benchmark/run_benchmark.py --size small --baseline result.json
+
+everything runs offline; a synthetic collection is registered to a temporary RAM directory
+before the benchmark so that its modules are resolved from RAM like installed dependencies.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ansible_risk_insight.scanner import ARIScanner  # noqa: E402
+from benchmark.content_generator import (  # noqa: E402
+    ContentSpec,
+    generate_content,
+    count_tasks,
+    synthetic_collection_namespace,
+    synthetic_collection_name,
+    synthetic_collection_version,
+)
+
+# stages of `ARIScanner.evaluate()` and the functions mainly executed in them
+stage_functions = {
+    "target_load": "Parser.run",
+    "tree_construction": "TreeLoader.run",
+    "variable_resolution": "resolve_variables",
+    "module_annotators": "analyze",
+    "apply_rules": "detect",
+}
+
+size_presets = {
+    "small": ContentSpec(playbooks=5, roles=5, taskfiles=5, tasks_per_file=10, include_depth=2, variables=10, loop_size=5),
+    "medium": ContentSpec(playbooks=20, roles=20, taskfiles=20, tasks_per_file=20, include_depth=3, variables=20, loop_size=20),
+    "large": ContentSpec(playbooks=50, roles=50, taskfiles=50, tasks_per_file=40, include_depth=4, variables=50, loop_size=50),
+}
+
+
+def seed_ram(ram_dir: str, collection_dir: str):
+    scanner = ARIScanner(root_dir=ram_dir, read_ram=False, write_ram=True, use_ansible_doc=False, silent=True)
+    # the hash is specified because RAM indices refer to findings by it
+    scanner.evaluate(
+        type="collection",
+        name=f"{synthetic_collection_namespace}.{synthetic_collection_name}",
+        target_path=collection_dir,
+        version=synthetic_collection_version,
+        hash="synthetic",
+        install_dependencies=False,
+    )
+
+
+def run_case(spec: ContentSpec, repeat: int = 3, work_dir: str = ""):
+    """
+    generate contents of the spec, scan them `repeat` times and return the median durations
+    """
+    tmp_dir = None
+    if not work_dir:
+        tmp_dir = tempfile.TemporaryDirectory()
+        work_dir = tmp_dir.name
+    try:
+        project_dir, collection_dir = generate_content(os.path.join(work_dir, "contents"), spec)
+        ram_dir = os.path.join(work_dir, "ram")
+        seed_ram(ram_dir, collection_dir)
+
+        totals = []
+        stages = {}
+        scandata = None
+        for _ in range(repeat):
+            scanner = ARIScanner(root_dir=ram_dir, read_ram=True, write_ram=False, use_ansible_doc=False, silent=True, profile=True)
+            scanner.warm_up()
+            start = time.time()
+            scanner.evaluate(type="project", name=project_dir, target_path=project_dir, install_dependencies=False, load_all_taskfiles=True)
+            totals.append(time.time() - start)
+            scandata = scanner.get_last_scandata()
+            for name, record in scandata.profile.get("stages", {}).items():
+                stages.setdefault(name, []).append(record)
+    finally:
+        if tmp_dir:
+            tmp_dir.cleanup()
+
+    tasks = count_tasks(spec)
+    total = statistics.median(totals)
+    result = {
+        "spec": spec.to_dict(),
+        "tasks": tasks,
+        "trees": len(scandata.trees),
+        "total_seconds": round(total, 6),
+        "tasks_per_second": round(tasks / total, 3) if total else 0,
+        "peak_rss_kb": scandata.profile.get("peak_rss_kb", 0),
+        "module_resolve_failures": len(scandata.resolve_failures.get("module", {})),
+        "stages": {},
+    }
+    for name, records in stages.items():
+        result["stages"][name] = {
+            "function": stage_functions.get(name, ""),
+            "seconds": round(statistics.median([r["duration"] for r in records]), 6),
+            "peak_rss_kb": max([r["peak_rss_kb"] for r in records]),
+        }
+    return result
+
+
+def run_case_in_process(spec: ContentSpec, repeat: int = 3):
+    # a fresh process per case so that peak RSS and module level caches are not shared between cases
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(run_case, spec, repeat).result()
+
+
+def find_regressions(results: dict, baseline: dict, tolerance: float = 0.2):
+    """
+    compare the results with the baseline and return the cases/stages that got slower or bigger than the tolerance
+    """
+    regressions = []
+    for case, result in results.items():
+        base = baseline.get(case)
+        if not base:
+            continue
+        metrics = [("total_seconds", result["total_seconds"], base["total_seconds"])]
+        metrics.append(("peak_rss_kb", result["peak_rss_kb"], base["peak_rss_kb"]))
+        for name, stage in result["stages"].items():
+            base_stage = base["stages"].get(name)
+            if base_stage:
+                metrics.append((f"stages.{name}.seconds", stage["seconds"], base_stage["seconds"]))
+        for metric, value, base_value in metrics:
+            if base_value and value > base_value * (1 + tolerance):
+                regressions.append(f"{case}: {metric} {base_value} -> {value}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="benchmark ARI scans with synthetic contents")
+    parser.add_argument("--size", default="small", help=f"comma separated size presets ({', '.join(size_presets)})")
+    parser.add_argument("--repeat", type=int, default=3, help="the number of scans per case; the median is reported")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for the content generator")
+    parser.add_argument("--output", help="save the result to this json file")
+    parser.add_argument("--baseline", help="compare the result with this json file and exit with 1 if it regressed")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown ratio against the baseline (default to 0.2)")
+    args = parser.parse_args()
+
+    results = {}
+    for size in args.size.split(","):
+        if size not in size_presets:
+            raise ValueError(f"unknown size preset: {size}")
+        spec = size_presets[size]
+        spec.seed = args.seed
+        result = run_case_in_process(spec, args.repeat)
+        results[size] = result
+        print(f"{size}: {result['tasks']} tasks, {result['total_seconds']} sec, {result['tasks_per_second']} tasks/sec, {result['peak_rss_kb']} KB")
+        for name, stage in result["stages"].items():
+            print(f"  {name:<20} {stage['seconds']:>10} sec  {stage['function']}")
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r") as file:
+            baseline = json.load(file)
+        regressions = find_regressions(results, baseline, args.tolerance)
+        for r in regressions:
+            print(f"regression: {r}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
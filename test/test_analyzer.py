@@ -0,0 +1,74 @@
+# -*- mode:python; coding:utf-8 -*-
+
+# Copyright (c) 2022 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from ansible_risk_insight.models import Task, TaskCall
+from ansible_risk_insight.annotators.ansible_builtin import AnsibleBuiltinRiskAnnotator
+from ansible_risk_insight.annotators.module_annotator_base import ModuleAnnotator, ModuleAnnotatorRegistry
+from ansible_risk_insight.annotators.risk_annotator_base import RiskAnnotator, RiskAnnotatorRegistry
+
+
+def _taskcall(resolved_name):
+    return TaskCall(spec=Task(name="task", resolved_name=resolved_name))
+
+
+class _BrewAnnotator(ModuleAnnotator):
+    fqcn: str = "sample.custom.homebrew"
+    aliases: list = ["sample.custom.brew"]
+
+
+class _BrewCaskAnnotator(ModuleAnnotator):
+    fqcn: str = "sample.custom.homebrew"
+    precedence: int = 10
+
+
+class _CustomRiskAnnotator(RiskAnnotator):
+    name: str = "custom"
+    enabled: bool = True
+    collections: list = ["sample.custom"]
+
+    def match(self, task):
+        return True
+
+
+class _AnyRiskAnnotator(RiskAnnotator):
+    name: str = "any"
+    enabled: bool = True
+    precedence: int = -1
+
+    def match(self, task):
+        return task.spec.resolved_name != ""
+
+
+def test_module_annotator_registry():
+    brew, cask = _BrewAnnotator(), _BrewCaskAnnotator()
+    registry = ModuleAnnotatorRegistry(annotators=[brew, cask])
+    assert registry.find("sample.custom.homebrew") == [cask, brew]
+    assert registry.find("sample.custom.brew") == [brew]
+    assert registry.find("sample.custom.unknown") == []
+
+    builtin = AnsibleBuiltinRiskAnnotator()
+    shell_annotators = builtin.load_module_annotator_registry("ansible.builtin").find("ansible.builtin.shell")
+    assert [a.fqcn for a in shell_annotators] == ["ansible.builtin.shell"]
+
+
+def test_risk_annotator_registry():
+    builtin, custom, any_annotator = AnsibleBuiltinRiskAnnotator(), _CustomRiskAnnotator(), _AnyRiskAnnotator()
+    registry = RiskAnnotatorRegistry(annotators=[any_annotator, builtin, custom])
+    assert registry.find(_taskcall("ansible.builtin.shell")) is builtin
+    assert registry.find(_taskcall("sample.custom.homebrew")) is custom
+    # annotators without collections are tried for every task in the order of the precedence
+    assert registry.find(_taskcall("other.coll.module")) is any_annotator
+    assert registry.find(_taskcall("")) is None
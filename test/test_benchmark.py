@@ -0,0 +1,33 @@
+# -*- mode:python; coding:utf-8 -*-
+
+# Copyright (c) 2022 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from benchmark.content_generator import ContentSpec
+from benchmark.run_benchmark import run_case, find_regressions, stage_functions
+
+
+def test_benchmark_run_case(tmp_path):
+    spec = ContentSpec(playbooks=1, roles=1, taskfiles=1, tasks_per_file=3, include_depth=1, variables=2, loop_size=2, collection_modules=2)
+    result = run_case(spec, repeat=1, work_dir=str(tmp_path))
+    assert result["tasks"] > 0
+    assert result["total_seconds"] > 0
+    # synthetic collection modules are resolved from the pre-seeded RAM
+    assert result["module_resolve_failures"] == 0
+    for stage in stage_functions:
+        assert stage in result["stages"]
+
+    assert not find_regressions({"case": result}, {"case": result})
+    baseline = {"case": dict(result, total_seconds=result["total_seconds"] / 2)}
+    assert find_regressions({"case": result}, baseline)
@@ -0,0 +1,68 @@
+# -*- mode:python; coding:utf-8 -*-
+
+# Copyright (c) 2022 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import jsonpickle
+
+from ansible_risk_insight import codec
+from ansible_risk_insight.findings import Findings
+from ansible_risk_insight.models import Module, Task, ObjectList
+
+
+def _make_findings():
+    task = Task(name="sample task", module="ping", defined_in="tasks/main.yml")
+    task.key = "task collection:sample.coll#taskfile:tasks/main.yml#task:[0]"
+    task.options = {"ari/t": "not a tag", 1: ("a", "b")}
+    module = Module(name="ping", fqcn="sample.coll.ping")
+    module.set_key()
+    return Findings(
+        metadata={"type": "collection", "name": "sample.coll"},
+        root_definitions={"definitions": {"tasks": [task], "modules": [module]}, "mappings": {"paths": {"tasks/main.yml"}}},
+    )
+
+
+def test_codec_round_trip():
+    findings = _make_findings()
+    json_str = codec.encode(findings)
+    assert json.loads(json_str)[codec.codec_key] == codec.codec_version
+
+    loaded = codec.decode(json_str)
+    assert isinstance(loaded, Findings)
+    task = loaded.root_definitions["definitions"]["tasks"][0]
+    assert isinstance(task, Task)
+    assert task.options == {"ari/t": "not a tag", 1: ("a", "b")}
+    assert loaded.root_definitions["mappings"]["paths"] == {"tasks/main.yml"}
+    assert jsonpickle.encode(loaded, make_refs=False) == jsonpickle.encode(findings, make_refs=False)
+
+
+def test_codec_jsonpickle_compat():
+    findings = _make_findings()
+    loaded = codec.decode(jsonpickle.encode(findings, make_refs=False))
+    assert isinstance(loaded, Findings)
+    assert loaded.root_definitions["definitions"]["modules"][0].fqcn == "sample.coll.ping"
+
+    obj_list = ObjectList(items=findings.root_definitions["definitions"]["modules"])
+    legacy_lines = "\n".join([jsonpickle.encode(obj, make_refs=False) for obj in obj_list.items])
+    assert ObjectList.from_json(legacy_lines).find_by_key(obj_list.items[0].key).name == "ping"
+    assert ObjectList.from_json(obj_list.to_json()).find_by_key(obj_list.items[0].key).name == "ping"
+
+
+def test_codec_record():
+    module = _make_findings().root_definitions["definitions"]["modules"][0]
+    document = codec.document_prefix() + "[" + codec.encode_record(module) + "]}"
+    assert codec.decode(document)[0].key == module.key
+    assert codec.decode_record(codec.encode_record(module)).key == module.key
+    assert codec.decode_record(jsonpickle.encode(module, make_refs=False)).key == module.key
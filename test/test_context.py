@@ -0,0 +1,172 @@
+# -*- mode:python; coding:utf-8 -*-
+
+# Copyright (c) 2022 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pickle
+
+from ansible_risk_insight import codec
+from ansible_risk_insight.context import (
+    Context,
+    VariableHistory,
+    extract_variable_names,
+    parse_template,
+    resolve_module_options,
+    template_cache_stats,
+)
+from ansible_risk_insight.models import Inventory, InventoryType, Play, Role, Task, TaskCall, Variable, VariableType
+from ansible_risk_insight.annotators.variable_resolver import VariableAnnotator
+
+
+def test_context_variable_history_snapshot():
+    play = Play(name="play", key="play playbook:site.yml#play:[0]", variables={"pkg": "httpd", "path": "/tmp"})
+    tasks = []
+    for i, variables in enumerate([{}, {"pkg": "nginx"}, {}]):
+        task = Task(name=f"task {i}", module="ansible.builtin.debug", module_options={"msg": "{{ pkg }}"}, variables=variables)
+        task.key = f"task playbook:site.yml#play:[0]#task:[{i}]"
+        tasks.append(TaskCall(spec=task, key=f"taskcall {i}"))
+
+    context = Context()
+    context.add(play, 1)
+    for taskcall in tasks:
+        context.add(taskcall, 2)
+        VariableAnnotator(context=context).run(taskcall)
+
+    # every task keeps the histories at the time it is annotated
+    assert [v.value for v in tasks[0].variable_set["pkg"]] == ["httpd"]
+    assert [v.value for v in tasks[1].variable_set["pkg"]] == ["httpd", "nginx"]
+    assert tasks[1].variable_set["pkg"][-1].type == VariableType.TaskVars
+    assert tasks[2].variable_set["pkg"] is tasks[1].variable_set["pkg"]
+    assert list(tasks[2].variable_set) == ["pkg", "path"]
+    assert [len(t.variable_use["pkg"]) for t in tasks] == [1, 2, 3]
+    assert [t.args.templated for t in tasks] == [[{"msg": "httpd"}], [{"msg": "nginx"}], [{"msg": "nginx"}]]
+
+    history = tasks[2].variable_use
+    assert pickle.loads(pickle.dumps(history)) == history
+    assert codec.decode(codec.encode(history)) == dict(history)
+
+
+def test_context_variable_history_chain():
+    history = VariableHistory()
+    snapshots = []
+    for i in range(VariableHistory.max_chain_length * 3):
+        history = history.updated([Variable(name=f"v{i % 5}")])
+        snapshots.append(history)
+    # the chain is flattened but the older snapshots are not changed
+    assert history._chain_length < VariableHistory.max_chain_length
+    assert [len(snapshots[i]["v0"]) for i in [0, 5, len(snapshots) - 1]] == [1, 2, len(snapshots) // 5 + 1]
+    assert len(history) == 5
+
+
+def test_context_resolve_variable_cache():
+    inventory = Inventory(name="all", inventory_type=InventoryType.GROUP_VARS_TYPE, variables={"region": {"name": "east"}})
+    context = Context(inventories=[inventory])
+    play = Play(name="play", key="play playbook:site.yml#play:[0]", variables={"base": "/opt", "app": {"port": 80}})
+    context.add(play, 1)
+    context.add(Role(name="web", key="role role:web", default_variables={"dest": "{{ base }}/web"}), 2)
+
+    assert context.resolve_variable("dest")[:2] == ("/opt/web", VariableType.RoleDefaults)
+    assert context.resolve_variable("app.port")[0] == 80
+    assert context.resolve_variable("region.name")[:2] == ("east", VariableType.InventoryGroupVarsAll)
+    # a cached result is not shared between the callers
+    val, _, history = context.resolve_variable("app")
+    val["port"] = 8080
+    history["app"]["value"] = None
+    assert context.resolve_variable("app")[0] == {"port": 80}
+    assert context.resolve_variable("app")[2]["app"]["value"] == {"port": 80}
+    assert context.resolve_variable("app.port")[0] == 80
+
+    # setting a variable in the chain drops the cached result
+    task = Task(name="task", key="task role:web#taskfile:roles/web/tasks/main.yml#task:[0]", set_facts={"base": "/srv"})
+    context.add(TaskCall(spec=task, key="taskcall 0"), 3)
+    assert context.resolve_variable("dest")[:2] == ("/srv/web", VariableType.RoleDefaults)
+    assert context.resolve_variable("base")[1] == VariableType.SetFacts
+    assert context.resolve_variable("app.port")[0] == 80
+
+
+def test_context_parse_template():
+    txt = "{{ lookup('first_found', files) }}-{{ pkg | default(fallback_pkg) | lower }}-{{ port | default(80) }}"
+    blocks = parse_template(txt)
+    assert [b["name"] for b in blocks] == ["files", "pkg", "port"]
+    assert blocks[0]["lookup"] == "first_found"
+    assert blocks[1]["default"] == "fallback_pkg"
+    assert blocks[1]["filters"] == ("default", "lower")
+    assert "default" not in blocks[2]
+    assert extract_variable_names(txt) == list(blocks)
+    assert extract_variable_names("no template") == []
+
+    stats = template_cache_stats()
+    assert parse_template(txt) is blocks
+    assert template_cache_stats()["hit"] == stats["hit"] + 1
+
+
+def test_context_max_loop_items():
+    play = Play(name="play", key="play playbook:site.yml#play:[0]", variables={"packages": [f"pkg{i}" for i in range(10)], "state": "present"})
+    task = Task(
+        name="install",
+        module="ansible.builtin.package",
+        module_options={"name": "{{ item }}", "state": "{{ state }}"},
+        loop={"item": "{{ packages }}"},
+    )
+    task.key = "task playbook:site.yml#play:[0]#task:[0]"
+
+    results = {}
+    for max_loop_items in [0, 3]:
+        context = Context()
+        context.add(play, 1)
+        taskcall = TaskCall(spec=task, key="taskcall 0")
+        context.add(taskcall, 2)
+        VariableAnnotator(context=context, max_loop_items=max_loop_items).run(taskcall)
+        results[max_loop_items] = taskcall
+
+    unlimited, limited = results[0].args, results[3].args
+    assert len(unlimited.templated) == 10
+    assert limited.templated == unlimited.templated[:3]
+    # only the templated options depend on the limit
+    assert limited.vars == unlimited.vars
+    assert [v.type for v in limited.vars] == [v.type for v in unlimited.vars]
+    for attr in ["type", "raw", "resolved", "is_mutable"]:
+        assert getattr(limited, attr) == getattr(unlimited, attr)
+    assert "packages" in results[0].variable_use
+    assert results[3].variable_use == results[0].variable_use
+
+
+def test_context_resolve_module_options():
+    play = Play(name="play", key="play playbook:site.yml#play:[0]", variables={"app": {"port": 80}})
+    fact_task = Task(name="fact", key="task playbook:site.yml#play:[0]#task:[0]", set_facts={"dest": "/srv"})
+    task = Task(
+        name="copy",
+        module="ansible.builtin.copy",
+        module_options={"dest": "{{ dest }}", "port": "{{ app.port }}"},
+        key="task playbook:site.yml#play:[0]#task:[1]",
+    )
+    context = Context()
+    context.add(play, 1)
+    context.add(TaskCall(spec=fact_task, key="taskcall 0"), 2)
+    taskcall = TaskCall(spec=task, key="taskcall 1")
+    context.add(taskcall, 2)
+
+    # module options are resolved on a copy of the context as before the cache
+    expected = (
+        [{"dest": "/srv", "port": "{{ app.port }}"}],
+        [
+            {"key": "dest", "value": "/srv", "type": VariableType.TaskVars},
+            {"key": "app.port", "value": None, "type": VariableType.Unknown},
+        ],
+    )
+    assert resolve_module_options(context, taskcall)[:2] == expected
+    # results cached in the context do not change them
+    assert context.resolve_variable("dest")[:2] == ("/srv", VariableType.SetFacts)
+    assert context.resolve_variable("app.port")[0] == 80
+    assert resolve_module_options(context, taskcall)[:2] == expected
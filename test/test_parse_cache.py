@@ -0,0 +1,126 @@
+# -*- mode:python; coding:utf-8 -*-
+
+# Copyright (c) 2022 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import json
+import jsonpickle
+
+from ansible_risk_insight import codec
+from ansible_risk_insight.model_loader import load_taskfile
+from ansible_risk_insight.parse_cache import ParseCache, parse_cache_dir_name
+from ansible_risk_insight.scanner import ARIScanner, Config
+
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        file.write(content)
+
+
+def _entries(cache_dir):
+    return sorted(os.path.join(root, fname) for root, _, files in os.walk(cache_dir) for fname in files)
+
+
+def _result_without_durations(ari_result):
+    def _strip(data):
+        if isinstance(data, dict):
+            return {k: _strip(v) for k, v in data.items() if k != "duration"}
+        if isinstance(data, list):
+            return [_strip(v) for v in data]
+        return data
+
+    return _strip(json.loads(jsonpickle.encode(ari_result, make_refs=False, unpicklable=False)))
+
+
+def test_parse_cache_hit_and_invalidation(tmp_path):
+    basedir = os.path.join(tmp_path, "role")
+    _write(os.path.join(basedir, "tasks", "main.yml"), "- name: hello\n  debug:\n    msg: hello\n")
+    cache_dir = os.path.join(tmp_path, "cache")
+    cache = ParseCache(cache_dir=cache_dir)
+
+    expected = codec.encode(load_taskfile(path="tasks/main.yml", basedir=basedir))
+    first = cache.load(load_taskfile, path="tasks/main.yml", basedir=basedir)
+    second = cache.load(load_taskfile, path="tasks/main.yml", basedir=basedir)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert codec.encode(first) == codec.encode(second) == expected
+
+    # changed content is loaded again
+    _write(os.path.join(basedir, "tasks", "main.yml"), "- name: changed\n  debug:\n    msg: changed\n")
+    changed = cache.load(load_taskfile, path="tasks/main.yml", basedir=basedir)
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert changed.tasks[0].name == "changed"
+
+    # entries written by another loader version are not used
+    other = ParseCache(cache_dir=cache_dir, loader_version="other")
+    other.load(load_taskfile, path="tasks/main.yml", basedir=basedir)
+    assert (other.hits, other.misses) == (0, 1)
+    assert len(_entries(cache_dir)) == 3
+
+
+def test_parse_cache_corrupt_entry(tmp_path):
+    basedir = os.path.join(tmp_path, "role")
+    _write(os.path.join(basedir, "tasks", "main.yml"), "- name: hello\n  debug:\n    msg: hello\n")
+    cache_dir = os.path.join(tmp_path, "cache")
+    cache = ParseCache(cache_dir=cache_dir)
+    expected = codec.encode(cache.load(load_taskfile, path="tasks/main.yml", basedir=basedir))
+
+    entry_path = _entries(cache_dir)[0]
+    _write(entry_path, '{"ari/codec": 1, "data": {"ari/t": "Tas')
+    # a broken entry is a miss and it is replaced with a new one
+    loaded = cache.load(load_taskfile, path="tasks/main.yml", basedir=basedir)
+    assert codec.encode(loaded) == expected
+    assert (cache.hits, cache.misses) == (0, 2)
+    loaded = cache.load(load_taskfile, path="tasks/main.yml", basedir=basedir)
+    assert codec.encode(loaded) == expected
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_parse_cache_eviction(tmp_path):
+    basedir = os.path.join(tmp_path, "role")
+    _write(os.path.join(basedir, "tasks", "main.yml"), "- name: hello\n  debug:\n    msg: hello\n")
+    cache_dir = os.path.join(tmp_path, "cache")
+    cache = ParseCache(cache_dir=cache_dir, max_size_mb=1)
+    cache.load(load_taskfile, path="tasks/main.yml", basedir=basedir)
+    used_entry = _entries(cache_dir)[0]
+    os.utime(used_entry, (1000, 1000))
+
+    old_entry = os.path.join(cache_dir, "00", "old.json")
+    new_entry = os.path.join(cache_dir, "00", "new.json")
+    for i, fpath in enumerate([old_entry, new_entry]):
+        _write(fpath, "x" * 600 * 1024)
+        os.utime(fpath, (2000 + i, 2000 + i))
+    # reading an entry makes it the most recently used one
+    cache.load(load_taskfile, path="tasks/main.yml", basedir=basedir)
+    assert cache.hits == 1
+
+    cache.evict()
+    assert _entries(cache_dir) == sorted([new_entry, used_entry])
+
+
+def test_parse_cache_scan(tmp_path):
+    config = Config(path=os.path.join(tmp_path, "config"), data_dir=os.path.join(tmp_path, "ram"), parse_cache=True)
+    results = []
+    for _ in range(2):
+        scanner = ARIScanner(config=config, use_ansible_doc=False, read_ram=False, write_ram=False, silent=True)
+        ari_result = scanner.evaluate(type="role", name="test/testdata/roles/test_role")
+        results.append((ari_result, scanner._parser.parse_cache))
+
+    (first, first_cache), (second, second_cache) = results
+    assert first_cache.cache_dir == os.path.join(tmp_path, "ram", parse_cache_dir_name)
+    assert first_cache.misses > 0
+    assert second_cache.hits == first_cache.misses
+    assert second_cache.misses == 0
+    assert _result_without_durations(second) == _result_without_durations(first)
@@ -0,0 +1,54 @@
+# -*- mode:python; coding:utf-8 -*-
+
+# Copyright (c) 2022 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pickle
+
+from ansible_risk_insight.ram_cache import LRUCache, estimate_size
+
+
+def test_lru_cache_eviction():
+    cache = LRUCache(max_size_mb=1)
+    size = 400 * 1024
+    cache.put("findings", "a", "A", size=size)
+    cache.put("module_search", "b", "B", size=size)
+    # "a" becomes the most recently used one
+    assert cache.get("findings", "a") == "A"
+    cache.put("role_search", "c", "C", size=size)
+
+    assert cache.lookup("module_search", "b") == (False, None)
+    assert cache.get("findings", "a") == "A"
+    assert cache.get("role_search", "c") == "C"
+    assert cache.size == 2 * size
+    assert cache.stats["module_search"] == {"hit": 0, "miss": 1, "eviction": 1}
+    assert cache.stats["findings"] == {"hit": 2, "miss": 0, "eviction": 0}
+
+    # an entry bigger than the budget is not cached
+    assert not cache.put("findings", "d", "D", size=2 * 1024 * 1024)
+    assert cache.keys("findings") == ["a"]
+
+    cache.clear("findings")
+    assert len(cache) == 1
+    assert cache.size == size
+
+    restored = pickle.loads(pickle.dumps(cache))
+    assert len(restored) == 0
+    assert restored.stats == cache.stats
+
+
+def test_estimate_size():
+    shared = ["x" * 1000]
+    assert estimate_size({"a": shared, "b": shared}) < estimate_size({"a": shared, "b": ["y" * 1000]})
+    assert estimate_size(["x" * 1000]) > 1000
@@ -0,0 +1,76 @@
+# -*- mode:python; coding:utf-8 -*-
+
+# Copyright (c) 2022 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import json
+
+from ansible_risk_insight.ram_index import RAMIndex, module_index_table
+from ansible_risk_insight.risk_assessment_model import RAMClient
+
+
+def test_ram_index_upsert(tmp_path):
+    index = RAMIndex(root_dir=str(tmp_path))
+    assert index.find(module_index_table, "ping") == []
+
+    entry = {"short_name": "ping", "fqcn": "sample.coll.ping", "type": "collection", "name": "sample.coll", "version": "1.0.0", "hash": ""}
+    assert index.add(module_index_table, [entry, entry]) == 1
+    # the same module with a different `deprecated` flag is regarded as registered
+    assert index.add(module_index_table, [dict(entry, deprecated=True)]) == 0
+    assert index.add(module_index_table, [dict(entry, version="2.0.0")]) == 1
+
+    found = index.find(module_index_table, "ping")
+    assert [m["version"] for m in found] == ["1.0.0", "2.0.0"]
+    assert index.find(module_index_table, "sample.coll.ping", column="fqcn") == found
+
+
+def test_ram_index_legacy_json(tmp_path):
+    os.makedirs(os.path.join(tmp_path, "indices"))
+    entry = {"fqcn": "sample.coll.ping", "type": "collection", "name": "sample.coll", "version": "1.0.0", "hash": "", "deprecated": False}
+    legacy_index = {"ping": [entry]}
+    with open(os.path.join(tmp_path, "indices", "module_index.json"), "w") as file:
+        json.dump(legacy_index, file)
+
+    ram_client = RAMClient(root_dir=str(tmp_path))
+    assert ram_client.load_module_index() == legacy_index
+
+    # the legacy index is imported into the database even by a journaling worker
+    root_dir = os.path.join(tmp_path, "journal")
+    os.makedirs(os.path.join(root_dir, "indices"))
+    with open(os.path.join(root_dir, "indices", "module_index.json"), "w") as file:
+        json.dump(legacy_index, file)
+    worker = RAMIndex(root_dir=root_dir, use_journal=True)
+    assert [m["version"] for m in worker.find(module_index_table, "ping")] == ["1.0.0"]
+    reader = RAMIndex(root_dir=root_dir)
+    assert [m["version"] for m in reader.find(module_index_table, "ping")] == ["1.0.0"]
+    assert reader.compact() == 0
+
+
+def test_ram_index_journal(tmp_path):
+    entry = {"short_name": "ping", "fqcn": "sample.coll.ping", "type": "collection", "name": "sample.coll", "version": "1.0.0", "hash": ""}
+    worker = RAMIndex(root_dir=str(tmp_path), use_journal=True)
+    assert worker.add(module_index_table, [entry, entry]) == 1
+    assert worker.add(module_index_table, [entry]) == 0
+    assert worker.add(module_index_table, [dict(entry, version="2.0.0")]) == 1
+
+    # journaled entries are visible only to the worker until the journals are compacted
+    assert [m["version"] for m in worker.find(module_index_table, "sample.coll.ping", column="fqcn")] == ["1.0.0", "2.0.0"]
+    reader = RAMIndex(root_dir=str(tmp_path))
+    assert reader.find(module_index_table, "ping") == []
+
+    assert reader.compact() == 2
+    assert [m["version"] for m in reader.find(module_index_table, "ping")] == ["1.0.0", "2.0.0"]
+    assert os.listdir(os.path.join(tmp_path, "indices", "journal")) == []
+    assert reader.compact() == 0
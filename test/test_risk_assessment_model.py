@@ -0,0 +1,151 @@
+# -*- mode:python; coding:utf-8 -*-
+
+# Copyright (c) 2022 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import pytest
+
+from ansible_risk_insight.models import Module, Role, Task, TaskFile
+from ansible_risk_insight.findings import Findings
+from ansible_risk_insight.risk_assessment_model import RAMClient
+
+
+def _make_findings():
+    module = Module(name="ping", fqcn="sample.coll.ping", collection="sample.coll", defined_in="plugins/modules/ping.py")
+    module.set_key()
+    role = Role(name="sample_role", fqcn="sample.coll.sample_role", collection="sample.coll", defined_in="roles/sample_role")
+    role.set_key()
+    tasks = []
+    for i in range(3):
+        task = Task(name=f"task {i}", defined_in="playbooks/tasks/main.yml")
+        task.key = f"task collection:sample.coll#taskfile:playbooks/tasks/main.yml#task:[{i}]"
+        tasks.append(task)
+    taskfile = TaskFile(name="main.yml", defined_in="playbooks/tasks/main.yml", tasks=[t.key for t in tasks])
+    taskfile.key = "taskfile collection:sample.coll#taskfile:playbooks/tasks/main.yml"
+    definitions = {"modules": [module], "roles": [role], "taskfiles": [taskfile], "tasks": tasks}
+    return Findings(
+        metadata={"type": "collection", "name": "sample.coll", "version": "1.0.0", "hash": "abc"},
+        root_definitions={"definitions": definitions, "mappings": {"name": "sample.coll"}},
+    )
+
+
+def _register(ram_client: RAMClient, split_definitions: bool = True):
+    findings = _make_findings()
+    out_dir = ram_client.make_findings_dir_path("collection", "sample.coll", "1.0.0", "abc")
+    os.makedirs(out_dir)
+    # findings saved without `split_definitions` are the format of older versions
+    findings.dump(fpath=os.path.join(out_dir, "findings.json"), split_definitions=split_definitions)
+    ram_client.register_indices_to_ram(findings)
+
+
+@pytest.mark.parametrize("split_definitions", [True, False])
+def test_ram_search_module(tmp_path, split_definitions):
+    ram_client = RAMClient(root_dir=str(tmp_path))
+    _register(ram_client, split_definitions)
+
+    matched = ram_client.search_module("sample.coll.ping")
+    assert matched
+    assert matched[0]["object"].fqcn == "sample.coll.ping"
+    assert matched[0]["defined_in"]["hash"] == "abc"
+    if split_definitions:
+        # only modules are loaded to find a module
+        assert [type_name for _, type_name in ram_client.cache.keys("findings")] == ["modules"]
+
+    loaded, definitions, _ = ram_client.load_definitions_from_findings("collection", "sample.coll", "1.0.0", "abc")
+    assert loaded
+    assert [r.fqcn for r in definitions["roles"]] == ["sample.coll.sample_role"]
+
+
+def test_ram_search_taskfile_by_key(tmp_path):
+    ram_client = RAMClient(root_dir=str(tmp_path))
+    _register(ram_client)
+
+    taskfile_key = "taskfile collection:sample.coll#taskfile:playbooks/tasks/main.yml"
+    matched = ram_client.search_taskfile(taskfile_key, is_key=True)
+    assert len(matched) == 1
+    assert matched[0]["object"].key == taskfile_key
+    assert [o["object"].name for o in matched[0]["offspring_objects"]] == ["task 0", "task 1", "task 2"]
+    # each key index is built once for all the lookups
+    assert ram_client.cache_stats["findings_key_index"]["miss"] == 2
+
+    assert ram_client.search_taskfile(taskfile_key, is_key=True) == matched
+    assert ram_client.cache_stats["taskfile_search"]["hit"] == 1
+
+
+@pytest.mark.parametrize("split_definitions", [True, False])
+def test_ram_get_object_by_key(tmp_path, split_definitions):
+    ram_client = RAMClient(root_dir=str(tmp_path))
+    _register(ram_client, split_definitions)
+
+    task_key = "task collection:sample.coll#taskfile:playbooks/tasks/main.yml#task:[1]"
+    matched = ram_client.get_object_by_key(task_key)
+    assert matched["object"].name == "task 1"
+    assert matched["defined_in"] == {"type": "collection", "name": "sample.coll", "version": "1.0.0", "hash": "abc"}
+    assert ram_client.get_object_by_key("task collection:sample.coll#taskfile:playbooks/tasks/main.yml#task:[9]") is None
+    if split_definitions:
+        # the object is read from its offset without loading the definitions
+        assert ram_client.cache.keys("findings") == []
+
+
+def test_ram_catalog(tmp_path):
+    ram_client = RAMClient(root_dir=str(tmp_path))
+    for version in ["1.0.0", "2.0.0"]:
+        findings = _make_findings()
+        findings.metadata["version"] = version
+        ram_client.register(findings)
+
+    metadata_list = ram_client.list_all_ram_metadata()
+    assert [m["version"] for m in metadata_list] == ["2.0.0", "1.0.0"]
+    assert metadata_list[0] == {"type": "collection", "name": "sample.coll", "version": "2.0.0", "hash": "abc"}
+
+    assert ram_client.search_findings("sample.coll", "1.0.0").metadata["version"] == "1.0.0"
+    assert ram_client.search_findings("sample.coll", "*").metadata["version"] == "2.0.0"
+    assert ram_client.search_findings("sample.coll", "3.0.0") is None
+    assert ram_client.search_findings("sample.coll", "*", "role") is None
+
+    # the catalog is made from the findings directories if it does not exist
+    ram_client.index.close()
+    shutil.rmtree(os.path.join(tmp_path, "indices"))
+    ram_client = RAMClient(root_dir=str(tmp_path))
+    assert ram_client.list_all_ram_metadata() == metadata_list
+
+
+def test_ram_packed_release(tmp_path):
+    ram_dir = os.path.join(tmp_path, "ram")
+    pack_dir = os.path.join(tmp_path, "pack")
+    _register(RAMClient(root_dir=ram_dir))
+    assert RAMClient(root_dir=ram_dir).release(pack_dir, packed=True) == 1
+    assert sorted(os.listdir(pack_dir)) == ["indices", "ram.pack"]
+
+    ram_client = RAMClient(root_dir=pack_dir)
+    assert ram_client.pack is not None
+    matched = ram_client.search_module("sample.coll.ping")
+    assert matched[0]["object"].fqcn == "sample.coll.ping"
+    taskfile_key = "taskfile collection:sample.coll#taskfile:playbooks/tasks/main.yml"
+    matched = ram_client.search_taskfile(taskfile_key, is_key=True)
+    assert [o["object"].name for o in matched[0]["offspring_objects"]] == ["task 0", "task 1", "task 2"]
+    matched = ram_client.get_object_by_key("task collection:sample.coll#taskfile:playbooks/tasks/main.yml#task:[2]")
+    assert matched["object"].name == "task 2"
+
+    assert ram_client.list_all_ram_metadata() == [{"type": "collection", "name": "sample.coll", "version": "1.0.0", "hash": "abc"}]
+    findings = ram_client.search_findings("sample.coll", "1.0.0")
+    assert [r.fqcn for r in findings.root_definitions["definitions"]["roles"]] == ["sample.coll.sample_role"]
+
+    # findings registered after the release are read from disk
+    findings = _make_findings()
+    findings.metadata["version"] = "2.0.0"
+    ram_client.register(findings)
+    assert ram_client.search_findings("sample.coll", "*").metadata["version"] == "2.0.0"
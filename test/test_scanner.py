@@ -14,9 +14,15 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
+import copy
+import json
 import pytest
+import jsonpickle
 
-from ansible_risk_insight.scanner import ARIScanner, config
+from ansible_risk_insight import codec
+from ansible_risk_insight.parse_cache import parse_cache_dir_name
+from ansible_risk_insight.scanner import ARIScanner, Config, config, _get_worker_ram_client
 from ansible_risk_insight.rules.R103_download_exec import DownloadExecRule
 
 
@@ -80,7 +86,249 @@ def test_scanner_line_number_detection(type, name, expected_line_numbers):
         assert detected == expected
 
 
-def _scan(type, name, **kwargs):
+@pytest.mark.parametrize("workers", [1, 2])
+def test_scanner_evaluate_many(workers):
+    targets = [
+        dict(type="playbook", name="test/testdata/files/test_line_number.yml", playbook_only=True),
+        dict(type="role", name="test/testdata/roles/test_role"),
+        dict(type="playbook", name="test/testdata/files/not_found.yml", playbook_only=True),
+    ]
+    s = ARIScanner(
+        root_dir=config.data_dir,
+        use_ansible_doc=False,
+        read_ram=False,
+        write_ram=False,
+        silent=True,
+    )
+    results = list(s.evaluate_many(targets, workers=workers))
+    assert [i for i, _, _ in results] == [0, 1, 2]
+    _, playbook_result, error = results[0]
+    assert playbook_result.playbook(path="test/testdata/files/test_line_number.yml")
+    assert not error
+    _, role_result, error = results[1]
+    assert role_result.role(name="test_role")
+    assert not error
+    _, failed_result, error = results[2]
+    assert failed_result is None
+    assert error
+
+
+def test_scanner_evaluate_many_config(tmp_path):
+    names = ["test/testdata/roles/test_role", "test/testdata/files/test_line_number.yml"]
+    outputs = {}
+    for workers in [1, 2]:
+        base_dir = os.path.join(tmp_path, str(workers))
+        targets = [
+            dict(type="role", name=names[0], out_dir=os.path.join(base_dir, "out", "0")),
+            dict(type="playbook", name=names[1], playbook_only=True, out_dir=os.path.join(base_dir, "out", "1")),
+        ]
+        _config = Config(path=os.path.join(base_dir, "config"), data_dir=os.path.join(base_dir, "ram"), parse_cache=True)
+        s = ARIScanner(
+            config=_config,
+            use_ansible_doc=False,
+            read_ram=False,
+            write_ram=False,
+            silent=True,
+            profile_dir=os.path.join(base_dir, "profile"),
+        )
+        results = list(s.evaluate_many(targets, workers=workers))
+        assert not any(error for _, _, error in results)
+
+        # the profile is saved to the profile dir instead of the out dir of each target
+        with open(os.path.join(base_dir, "profile", "profile.json"), "r") as file:
+            profile = json.load(file)
+        assert not any(os.path.exists(os.path.join(target["out_dir"], "profile.json")) for target in targets)
+        rule_results = []
+        for target in targets:
+            with open(os.path.join(target["out_dir"], "rule_result.json"), "r") as file:
+                rule_results.append(_without_durations(json.load(file)))
+        # workers use the parse cache of the config
+        parse_cache_entries = [fname for _, _, files in os.walk(os.path.join(base_dir, "ram", parse_cache_dir_name)) for fname in files]
+        outputs[workers] = (sorted(profile["stages"]), sorted(profile["rules"]), rule_results, len(parse_cache_entries))
+
+    assert outputs[1][3] > 0
+    assert outputs[2] == outputs[1]
+
+
+def test_scanner_stream_rule_result(tmp_path):
+    out_dir = str(tmp_path)
+    ari_result, scandata = _scan(type="role", name="test/testdata/roles/test_role", out_dir=out_dir, stream_rule_result=True)
+    assert ari_result is None
+    assert not os.path.exists(os.path.join(out_dir, "rule_result.json"))
+    with open(os.path.join(out_dir, "rule_result.jsonl"), "r") as file:
+        targets = [json.loads(line) for line in file.read().splitlines()]
+    assert len(targets) == len(scandata.trees)
+    assert targets[0]["target_type"] == "role"
+    assert targets[0]["target_name"] == "test_role"
+    assert targets[0]["nodes"]
+
+
+def test_scanner_profile(tmp_path):
+    out_dir = str(tmp_path)
+    _, scandata = _scan(type="role", name="test/testdata/roles/test_role", out_dir=out_dir, profile=True)
+    with open(os.path.join(out_dir, "profile.json"), "r") as file:
+        profile = json.load(file)
+    assert profile == scandata.profile
+    assert "tree_construction" in profile["stages"]
+    assert profile["stages"]["apply_rules"]["peak_rss_kb"] > 0
+    assert any(record["type"] == "taskfile" for record in profile["files"].values())
+    assert profile["rules"][DownloadExecRule.rule_id]["matched"] > 0
+    assert profile["template_cache"]["hit"] + profile["template_cache"]["miss"] > 0
+
+
+def test_scanner_load_dependencies_in_parallel(tmp_path):
+    load_jobs = []
+    for i in range(3):
+        role_dir = os.path.join(tmp_path, "roles", f"dep_role_{i}")
+        os.makedirs(os.path.join(role_dir, "tasks"))
+        with open(os.path.join(role_dir, "tasks", "main.yml"), "w") as file:
+            file.write(f"- name: task {i}\n  debug:\n    msg: {i}\n- include_tasks: sub.yml\n")
+        with open(os.path.join(role_dir, "tasks", "sub.yml"), "w") as file:
+            file.write("- shell: echo hello\n")
+        eval_kwargs = dict(
+            type="role",
+            name=role_dir,
+            target_path=role_dir,
+            install_dependencies=False,
+            skip_dependency=True,
+            load_only=True,
+        )
+        load_jobs.append((f"role-dep_role_{i}", eval_kwargs))
+
+    loaded = {}
+    for workers in [1, 2]:
+        s = ARIScanner(
+            root_dir=os.path.join(tmp_path, "ram"),
+            use_ansible_doc=False,
+            read_ram=False,
+            write_ram=False,
+            silent=True,
+            dependency_load_workers=workers,
+        )
+        loaded[workers] = s.load_dependencies(load_jobs, read_ram=False)
+    serial, parallel = loaded[1], loaded[2]
+    assert list(parallel) == list(serial) == [key for key, _ in load_jobs]
+    for key in serial:
+        # the load time is the only difference
+        parallel[key]["mappings"].timestamp = serial[key]["mappings"].timestamp
+        assert codec.encode(parallel[key]) == codec.encode(serial[key])
+
+    # a worker keeps one RAM client per configuration of the caller's client
+    ram_client_kwargs = dict(root_dir=os.path.join(tmp_path, "ram"), cache_max_size_mb=16, index_journal=False)
+    ram_client = _get_worker_ram_client(ram_client_kwargs)
+    assert ram_client.root_dir == ram_client_kwargs["root_dir"]
+    assert ram_client.cache_max_size_mb == 16
+    assert _get_worker_ram_client(dict(ram_client_kwargs)) is ram_client
+
+
+mutation_rule = """
+import copy
+from dataclasses import dataclass
+from ansible_risk_insight.models import AnsibleRunContext, RunTargetType, Rule, RuleResult, SpecMutation
+
+
+@dataclass
+class ShellToCommandRule(Rule):
+    rule_id: str = "Test901"
+    description: str = "replace shell with command"
+    enabled: bool = True
+    name: str = "ShellToCommand"
+    spec_mutation: bool = True
+
+    def match(self, ctx: AnsibleRunContext) -> bool:
+        return ctx.current.type == RunTargetType.Task and ctx.current.spec.module == "shell"
+
+    def process(self, ctx: AnsibleRunContext):
+        task = ctx.current
+        spec = copy.deepcopy(task.spec)
+        spec.module = "ansible.builtin.command"
+        mutation = SpecMutation(key=spec.key, changes=[{"module": spec.module}], object=spec, rule=self.get_metadata())
+        return RuleResult(verdict=True, detail={"spec_mutations": [mutation]}, file=task.file_info(), rule=self.get_metadata())
+"""
+
+
+def _make_spec_mutation_project(tmp_path):
+    project_dir = os.path.join(tmp_path, "project")
+    os.makedirs(project_dir)
+    with open(os.path.join(project_dir, "site1.yml"), "w") as file:
+        file.write(
+            "- hosts: all\n  vars:\n    files: [a, b, c, d, e]\n  tasks:\n"
+            "    - shell: cat {{ item }}\n      loop: '{{ files }}'\n    - debug:\n        msg: done\n"
+        )
+    with open(os.path.join(project_dir, "site2.yml"), "w") as file:
+        file.write("- hosts: all\n  tasks:\n    - debug:\n        msg: hello\n")
+    rules_dir = os.path.join(tmp_path, "rules")
+    os.makedirs(rules_dir)
+    with open(os.path.join(rules_dir, "test_mutation_rule.py"), "w") as file:
+        file.write(mutation_rule)
+    return project_dir, rules_dir
+
+
+def _evaluate_with_rules(tmp_path, project_dir, rules_dir, **kwargs):
+    s = ARIScanner(
+        root_dir=os.path.join(tmp_path, "ram"),
+        rules_dir=rules_dir + ":" + config.rules_dir,
+        use_ansible_doc=False,
+        read_ram=False,
+        write_ram=False,
+        silent=True,
+        max_loop_items=2,
+    )
+    ari_result = s.evaluate(type="project", name=project_dir, target_path=project_dir, install_dependencies=False, **kwargs)
+    return ari_result, s.get_last_scandata()
+
+
+def test_scanner_rescan_spec_mutations(tmp_path):
+    project_dir, rules_dir = _make_spec_mutation_project(tmp_path)
+
+    def _evaluate(**kwargs):
+        return _evaluate_with_rules(tmp_path, project_dir, rules_dir, **kwargs)
+
+    # the mutated tree is rescanned within the scan
+    rescanned, scandata = _evaluate()
+    assert scandata.spec_mutations_from_previous_scan
+    assert not scandata.spec_mutations
+    # a full scan which starts from the mutated specs
+    full, full_scandata = _evaluate(spec_mutations_from_previous_scan=copy.deepcopy(scandata.spec_mutations_from_previous_scan))
+    assert not full_scandata.spec_mutations
+
+    rescanned_data, full_data = _without_durations(rescanned), _without_durations(full)
+    assert rescanned_data == full_data
+    assert "ansible.builtin.command" in json.dumps(rescanned_data)
+    assert scandata.findings.summary_txt == full_scandata.findings.summary_txt
+    assert scandata.resolve_failures == full_scandata.resolve_failures
+    assert scandata.tree_stats == full_scandata.tree_stats
+    loop_task = [tc for tc in scandata.taskcalls_in_trees[0].taskcalls if tc.spec.module == "ansible.builtin.command"][0]
+    assert len(loop_task.args.templated) == 2
+
+
+def test_scanner_stream_rule_result_with_spec_mutations(tmp_path):
+    project_dir, rules_dir = _make_spec_mutation_project(tmp_path)
+    ari_result, _ = _evaluate_with_rules(tmp_path, project_dir, rules_dir)
+
+    out_dir = os.path.join(tmp_path, "out")
+    _, scandata = _evaluate_with_rules(tmp_path, project_dir, rules_dir, out_dir=out_dir, stream_rule_result=True)
+    # the streamed result is rescanned in the same way as the result in memory
+    assert scandata.spec_mutations_from_previous_scan
+    assert not scandata.spec_mutations
+    assert sorted(os.listdir(out_dir)) == ["rule_result.jsonl"]
+    with open(os.path.join(out_dir, "rule_result.jsonl"), "r") as file:
+        targets = [json.loads(line) for line in file.read().splitlines()]
+    assert _without_durations(targets) == _without_durations(ari_result)["targets"]
+
+
+def _without_durations(ari_result):
+    def _strip(data):
+        if isinstance(data, dict):
+            return {k: _strip(v) for k, v in data.items() if k != "duration"}
+        if isinstance(data, list):
+            return [_strip(v) for v in data]
+        return data
+
+    return _strip(json.loads(jsonpickle.encode(ari_result, make_refs=False, unpicklable=False)))
+
+
+def _scan(type, name, profile=False, **kwargs):
     if not kwargs:
         kwargs = {}
     kwargs["type"] = type
@@ -91,6 +339,7 @@ def _scan(type, name, **kwargs):
         use_ansible_doc=False,
         read_ram=False,
         write_ram=False,
+        profile=profile,
     )
     ari_result = s.evaluate(**kwargs)
     scandata = s.get_last_scandata()
@@ -0,0 +1,83 @@
+# -*- mode:python; coding:utf-8 -*-
+
+# Copyright (c) 2022 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+
+from ansible_risk_insight.scanner import ARIScanner, config
+from ansible_risk_insight.server import ARIServer
+
+
+def test_server_scan_raw_yaml():
+    server = _server()
+    with open("test/testdata/files/test_line_number.yml", "r") as file:
+        raw_yaml = file.read()
+    status, response = server.scan({"type": "playbook", "raw_yaml": raw_yaml, "playbook_only": True})
+    assert status == 200
+    targets = response["result"]["targets"]
+    assert len(targets) == 1
+    assert targets[0]["target_type"] == "playbook"
+    assert len(targets[0]["nodes"]) > 1
+
+
+def test_server_scan_invalid_request():
+    server = _server()
+    status, response = server.scan({"type": "playbook", "unknown_option": True})
+    assert status == 400
+    assert "unknown_option" in response["error"]
+
+    status, response = server.scan({"name": "playbook.yml"})
+    assert status == 400
+
+
+def test_server_scan_restricted_options(tmp_path):
+    playbook = "test/testdata/files/test_line_number.yml"
+    base_request = {"type": "playbook", "name": playbook, "target_path": playbook, "playbook_only": True}
+    server = _server()
+    for request in [
+        {"out_dir": str(tmp_path)},
+        {"install_dependencies": True},
+        {"download_only": True},
+    ]:
+        status, response = server.scan(dict(base_request, **request))
+        assert status == 403
+        assert list(request)[0] in response["error"]
+
+    allowed_dir = os.path.join(tmp_path, "allowed")
+    os.makedirs(allowed_dir)
+    server = _server(allowed_write_dirs=[allowed_dir])
+    status, _ = server.scan(dict(base_request, out_dir=os.path.join(allowed_dir, "out")))
+    assert status == 200
+    assert os.path.exists(os.path.join(allowed_dir, "out", "rule_result.json"))
+    for out_dir in [os.path.join(allowed_dir, "..", "out"), str(tmp_path)]:
+        status, _ = server.scan(dict(base_request, out_dir=out_dir))
+        assert status == 403
+
+    # dependencies are installed only into an allowed directory even if installing is allowed
+    server = _server(allowed_write_dirs=[allowed_dir], allow_install_dependencies=True)
+    status, response = server.scan(dict(base_request, install_dependencies=True, dependency_dir=str(tmp_path)))
+    assert status == 403
+    assert "dependency_dir" in response["error"]
+
+
+def _server(**kwargs):
+    s = ARIScanner(
+        root_dir=config.data_dir,
+        use_ansible_doc=False,
+        read_ram=False,
+        write_ram=False,
+        silent=True,
+    )
+    return ARIServer(scanner=s, **kwargs)
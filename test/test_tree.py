@@ -0,0 +1,198 @@
+# -*- mode:python; coding:utf-8 -*-
+
+# Copyright (c) 2022 IBM Corp. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import sys
+import json
+import pickle
+import jsonpickle
+
+from ansible_risk_insight import codec
+from ansible_risk_insight.scanner import ARIScanner
+from ansible_risk_insight.models import MutableContent, TaskCall
+from ansible_risk_insight.tree import TreeLoader
+
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        file.write(content)
+
+
+def _scan(tmp_path, project_dir, tree_construction_workers=1, **kwargs):
+    scanner = ARIScanner(
+        root_dir=os.path.join(tmp_path, "ram"),
+        read_ram=False,
+        write_ram=False,
+        use_ansible_doc=False,
+        silent=True,
+        tree_construction_workers=tree_construction_workers,
+    )
+    scanner.evaluate(type="project", name=project_dir, target_path=project_dir, install_dependencies=False, **kwargs)
+    return scanner.get_last_scandata()
+
+
+def _scan_project(tmp_path, tree_construction_workers=1, **kwargs):
+    project_dir = os.path.join(tmp_path, "project")
+    for playbook in ["site1.yml", "site2.yml"]:
+        _write(os.path.join(project_dir, playbook), "- hosts: all\n  roles:\n    - common\n")
+    role_tasks_dir = os.path.join(project_dir, "roles", "common", "tasks")
+    _write(
+        os.path.join(role_tasks_dir, "main.yml"),
+        "- include_tasks: sub.yml\n- name: unknown module\n  unknown.coll.module:\n    path: /tmp\n",
+    )
+    # `sub.yml` includes `main.yml` again, so the include is cut as a loop
+    _write(os.path.join(role_tasks_dir, "sub.yml"), "- debug:\n    msg: hello\n- include_tasks: main.yml\n")
+    return _scan(tmp_path, project_dir, tree_construction_workers, **kwargs)
+
+
+def test_tree_subtree_reuse(tmp_path):
+    scandata = _scan_project(tmp_path)
+    role_keys = [key for key, _ in scandata._tree_loader.subtree_cache if key.startswith("role ")]
+    assert len(role_keys) == 1
+
+    role_trees = []
+    for tree in scandata.trees:
+        keys = [obj.spec.key for obj in tree.items]
+        if role_keys[0] not in keys:
+            continue
+        role_trees.append(tree.items[keys.index(role_keys[0]) :])
+        # the resolve failure in the role is counted for every tree
+        assert scandata.tree_resolve_failures[scandata.trees.index(tree)]["module"] == {"unknown.coll.module": 1}
+    assert len(role_trees) >= 2
+
+    first, second = role_trees[0], role_trees[1]
+    assert [obj.spec.key for obj in first] == [obj.spec.key for obj in second]
+    # the reused subtree is linked to its own caller
+    assert first[0].called_from != second[0].called_from
+    for i, obj in enumerate(second[1:]):
+        assert obj.node_id.startswith(second[0].node_id + ".")
+        assert obj.depth - second[0].depth == first[i + 1].depth - first[0].depth
+        assert obj is not first[i + 1]
+
+    taskcalls = [(a, b) for a, b in zip(first, second) if isinstance(a, TaskCall) and a.spec.module == "unknown.coll.module"]
+    assert taskcalls
+    task1, task2 = taskcalls[0]
+    # contents are copied on write
+    task2.content.remove_module_arg_key("path")
+    assert "path" in task1.content.yaml()
+    assert "path" not in task2.content.yaml()
+
+
+def _keys(data):
+    if isinstance(data, dict):
+        for k, v in data.items():
+            yield k
+            yield from _keys(v)
+    elif isinstance(data, list):
+        for v in data:
+            yield from _keys(v)
+
+
+def test_tree_content_serialization(tmp_path):
+    out_dir = os.path.join(tmp_path, "out")
+    scandata = _scan_project(tmp_path, out_dir=out_dir)
+    # the copy-on-write state of contents is not written to the output
+    with open(os.path.join(out_dir, "rule_result.json"), "r") as file:
+        rule_result = json.load(file)
+    assert "_task_spec" in set(_keys(rule_result))
+    assert "_shared" not in set(_keys(rule_result))
+
+    taskcall = [obj for tree in scandata.trees for obj in tree.items if isinstance(obj, TaskCall)][0]
+    assert "_shared" not in codec.encode(taskcall.content)
+    # a loaded content does not know whether its task spec is shared, so it is copied on write
+    content = MutableContent.from_task_spec(taskcall.spec)
+    copies = pickle.loads(pickle.dumps([content.shared_copy(), content.shared_copy()]))
+    assert copies[0]._task_spec is copies[1]._task_spec
+    copies[0].set_task_name("renamed")
+    assert copies[1].get_task_name() == taskcall.spec.name
+
+
+def test_tree_deep_include_chain(tmp_path):
+    project_dir = os.path.join(tmp_path, "project")
+    _write(os.path.join(project_dir, "site.yml"), "- hosts: all\n  roles:\n    - chain\n")
+    chain_length = 40
+    for i in range(chain_length):
+        fname = "main.yml" if i == 0 else f"tf{i}.yml"
+        body = f"- debug:\n    msg: {i}\n"
+        if i + 1 < chain_length:
+            body += f"- include_tasks: tf{i + 1}.yml\n"
+        _write(os.path.join(project_dir, "roles", "chain", "tasks", fname), body)
+    scandata = _scan(tmp_path, project_dir)
+    stats = scandata.tree_stats[0]
+    # playbook, play and role, then a taskfile, a debug task, its module and an include task per taskfile
+    assert stats["nodes"] == len(scandata.trees[0].items) == 3 + chain_length * 4 - 1
+    assert stats["max_depth"] == 3 + chain_length * 2
+    assert stats["max_fan_out"] == 2
+
+    # the tree is constructed without recursion, so the depth is not limited by the recursion limit
+    loader = TreeLoader(scandata.root_definitions, scandata.ext_definitions)
+    recursion_limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(stats["max_depth"])
+    try:
+        trees, _ = loader.run()
+    finally:
+        sys.setrecursionlimit(recursion_limit)
+    assert [obj.key for obj in trees[0].items] == [obj.key for obj in scandata.trees[0].items]
+    assert loader.tree_stats[0] == stats
+
+
+def _serialize(obj):
+    data = json.loads(jsonpickle.encode(obj, make_refs=False, unpicklable=False))
+
+    def _strip(d):
+        # rule durations are the only values which differ between scans
+        if isinstance(d, dict):
+            return {k: _strip(v) for k, v in d.items() if k != "duration"}
+        if isinstance(d, list):
+            return [_strip(v) for v in d]
+        return d
+
+    return _strip(data)
+
+
+def test_tree_parallel_construction(tmp_path):
+    project_dir = os.path.join(tmp_path, "project")
+    _write(os.path.join(project_dir, "site1.yml"), "- hosts: all\n  roles:\n    - common\n")
+    _write(os.path.join(project_dir, "site2.yml"), "- hosts: all\n  tasks:\n    - include_role:\n        name: web\n")
+    _write(os.path.join(project_dir, "site3.yml"), "- hosts: all\n  roles:\n    - web\n    - common\n")
+    _write(os.path.join(project_dir, "site4.yml"), "- hosts: all\n  tasks:\n    - debug:\n        msg: hello\n")
+    common_dir = os.path.join(project_dir, "roles", "common", "tasks")
+    _write(
+        os.path.join(common_dir, "main.yml"),
+        "- include_tasks: sub.yml\n- name: unknown module\n  unknown.coll.module:\n    path: /tmp\n",
+    )
+    # `sub.yml` includes `main.yml` again, so the include is cut as a loop
+    _write(os.path.join(common_dir, "sub.yml"), "- debug:\n    msg: hello\n- include_tasks: main.yml\n")
+    web_dir = os.path.join(project_dir, "roles", "web", "tasks")
+    _write(os.path.join(web_dir, "main.yml"), "- include_role:\n    name: common\n- shell: echo {{ item }}\n  loop: [a, b]\n")
+
+    serial = _scan(tmp_path, project_dir)
+    for workers in [2, 3]:
+        parallel = _scan(tmp_path, project_dir, tree_construction_workers=workers)
+        assert _serialize(parallel.trees) == _serialize(serial.trees)
+        assert _serialize(parallel.findings.report["ari_result"]) == _serialize(serial.findings.report["ari_result"])
+        assert parallel.tree_resolve_failures == serial.tree_resolve_failures
+        assert parallel.tree_stats == serial.tree_stats
+        assert parallel.extra_requirements == serial.extra_requirements
+
+        # specs in the trees made by workers are the definitions of the scan
+        definitions = parallel.root_definitions["definitions"]
+        tasks = {task.key: task for task in definitions["tasks"]}
+        for tree in parallel.trees:
+            for obj in tree.items:
+                if isinstance(obj, TaskCall) and obj.spec.key in tasks:
+                    assert obj.spec is tasks[obj.spec.key]